@@ -0,0 +1,124 @@
+"""Long-horizon adherence, streak and weekday analytics over a user's daily_logs history.
+
+Everything is computed from one pass that lays the logs on a daily calendar grid as NumPy
+arrays; rolling windows use cumulative sums, streaks use run-length encoding.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Heatmap label -> (daily_logs column, calculate_targets key)
+MACRO_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "Calorías": ("calories_consumed", "kcal_target"),
+    "Proteína": ("protein_g", "protein_g"),
+    "Carbohidratos": ("carbs_g", "carbs_g"),
+    "Grasas": ("fat_g", "fat_g"),
+}
+WEEKDAYS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+
+@dataclass
+class AdherenceReport:
+    days: np.ndarray  # datetime64[D], one entry per calendar day
+    logged: np.ndarray  # bool, a daily_logs row exists
+    hits: np.ndarray  # bool, kcal within tolerance of target
+    rolling: Dict[int, np.ndarray]  # window -> % adherence over logged days ending on each day
+    current_streak: int
+    longest_streak: int
+    macro_matrix: np.ndarray  # (macros, days) consumption as % of target
+    weekday_adherence: np.ndarray  # (7,) % of logged days hit, Monday first
+    weekday_logged: np.ndarray  # (7,) logged day counts, Monday first
+    macro_labels: List[str] = field(default_factory=lambda: list(MACRO_COLUMNS))
+
+    def rolling_now(self) -> Dict[int, float]:
+        return {window: float(series[-1]) if series.size else 0.0 for window, series in self.rolling.items()}
+
+    def heatmap_args(self, last_days: int = 28) -> Tuple[List[str], List[str], List[List[int]]]:
+        """Arguments for `charts.adherence_heatmap` covering the most recent days."""
+        days = [str(d) for d in self.days[-last_days:]]
+        matrix = self.macro_matrix[:, -last_days:].round().astype(int).tolist()
+        return days, self.macro_labels, matrix
+
+    def weekday_pattern(self) -> Dict[str, float]:
+        return dict(zip(WEEKDAYS, self.weekday_adherence.round(1).tolist()))
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start indices and lengths of consecutive True runs."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    return starts, ends - starts
+
+
+def analyze_adherence(
+    logs: Sequence[Dict],
+    targets: Dict[str, float],
+    tolerance: float = 0.1,
+    windows: Sequence[int] = (7, 30, 90),
+    today: Optional[date] = None,
+) -> AdherenceReport:
+    """Analyze a full daily_logs history against `calculate_targets`-style targets.
+
+    A day counts as adhered with the same rule as `DailyTracker.adherence`: calories within
+    `tolerance` of `kcal_target`. Rolling ratios use logged days as the denominator; streaks run
+    over calendar days, and an unlogged `today` does not break the current streak yet.
+    """
+    if logs:
+        dates = np.array([str(log["log_date"])[:10] for log in logs], dtype="datetime64[D]")
+        start = dates.min()
+        end = max(dates.max(), np.datetime64(today, "D")) if today else dates.max()
+    else:
+        dates = np.array([], dtype="datetime64[D]")
+        start = end = np.datetime64(today or date.today(), "D")
+    n_days = int((end - start).astype(int)) + 1
+    grid = start + np.arange(n_days)
+    idx = (dates - start).astype(int)
+
+    logged = np.zeros(n_days, dtype=bool)
+    logged[idx] = True
+    values = np.zeros((len(MACRO_COLUMNS), n_days))
+    for row, (column, _) in enumerate(MACRO_COLUMNS.values()):
+        values[row, idx] = np.array([float(log.get(column) or 0) for log in logs])
+
+    target_vec = np.array([float(targets.get(key) or 0) for _, key in MACRO_COLUMNS.values()])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        macro_matrix = np.where(target_vec[:, None] > 0, values / target_vec[:, None] * 100, 0.0)
+    macro_matrix[:, ~logged] = 0.0
+
+    kcal_target = target_vec[0]
+    hits = logged & (np.abs(values[0] - kcal_target) <= kcal_target * tolerance)
+
+    hit_cum = np.concatenate(([0], np.cumsum(hits)))
+    log_cum = np.concatenate(([0], np.cumsum(logged)))
+    rolling: Dict[int, np.ndarray] = {}
+    for window in windows:
+        lo = np.maximum(np.arange(1, n_days + 1) - window, 0)
+        hit_w = hit_cum[1:] - hit_cum[lo]
+        log_w = log_cum[1:] - log_cum[lo]
+        rolling[window] = np.where(log_w > 0, hit_w / np.maximum(log_w, 1) * 100, 0.0)
+
+    starts, lengths = _runs(hits)
+    longest = int(lengths.max()) if lengths.size else 0
+    streak_end = n_days if logged[-1] else n_days - 1
+    current = int(lengths[-1]) if lengths.size and starts[-1] + lengths[-1] == streak_end else 0
+
+    weekday = (grid.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    weekday_logged = np.bincount(weekday[logged], minlength=7)
+    weekday_hits = np.bincount(weekday[hits], minlength=7)
+    weekday_adherence = np.where(weekday_logged > 0, weekday_hits / np.maximum(weekday_logged, 1) * 100, 0.0)
+
+    return AdherenceReport(
+        days=grid,
+        logged=logged,
+        hits=hits,
+        rolling=rolling,
+        current_streak=current,
+        longest_streak=longest,
+        macro_matrix=macro_matrix,
+        weekday_adherence=weekday_adherence,
+        weekday_logged=weekday_logged,
+    )
@@ -0,0 +1,179 @@
+"""Async data access over Supabase's REST API and a concurrent dashboard loader.
+
+The services mirror `AuthService.get_profile` and the `DailyTracker` readers but run on one
+pooled `httpx.AsyncClient` per event loop, so `load_dashboard` can fire every query at once and
+return in roughly the time of the slowest one. Streamlit code, which is synchronous, calls
+`load_dashboard_sync`; it runs on a long-lived background loop so the pool's keep-alive
+connections survive across reruns.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import weakref
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.auth import DEFAULT_PROFILE, _profile_from_row, profile_cache
+from app.cache import MISS, NEGATIVE
+from app.coalesce import async_supabase_flight, query_key
+from app.config import get_supabase_key, get_supabase_url
+from app.instrumentation import InstrumentedAsyncTransport
+
+logger = logging.getLogger(__name__)
+
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+DEFAULT_TIMEOUT = 2.5
+
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared connection pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            transport=InstrumentedAsyncTransport(limits=POOL_LIMITS), timeout=httpx.Timeout(10.0, connect=3.0)
+        )
+        _http_clients[loop] = client
+    return client
+
+
+class AsyncPostgrest:
+    """Minimal PostgREST reader: `select(table, filters={"user_id": "eq.<id>"}, ...)`."""
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None, access_token: Optional[str] = None):
+        self.base_url = f"{(url or get_supabase_url()).rstrip('/')}/rest/v1"
+        key = key or get_supabase_key()
+        # Without a user token requests run as anon, and row-level security hides the user's rows.
+        self.authenticated = access_token is not None
+        self.headers = {"apikey": key, "Authorization": f"Bearer {access_token or key}", "Accept": "application/json"}
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"select": columns, **(filters or {})}
+        if order:
+            params["order"] = order
+        if limit is not None:
+            params["limit"] = limit
+
+        async def fetch() -> List[Dict[str, Any]]:
+            response = await get_http_client().get(f"{self.base_url}/{table}", params=params, headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+
+        # The bearer token is part of the key: row-level security makes results caller-specific.
+        key = query_key(table, columns, filters, order=order, limit=limit, auth=self.headers["Authorization"])
+        return list(await async_supabase_flight.do(key, fetch))
+
+
+class AsyncAuthService:
+    def __init__(self, rest: AsyncPostgrest):
+        self.rest = rest
+
+    async def get_profile(self, user_id: str) -> Dict[str, Any]:
+        cached = profile_cache.get(user_id)
+        if cached is NEGATIVE:
+            return DEFAULT_PROFILE.copy()
+        if cached is not MISS:
+            return dict(cached)
+        rows = await self.rest.select(
+            "profiles", filters={"user_id": f"eq.{user_id}"}, order="updated_at.desc", limit=1
+        )
+        if not rows:
+            if self.rest.authenticated:  # an anon read can't tell a missing profile from a hidden one
+                profile_cache.set_negative(user_id)
+            return DEFAULT_PROFILE.copy()
+        profile = _profile_from_row(rows[0])
+        profile_cache.set(user_id, profile)
+        return dict(profile)
+
+
+class AsyncDailyTracker:
+    def __init__(self, rest: AsyncPostgrest):
+        self.rest = rest
+
+    async def list_logs(self, user_id: str, limit: int = 30) -> List[Dict]:
+        return await self.rest.select(
+            "daily_logs", filters={"user_id": f"eq.{user_id}"}, order="log_date.desc", limit=limit
+        )
+
+    async def list_meal_entries(self, user_id: str, log_date: date) -> List[Dict]:
+        return await self.rest.select(
+            "meal_entries",
+            filters={"user_id": f"eq.{user_id}", "log_date": f"eq.{log_date.isoformat()}"},
+            order="created_at.desc",
+        )
+
+    async def list_weight_history(self, user_id: str, limit: int = 90) -> List[Dict]:
+        return await self.rest.select(
+            "weight_history",
+            columns="recorded_at,weight_kg",
+            filters={"user_id": f"eq.{user_id}"},
+            order="recorded_at.desc",
+            limit=limit,
+        )
+
+
+async def _guarded(name: str, coro, timeout: float, fallback: Any, errors: Dict[str, str]) -> Any:
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        errors[name] = f"timeout after {timeout}s"
+    except Exception as e:
+        errors[name] = f"{type(e).__name__}: {e}"
+    logger.error(f"Dashboard query {name} failed: {errors[name]}")
+    return fallback
+
+
+async def load_dashboard(
+    user_id: str,
+    log_date: date,
+    rest: Optional[AsyncPostgrest] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    log_limit: int = 30,
+) -> Dict[str, Any]:
+    """Fetch profile, logs, today's meals and weight history concurrently.
+
+    Each query has its own `timeout`; a slow or failing one falls back to the same defaults the
+    synchronous services use (default profile, empty lists) and is reported under `errors`.
+    """
+    rest = rest or AsyncPostgrest()
+    auth, tracker = AsyncAuthService(rest), AsyncDailyTracker(rest)
+    errors: Dict[str, str] = {}
+    profile, logs, meals, weights = await asyncio.gather(
+        _guarded("profile", auth.get_profile(user_id), timeout, DEFAULT_PROFILE.copy(), errors),
+        _guarded("logs", tracker.list_logs(user_id, log_limit), timeout, [], errors),
+        _guarded("meals", tracker.list_meal_entries(user_id, log_date), timeout, [], errors),
+        _guarded("weights", tracker.list_weight_history(user_id), timeout, [], errors),
+    )
+    return {"profile": profile, "logs": logs, "meals": meals, "weights": weights, "errors": errors}
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="summerfit-async-io", daemon=True).start()
+        return _loop
+
+
+def load_dashboard_sync(user_id: str, log_date: date, access_token: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+    """Blocking wrapper for Streamlit reruns; reuses the background loop's connection pool."""
+    rest = AsyncPostgrest(access_token=access_token)
+    timeout = kwargs.get("timeout", DEFAULT_TIMEOUT)
+    future = asyncio.run_coroutine_threadsafe(load_dashboard(user_id, log_date, rest=rest, **kwargs), _background_loop())
+    return future.result(timeout + 1.0)
@@ -1,138 +1,64 @@
-"""Simple Supabase authentication and profile persistence helpers."""
+"""Supabase authentication and profile persistence helpers with a graceful demo fallback."""
 from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
-import logging
 
-from supabase import Client, create_client
+import streamlit as st
+from supabase import Client
 
-from app.config import get_supabase_key, get_supabase_url
+from app.cache import MISS, NEGATIVE, TTLCache
+from app.coalesce import query_key, supabase_flight
+from app.local_store import LocalStore
+from app.resilience import read_guard
+from app.supabase_client import get_client_manager
+import logging
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass
-class AuthResult:
-    user_id: str
-    email: str
-
-
-def build_client() -> Optional[Client]:
-    """Return a Supabase client or None when env vars are missing."""
-    try:
-        url = get_supabase_url()
-        key = get_supabase_key()
-    except Exception as e:
-        logger.error(f"Error getting Supabase config: {e}")
-        return None
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "gender": "M",
+    "age": 28,
+    "height_cm": 175,
+    "weight_kg": 78.0,
+    "target_weight_kg": 72.0,
+    "goal": "Definir",
+    "activity_level": "Moderado",
+    "diet_type": "Estándar",
+}
+
+# Cast profiles by user id, shared across reruns. Written through by upsert_profile so a user
+# never reads their own profile stale here; the short TTL bounds how long an edit made in the
+# web app goes unseen. "No row" is only cached for reads made with the user's session: under
+# the anon key row-level security hides the row, which says nothing about whether it exists.
+profile_cache = TTLCache(maxsize=2048, ttl=120.0, negative_ttl=30.0)
+
+
+def _profile_from_row(saved: Dict[str, Any]) -> Dict[str, Any]:
+    """Cast a stored profile row, filling gaps from DEFAULT_PROFILE."""
+    def pick(key: str) -> Any:
+        value = saved.get(key)
+        return DEFAULT_PROFILE[key] if value is None else value
+
+    return {
+        "gender": pick("gender"),
+        "age": pick("age"),
+        "height_cm": int(pick("height_cm")),
+        "weight_kg": float(pick("weight_kg")),
+        "target_weight_kg": float(pick("target_weight_kg")),
+        "goal": pick("goal"),
+        "activity_level": pick("activity_level"),
+        "diet_type": pick("diet_type"),
+    }
+
+
+def _access_token(client: Client) -> Optional[str]:
+    """The signed-in user's JWT that `client` sends, or None when it only sends the anon key."""
     try:
-        return create_client(url, key)
-    except Exception as e:
-        logger.error(f"Error creating Supabase client: {e}")
-        return None
-
-
-class AuthService:
-    """Wraps Supabase Auth + profile persistence."""
-
-    def __init__(self, client: Optional[Client] = None):
-        self.client = client or build_client()
-
-    def sign_in(self, email: str, password: str) -> Optional[AuthResult]:
-        if not self.client:
-            return None
-        try:
-            response = self.client.auth.sign_in_with_password({"email": email, "password": password})
-            if response and response.user:
-                return AuthResult(user_id=response.user.id, email=response.user.email or email)
-        except Exception as e:
-            logger.error(f"Sign in error: {e}")
-            return None
+        session = client.auth.get_session()
+    except Exception:
         return None
-
-    def sign_up(self, email: str, password: str) -> Optional[AuthResult]:
-        if not self.client:
-            return None
-        try:
-            response = self.client.auth.sign_up({"email": email, "password": password})
-            if response and response.user:
-                return AuthResult(user_id=response.user.id, email=response.user.email or email)
-        except Exception as e:
-            logger.error(f"Sign up error: {e}")
-            return None
-        return None
-
-    def get_profile(self, user_id: str) -> Dict[str, Any]:
-        default_profile = {
-            "gender": "M",
-            "age": 28,
-            "height_cm": 175,
-            "weight_kg": 78.0,
-            "target_weight_kg": 72.0,
-            "goal": "Definir",
-            "activity_level": "Moderado",
-            "diet_type": "Estándar",
-        }
-        if not self.client:
-            return default_profile
-        try:
-            response = (
-                self.client.table("profiles")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("updated_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            if response.data:
-                saved = response.data[0]
-                return {
-                    "gender": saved.get("gender", "M"),
-                    "age": saved.get("age", 28),
-                    "height_cm": int(saved.get("height_cm", 175)),
-                    "weight_kg": float(saved.get("weight_kg", 78.0)),
-                    "target_weight_kg": float(saved.get("target_weight_kg", 72.0)),
-                    "goal": saved.get("goal", "Definir"),
-                    "activity_level": saved.get("activity_level", "Moderado"),
-                    "diet_type": saved.get("diet_type", "Estándar"),
-                }
-        except Exception as e:
-            logger.error(f"Error fetching profile: {e}")
-            pass
-        return default_profile
-
-    def upsert_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
-        if not self.client:
-            return
-        payload = {
-            "user_id": user_id,
-            "gender": profile.get("gender"),
-            "age": profile.get("age"),
-            "height_cm": profile.get("height_cm"),
-            "weight_kg": profile.get("weight_kg"),
-            "target_weight_kg": profile.get("target_weight_kg"),
-            "goal": profile.get("goal"),
-            "activity_level": profile.get("activity_level"),
-            "diet_type": profile.get("diet_type"),
-        }
-        try:
-            self.client.table("profiles").upsert(payload, on_conflict="user_id").execute()
-        except Exception as e:
-            logger.error(f"Error upserting profile: {e}")
-            pass
-from __future__ import annotations
-
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
-
-import streamlit as st
-from supabase import Client, create_client
-
-from app.config import get_supabase_key, get_supabase_url
-import logging
-
-logger = logging.getLogger(__name__)
+    return session.access_token if session and session.access_token else None
 
 
 @dataclass
@@ -145,13 +71,12 @@ class AuthResult:
 def build_client() -> Optional[Client]:
     """Return a Supabase client or None when env vars are missing."""
     try:
-        url = get_supabase_url()
-        key = get_supabase_key()
+        manager = get_client_manager()
     except Exception as e:
         logger.error(f"Error getting Supabase config: {e}")
         return None
     try:
-        return create_client(url, key)
+        return manager.client()
     except Exception as e:
         logger.error(f"Error creating Supabase client: {e}")
         return None
@@ -160,8 +85,9 @@ def build_client() -> Optional[Client]:
 class AuthService:
     """Wraps Supabase Auth + profile persistence with a graceful demo fallback."""
 
-    def __init__(self, client: Optional[Client] = None):
+    def __init__(self, client: Optional[Client] = None, store: Optional[LocalStore] = None):
         self.client = client or build_client()
+        self.store = store
         self.demo_mode = self.client is None
 
     def sign_in(self, email: str, password: str) -> Optional[AuthResult]:
@@ -189,45 +115,50 @@ class AuthService:
         return None
 
     def get_profile(self, user_id: str) -> Dict[str, Any]:
-        default_profile = {
-            "gender": "M",
-            "age": 28,
-            "height_cm": 175,
-            "weight_kg": 78.0,
-            "target_weight_kg": 72.0,
-            "goal": "Definir",
-            "activity_level": "Moderado",
-            "diet_type": "Estándar",
-        }
+        default_profile = DEFAULT_PROFILE.copy()
+        if self.store is not None:
+            saved = self.store.get_profile(user_id)
+            return _profile_from_row(saved) if saved else default_profile
         if self.demo_mode:
             return st.session_state.get("demo_profile", default_profile.copy())
+        cached = profile_cache.get(user_id)
+        if cached is NEGATIVE:
+            return default_profile
+        if cached is not MISS:
+            return dict(cached)
         try:
-            response = (
-                self.client.table("profiles")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("updated_at", desc=True)
-                .limit(1)
-                .execute()
+            # Concurrent misses for the same user (e.g. several tabs) share one request. The token is
+            # part of the key: row-level security makes the result specific to the caller's session.
+            token = _access_token(self.client)
+            key = query_key("profiles", filters={"user_id": user_id}, auth=token)
+            response = supabase_flight.do(
+                key,
+                lambda: read_guard.read(
+                    "profiles",
+                    key,
+                    lambda: self.client.table("profiles")
+                    .select("*")
+                    .eq("user_id", user_id)
+                    .order("updated_at", desc=True)
+                    .limit(1)
+                    .execute(),
+                ),
             )
             if response.data:
-                saved = response.data[0]
-                return {
-                    "gender": saved.get("gender", "M"),
-                    "age": saved.get("age", 28),
-                    "height_cm": int(saved.get("height_cm", 175)),
-                    "weight_kg": float(saved.get("weight_kg", 78.0)),
-                    "target_weight_kg": float(saved.get("target_weight_kg", 72.0)),
-                    "goal": saved.get("goal", "Definir"),
-                    "activity_level": saved.get("activity_level", "Moderado"),
-                    "diet_type": saved.get("diet_type", "Estándar"),
-                }
+                profile = _profile_from_row(response.data[0])
+                profile_cache.set(user_id, profile)
+                return dict(profile)
+            if token is not None:  # fetched under this session (see key), so the row really is missing
+                profile_cache.set_negative(user_id)
         except Exception as e:
             logger.error(f"Error fetching profile: {e}")
             pass
         return default_profile
 
     def upsert_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        if self.store is not None:
+            self.store.upsert_profile(user_id, profile)
+            return
         if self.demo_mode:
             st.session_state["demo_profile"] = profile
             return
@@ -246,5 +177,8 @@ class AuthService:
             self.client.table("profiles").upsert(payload, on_conflict="user_id").execute()
         except Exception as e:
             logger.error(f"Error upserting profile: {e}")
-            pass
+            # The write may or may not have landed; drop the entry rather than guess.
+            profile_cache.invalidate(user_id)
+            return
+        profile_cache.set(user_id, _profile_from_row(payload))
 
@@ -139,7 +139,14 @@ class GoalCalculator:
             return int(raw)
 
     @classmethod
-    def calculate_projection(cls, current_weight: float, target_weight: float, tdee: float, mode: str = "Moderado") -> ProjectionSnapshot:
+    def calculate_projection(
+        cls,
+        current_weight: float,
+        target_weight: float,
+        tdee: float,
+        mode: str = "Moderado",
+        exercise_kcal_daily: float = 0,
+    ) -> ProjectionSnapshot:
         """Calcula proyección de pérdida/ganancia de peso.
         
         Fórmula base:
@@ -151,7 +158,11 @@ class GoalCalculator:
         - Pérdida >1% peso corporal/semana: riesgo de pérdida muscular
         - Déficit >25% TDEE: riesgo metabólico
         - Objetivo >20kg en modo acelerado: insostenible
+
+        `exercise_kcal_daily`: gasto neto medio del plan de entrenamiento (ver app.training_energy),
+        sumado al TDEE.
         """
+        tdee = tdee + max(exercise_kcal_daily, 0)
         config = cls._resolve_mode(mode)
         is_loss = current_weight > target_weight
         weekly_rate = config.loss_rate if is_loss else config.gain_rate
@@ -224,7 +235,7 @@ class GoalCalculator:
         )
 
     @classmethod
-    def calculate_targets(cls, profile: Dict) -> Dict:
+    def calculate_targets(cls, profile: Dict, exercise_kcal_daily: float = 0) -> Dict:
         """Calcula BMR, TDEE, IMC y targets calóricos.
         
         Fórmulas:
@@ -233,6 +244,8 @@ class GoalCalculator:
           Mujeres: 10*peso + 6.25*altura - 5*edad - 161
         - TDEE: BMR * factor de actividad
         - IMC: peso / (altura_m)²
+        - Entrenamiento: `exercise_kcal_daily` (kcal netas/día del plan, ver app.training_energy)
+          se suma al TDEE
         """
         gender = profile.get("gender", "M")
         weight_kg = float(profile.get("weight_kg", 70))
@@ -246,6 +259,8 @@ class GoalCalculator:
         
         # TDEE = BMR * factor de actividad
         tdee = bmr * cls.activity_factor(activity)
+        exercise_kcal = int(max(exercise_kcal_daily, 0))
+        tdee += exercise_kcal
         
         # Ajuste por objetivo
         goal_adj = {
@@ -281,6 +296,7 @@ class GoalCalculator:
         return {
             "bmr": int(bmr),
             "tdee": int(tdee),
+            "exercise_kcal": exercise_kcal,
             "kcal_target": int(kcal_target),
             "protein_g": protein_g,
             "fat_g": fat_g,
@@ -355,16 +371,18 @@ class GoalCalculator:
 
 # Wrappers conservan compatibilidad
 
-def calculate_projection_v2(current_weight, target_weight, tdee, mode="Moderado"):
-    return GoalCalculator.calculate_projection(current_weight, target_weight, tdee, mode=mode).to_dict()
+def calculate_projection_v2(current_weight, target_weight, tdee, mode="Moderado", exercise_kcal_daily=0):
+    return GoalCalculator.calculate_projection(
+        current_weight, target_weight, tdee, mode=mode, exercise_kcal_daily=exercise_kcal_daily
+    ).to_dict()
 
 
 def macro_targets(weight_kg: float, kcal_target: int) -> Dict[str, int]:
     return GoalCalculator.macro_targets(weight_kg, kcal_target).to_dict()
 
 
-def calculate_targets(profile: Dict) -> Dict:
-    return GoalCalculator.calculate_targets(profile)
+def calculate_targets(profile: Dict, exercise_kcal_daily: float = 0) -> Dict:
+    return GoalCalculator.calculate_targets(profile, exercise_kcal_daily=exercise_kcal_daily)
 
 
 def adjusted_macros_by_diet(profile: Dict, targets: Dict, diet_type: str) -> Dict:
@@ -0,0 +1,250 @@
+"""Process-wide, versioned cache for the reference catalogs (foods, exercises).
+
+Catalogs change a few times a month, so each process keeps one in-memory snapshot and only
+asks Supabase for the catalog's version (one row in `catalog_versions`, bumped by trigger).
+Readers always get the current snapshot immediately; when a probe finds a new version the
+reload runs on a background thread and the snapshot is swapped atomically
+(stale-while-revalidate). Each snapshot carries a `version` token, and `derived()` lets
+consumers such as search, recipes or substitutions rebuild their own indexes lazily when
+that token changes.
+
+Snapshots are loaded with `read_foods` / `read_exercises`, which page past the PostgREST row
+cap, so a snapshot holds the whole catalog. Nothing reads through this cache yet: the Python
+exercise modules work from the local snapshot files and the food screens live in the web app;
+new server-side catalog consumers should use `get_catalog()` instead of querying Supabase.
+"""
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.config import get_catalog_cache_budget_mb
+from app.exercise_repository import read_exercises
+from app.food_repository import read_foods
+from app.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+
+PROBE_INTERVAL = 60.0
+# Without a version row the snapshot is simply reloaded after this long.
+UNVERSIONED_MAX_AGE = 3600.0
+
+
+def probe_catalog_version(catalog: str) -> Optional[str]:
+    """Current version token of `catalog`, or None if it can't be determined."""
+    response = (
+        get_supabase_client()
+        .table("catalog_versions")
+        .select("version")
+        .eq("catalog", catalog)
+        .limit(1)
+        .execute()
+    )
+    return str(response.data[0]["version"]) if response.data else None
+
+
+def estimate_bytes(rows: List[Row], sample: int = 200) -> int:
+    """Approximate resident size of a list of flat dict rows (sampled deep getsizeof)."""
+    if not rows:
+        return sys.getsizeof(rows)
+    step = max(len(rows) // sample, 1)
+    picked = rows[::step]
+    total = 0
+    for row in picked:
+        total += sys.getsizeof(row)
+        for key, value in row.items():
+            total += sys.getsizeof(key) + sys.getsizeof(value)
+    return int(total * len(rows) / len(picked)) + sys.getsizeof(rows)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    rows: List[Row]
+    loaded_at: float
+    nbytes: int
+
+
+@dataclass
+class _Derived:
+    version: Optional[str] = None
+    value: Any = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class CatalogCache:
+    """Read-through snapshot of one catalog with background revalidation."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], List[Row]],
+        probe: Optional[Callable[[], Optional[str]]] = None,
+        probe_interval: float = PROBE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._loader = loader
+        self._probe = probe if probe is not None else (lambda: probe_catalog_version(name))
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_probe = 0.0
+        self._derived: Dict[str, _Derived] = {}
+        self.loads = self.probes = self.refreshes = self.errors = 0
+
+    # -- reads ---------------------------------------------------------------------------
+    def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot; loads synchronously only on the very first read."""
+        snap = self._snapshot
+        if snap is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load(self._safe_probe())
+                snap = self._snapshot
+        else:
+            self._maybe_revalidate()
+        return snap
+
+    def rows(self) -> List[Row]:
+        return self.snapshot().rows
+
+    @property
+    def version(self) -> str:
+        return self.snapshot().version
+
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def derived(self, key: str, build: Callable[[List[Row]], Any]) -> Any:
+        """`build(rows)` memoized per catalog version; rebuilt lazily after a version change."""
+        snap = self.snapshot()
+        slot = self._derived.setdefault(key, _Derived())
+        if slot.version != snap.version:
+            with slot.lock:
+                if slot.version != snap.version:
+                    slot.value = build(snap.rows)
+                    slot.version = snap.version
+        return slot.value
+
+    # -- refresh -------------------------------------------------------------------------
+    def _safe_probe(self) -> Optional[str]:
+        self.probes += 1
+        self._last_probe = self._clock()
+        try:
+            return self._probe()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error probing {self.name} catalog version: {e}")
+            return None
+
+    def _load(self, version: Optional[str]) -> CatalogSnapshot:
+        rows = self._loader()
+        self.loads += 1
+        now = self._clock()
+        # Unversioned snapshots get a time-based token so derived indexes still roll over.
+        token = version if version is not None else f"t{int(now)}"
+        return CatalogSnapshot(version=token, rows=rows, loaded_at=now, nbytes=estimate_bytes(rows))
+
+    def _maybe_revalidate(self) -> None:
+        if self._refreshing or self._clock() - self._last_probe < self.probe_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._last_probe = self._clock()
+        threading.Thread(target=self._revalidate, name=f"catalog-refresh-{self.name}", daemon=True).start()
+
+    def _revalidate(self) -> None:
+        try:
+            current = self._snapshot
+            version = self._safe_probe()
+            if current is not None:
+                if version is not None and version == current.version:
+                    return
+                if version is None and self._clock() - current.loaded_at < UNVERSIONED_MAX_AGE:
+                    return
+            self.refreshes += 1
+            snapshot = self._load(version)
+            with self._lock:
+                self._snapshot = snapshot
+        except Exception as e:
+            # Keep serving the old snapshot; the next probe retries.
+            self.errors += 1
+            logger.error(f"Error refreshing {self.name} catalog: {e}")
+        finally:
+            self._refreshing = False
+
+    def refresh(self) -> CatalogSnapshot:
+        """Reload now, blocking (e.g. right after an ingest script)."""
+        snapshot = self._load(self._safe_probe())
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def drop(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._derived.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "loaded": snap is not None,
+            "version": snap.version if snap else None,
+            "rows": len(snap.rows) if snap else 0,
+            "bytes": snap.nbytes if snap else 0,
+            "loads": self.loads,
+            "probes": self.probes,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+# Loaders must return the full catalog (both readers page by id until an empty page).
+CATALOGS: Dict[str, CatalogCache] = {
+    "foods": CatalogCache("foods", read_foods),
+    "exercises": CatalogCache("exercises", read_exercises),
+}
+
+
+def get_catalog(name: str) -> CatalogCache:
+    return CATALOGS[name]
+
+
+def warm_catalogs(names: Optional[Iterable[str]] = None, budget_mb: Optional[int] = None) -> Dict[str, str]:
+    """Preload catalogs in order until the memory budget is spent.
+
+    A catalog that would exceed the remaining budget is dropped again and stays lazy (it loads
+    on first read). Returns a status per catalog: "warm", "over_budget" or "error".
+    """
+    budget = (get_catalog_cache_budget_mb() if budget_mb is None else budget_mb) * 1024 * 1024
+    used = sum(cache.stats()["bytes"] for cache in CATALOGS.values())
+    status: Dict[str, str] = {}
+    for name in names or list(CATALOGS):
+        cache = CATALOGS[name]
+        if cache.is_loaded():
+            status[name] = "warm"
+            continue
+        try:
+            nbytes = cache.snapshot().nbytes
+        except Exception as e:
+            logger.error(f"Error warming {name} catalog: {e}")
+            status[name] = "error"
+            continue
+        if used + nbytes > budget:
+            cache.drop()
+            status[name] = "over_budget"
+            continue
+        used += nbytes
+        status[name] = "warm"
+    return status
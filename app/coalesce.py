@@ -0,0 +1,129 @@
+"""Single-flight coalescing for identical concurrent backend reads.
+
+When several threads (Streamlit sessions) or tasks ask for the same query at the same time,
+only the first caller (the leader) hits Supabase; the others wait and receive the leader's
+result or exception. Nothing is cached once the call completes, so results are never staler
+than an uncoalesced read started at the same moment. Callers must treat results as shared and
+copy before mutating.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+
+def query_key(table: str, columns: str = "*", filters: Optional[Mapping[str, Any]] = None, **extra: Any) -> Tuple:
+    """Hashable identity of a read: table, columns, filters and any modifiers (limit, order...)."""
+    return (
+        table,
+        columns,
+        tuple(sorted((k, repr(v)) for k, v in (filters or {}).items())),
+        tuple(sorted((k, repr(v)) for k, v in extra.items())),
+    )
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.upstream: Dict[str, int] = defaultdict(int)
+
+    def record(self, key: Hashable, leader: bool) -> None:
+        table = key[0] if isinstance(key, tuple) and key else str(key)
+        with self._lock:
+            self.calls[table] += 1
+            if leader:
+                self.upstream[table] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            per_table = {
+                table: {"calls": calls, "upstream": self.upstream[table], "saved": calls - self.upstream[table]}
+                for table, calls in self.calls.items()
+            }
+        calls = sum(t["calls"] for t in per_table.values())
+        upstream = sum(t["upstream"] for t in per_table.values())
+        return {"calls": calls, "upstream": upstream, "saved": calls - upstream, "tables": per_table}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-based coalescer: `flight.do(key, fn)` runs `fn` once per in-flight key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = _Stats()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._stats.record(key, leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats.snapshot()
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of `SingleFlight`; coalesces per event loop."""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self._stats = _Stats()
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        slot = (id(asyncio.get_running_loop()), key)
+        future = self._calls.get(slot)
+        self._stats.record(key, future is None)
+        if future is not None:
+            # shield: a cancelled waiter must not cancel the leader's request for everyone else.
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(factory())
+        self._calls[slot] = future
+        future.add_done_callback(lambda _f: self._calls.pop(slot, None))
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats.snapshot()
+
+
+# Shared by the synchronous repositories/services and by AsyncPostgrest respectively.
+supabase_flight = SingleFlight()
+async_supabase_flight = AsyncSingleFlight()
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """Saved-call counters for both coalescers, e.g. for a diagnostics panel."""
+    return {"sync": supabase_flight.stats(), "async": async_supabase_flight.stats()}
@@ -37,3 +37,14 @@ def get_foods_api_timeout() -> int:
 
 
 
+
+
+def get_catalog_cache_budget_mb() -> int:
+    raw_budget = os.getenv("CATALOG_CACHE_BUDGET_MB", "").strip()
+    if not raw_budget:
+        return 64
+    try:
+        budget = int(raw_budget)
+    except ValueError as exc:  # pragma: no cover - defensive
+        raise ValueError("CATALOG_CACHE_BUDGET_MB must be an integer") from exc
+    return max(budget, 0)
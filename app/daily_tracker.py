@@ -1,149 +1,157 @@
-"""Daily tracking helpers with Supabase persistence."""
+"""Daily tracking helpers with Supabase persistence and a session-state demo fallback."""
 from __future__ import annotations
 
-from datetime import date, datetime, timezone
-from typing import Any, Dict, List, Tuple
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import streamlit as st
 import logging
+import threading
+from datetime import datetime, timezone
+
+from app.cache import MISS, TTLCache
+from app.local_store import LocalStore
+from app.resilience import read_guard
 
 logger = logging.getLogger(__name__)
 
+# meal_entries column -> key used by day_summary
+MEAL_TOTAL_FIELDS = {"calories": "kcal", "protein_g": "protein_g", "carbs_g": "carbs_g", "fat_g": "fat_g"}
+MEAL_RANGE_COLUMNS = ("log_date", "meal_type", "food_name", "grams", "calories", "protein_g", "carbs_g", "fat_g")
+# day_summary key -> daily_logs rollup column (kept in sync by the apply_meal_entry_rollup trigger)
+ROLLUP_FIELDS = {"kcal": "calories_consumed", "protein_g": "protein_g", "carbs_g": "carbs_g", "fat_g": "fat_g"}
 
-class DailyTracker:
-    def __init__(self, client=None):
-        self.client = client
+# Running totals per (user_id, log_date), shared by every tracker in the process. The short TTL
+# bounds staleness from writes this process doesn't see (web app, other workers, sync pulls).
+day_totals_cache = TTLCache(maxsize=4096, ttl=30.0)
+# Guards cached totals, patches and fills; `_day_totals_changes` counts local changes so a fill
+# whose read raced a change is not cached.
+_day_totals_lock = threading.Lock()
+_day_totals_changes = 0
 
-    def _today(self) -> date:
-        return datetime.now(timezone.utc).date()
-
-    def list_logs(self, user_id: str, limit: int = 30) -> List[Dict]:
-        if not self.client:
-            return []
-        try:
-            resp = (
-                self.client.table("daily_logs")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("log_date", desc=True)
-                .limit(limit)
-                .execute()
-            )
-            return resp.data or []
-        except Exception as e:
-            logger.error(f"Error listing logs: {e}")
-            return []
 
-    def upsert_log(self, user_id: str, payload: Dict[str, Any]) -> None:
-        if not self.client:
+def _change_day_totals(key: Tuple[str, str], delta: Optional[Dict[str, float]] = None) -> None:
+    """Patch a cached day with `delta`, or drop it when no delta is given."""
+    global _day_totals_changes
+    with _day_totals_lock:
+        _day_totals_changes += 1
+        cached = day_totals_cache.get(key)
+        if cached is MISS:
             return
-        payload = payload.copy()
-        payload.setdefault("log_date", self._today().isoformat())
-        payload["user_id"] = user_id
-        try:
-            self.client.table("daily_logs").upsert(payload, on_conflict="user_id,log_date").execute()
-        except Exception as e:
-            logger.error(f"Error upserting log: {e}")
-            pass
-
-    def add_meal_entry(
-        self, user_id: str, log_date: date, meal_type: str, name: str, grams: float, macros: Dict[str, Any]
-    ) -> None:
-        if not self.client:
+        if delta is None:
+            day_totals_cache.invalidate(key)
             return
-        entry = {
-            "user_id": user_id,
-            "log_date": log_date.isoformat(),
-            "meal_type": meal_type,
-            "food_name": name,
-            "grams": grams,
-            "calories": macros.get("kcal"),
-            "protein_g": macros.get("protein_g"),
-            "carbs_g": macros.get("carbs_g"),
-            "fat_g": macros.get("fat_g"),
-        }
-        try:
-            self.client.table("meal_entries").insert(entry).execute()
-        except Exception as e:
-            logger.error(f"Error adding meal entry: {e}")
-            pass
+        for name, value in delta.items():
+            cached[name] += value
 
-    def list_meal_entries(self, user_id: str, log_date: date) -> List[Dict]:
-        if not self.client:
-            return []
-        try:
-            resp = (
-                self.client.table("meal_entries")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("log_date", log_date.isoformat())
-                .order("created_at", desc=True)
-                .execute()
-            )
-            return resp.data or []
-        except Exception as e:
-            logger.error(f"Error listing meal entries: {e}")
-            return []
 
-    def day_summary(self, entries: List[Dict]) -> Dict[str, float]:
-        protein = sum(e.get("protein_g", 0) or 0 for e in entries)
-        carbs = sum(e.get("carbs_g", 0) or 0 for e in entries)
-        fat = sum(e.get("fat_g", 0) or 0 for e in entries)
-        kcal = sum(e.get("calories", 0) or 0 for e in entries)
-        return {"protein_g": protein, "carbs_g": carbs, "fat_g": fat, "kcal": kcal}
+def _empty_summary() -> Dict[str, float]:
+    return {key: 0.0 for key in MEAL_TOTAL_FIELDS.values()}
 
-    def adherence(self, logs: List[Dict], kcal_target: float) -> Tuple[float, float]:
-        if not logs:
-            return 0, 0
-        completed = sum(1 for log in logs if abs((log.get("calories_consumed") or 0) - kcal_target) <= kcal_target * 0.1)
-        ratio = completed / len(logs)
-        return ratio * 100, len(logs)
-from __future__ import annotations
 
-from datetime import date
-from typing import Any, Dict, List, Tuple
+def _entry_macros(entry: Dict[str, Any]) -> Dict[str, float]:
+    return {key: float(entry.get(col) or 0) for col, key in MEAL_TOTAL_FIELDS.items()}
 
-import streamlit as st
-import logging
-from datetime import datetime, timezone
 
-logger = logging.getLogger(__name__)
+def summarize_by_day(entries: List[Dict], start: date, end: date) -> Dict[str, Dict[str, float]]:
+    """Per-day macro totals for [start, end] in one vectorized groupby.
+
+    Days without entries are included with zeros so charts get a continuous axis.
+    """
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    if not entries:
+        return {day: _empty_summary() for day in days}
+    fields = list(MEAL_TOTAL_FIELDS)
+    frame = pd.DataFrame(entries, columns=["log_date", *fields])
+    frame[fields] = frame[fields].apply(pd.to_numeric, errors="coerce").fillna(0)
+    totals = (
+        frame.groupby(frame["log_date"].astype(str).str[:10], sort=False)[fields]
+        .sum()
+        .reindex(days, fill_value=0)
+        .rename(columns=MEAL_TOTAL_FIELDS)
+    )
+    return {day: {key: float(value) for key, value in row.items()} for day, row in totals.to_dict("index").items()}
 
 
 class DailyTracker:
-    def __init__(self, client=None, demo_mode: bool = False):
+    """Daily logs and meal entries.
+
+    With a `LocalStore` every read and write is served from SQLite (a `SyncWorker` keeps it in
+    step with Supabase); without one, Supabase is queried directly, or session state in demo mode.
+    """
+
+    def __init__(self, client=None, demo_mode: bool = False, store: Optional[LocalStore] = None):
         self.client = client
-        self.demo_mode = demo_mode or client is None
+        self.store = store
+        self.demo_mode = (demo_mode or client is None) and store is None
         st.session_state.setdefault("demo_logs", [])
         st.session_state.setdefault("demo_meals", [])
+        st.session_state.setdefault("demo_meal_seq", 0)
 
     def _today(self) -> date:
         return datetime.now(timezone.utc).date()
 
     def list_logs(self, user_id: str, limit: int = 30) -> List[Dict]:
+        if self.store is not None:
+            return self.store.list_logs(user_id, limit)
         if self.demo_mode:
             return sorted(st.session_state["demo_logs"], key=lambda x: x["log_date"], reverse=True)[:limit]
         try:
-            resp = (
-                self.client.table("daily_logs")
+            resp = read_guard.read(
+                "daily_logs",
+                ("list_logs", user_id, limit),
+                lambda: self.client.table("daily_logs")
                 .select("*")
                 .eq("user_id", user_id)
                 .order("log_date", desc=True)
                 .limit(limit)
-                .execute()
+                .execute(),
             )
             return resp.data or []
         except Exception as e:
             logger.error(f"Error listing logs: {e}")
             return []
 
+    def list_log_history(self, user_id: str, page_size: int = 1000) -> List[Dict]:
+        """Every daily_logs row for the user, oldest first, paged past the PostgREST row cap."""
+        if self.store is not None:
+            return self.store.list_logs(user_id, limit=None, ascending=True)
+        if self.demo_mode:
+            return sorted(st.session_state["demo_logs"], key=lambda x: x["log_date"])
+        logs: List[Dict] = []
+        try:
+            while True:
+                resp = (
+                    self.client.table("daily_logs")
+                    .select("*")
+                    .eq("user_id", user_id)
+                    .order("log_date")
+                    .range(len(logs), len(logs) + page_size - 1)
+                    .execute()
+                )
+                if not resp.data:
+                    return logs
+                logs.extend(resp.data)
+        except Exception as e:
+            logger.error(f"Error listing log history: {e}")
+            return logs
+
     def upsert_log(self, user_id: str, payload: Dict[str, Any]) -> None:
         payload = payload.copy()
         payload.setdefault("log_date", self._today().isoformat())
+        if self.store is not None:
+            _change_day_totals((user_id, payload["log_date"]))
+            self.store.upsert_log(user_id, payload)
+            return
         if self.demo_mode:
             payload["user_id"] = user_id
             st.session_state["demo_logs"] = [log for log in st.session_state["demo_logs"] if log["log_date"] != payload["log_date"]]
             st.session_state["demo_logs"].append(payload)
             return
         payload["user_id"] = user_id
+        if any(col in payload for col in ROLLUP_FIELDS.values()):
+            _change_day_totals((user_id, payload["log_date"]))
         try:
             self.client.table("daily_logs").upsert(payload, on_conflict="user_id,log_date").execute()
         except Exception as e:
@@ -164,32 +172,195 @@ class DailyTracker:
             "carbs_g": macros.get("carbs_g"),
             "fat_g": macros.get("fat_g"),
         }
+        if self.store is not None:
+            self.store.add_meal_entry(entry)
+            self._apply_meal_delta(user_id, entry["log_date"], _entry_macros(entry))
+            return
         if self.demo_mode:
-            st.session_state["demo_meals"].append(entry)
+            st.session_state["demo_meal_seq"] += 1
+            st.session_state["demo_meals"].append({**entry, "id": st.session_state["demo_meal_seq"]})
+            self._apply_meal_delta(user_id, entry["log_date"], _entry_macros(entry))
             return
         try:
             self.client.table("meal_entries").insert(entry).execute()
         except Exception as e:
             logger.error(f"Error adding meal entry: {e}")
-            pass
+            return
+        self._apply_meal_delta(user_id, entry["log_date"], _entry_macros(entry))
+
+    def update_meal_entry(self, user_id: str, entry: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        """Edit a listed meal entry; `changes` uses meal_entries column names."""
+        updated = {**entry, **changes}
+        if self.store is not None:
+            self.store.update_meal_entry(user_id, entry["id"], changes)
+        elif self.demo_mode:
+            st.session_state["demo_meals"] = [
+                updated if e.get("id") == entry.get("id") else e for e in st.session_state["demo_meals"]
+            ]
+        else:
+            try:
+                self.client.table("meal_entries").update(changes).eq("id", entry["id"]).eq("user_id", user_id).execute()
+            except Exception as e:
+                logger.error(f"Error updating meal entry: {e}")
+                return
+        old_macros = _entry_macros(entry)
+        self._apply_meal_delta(user_id, entry["log_date"], {key: -value for key, value in old_macros.items()})
+        self._apply_meal_delta(user_id, updated["log_date"], _entry_macros(updated))
+
+    def delete_meal_entry(self, user_id: str, entry: Dict[str, Any]) -> None:
+        if self.store is not None:
+            self.store.delete_meal_entry(user_id, entry["id"])
+        elif self.demo_mode:
+            st.session_state["demo_meals"] = [e for e in st.session_state["demo_meals"] if e.get("id") != entry.get("id")]
+        else:
+            try:
+                self.client.table("meal_entries").delete().eq("id", entry["id"]).eq("user_id", user_id).execute()
+            except Exception as e:
+                logger.error(f"Error deleting meal entry: {e}")
+                return
+        macros = _entry_macros(entry)
+        self._apply_meal_delta(user_id, entry["log_date"], {key: -value for key, value in macros.items()})
+
+    def _apply_meal_delta(self, user_id: str, log_date: str, delta: Dict[str, float]) -> None:
+        """Apply a meal entry change to the running totals.
+
+        In Supabase the daily_logs rollup is updated by the apply_meal_entry_rollup trigger in the
+        same transaction as the entry; here we only patch the in-process copy (if cached) and,
+        in demo mode, the session-state log so adherence sees the same numbers.
+        """
+        _change_day_totals((user_id, log_date), delta)
+        if self.demo_mode:
+            log = next((log for log in st.session_state["demo_logs"] if log["log_date"] == log_date), None)
+            if log is None:
+                log = {"user_id": user_id, "log_date": log_date}
+                st.session_state["demo_logs"].append(log)
+            for key, col in ROLLUP_FIELDS.items():
+                log[col] = (log.get(col) or 0) + delta[key]
+
+    def day_totals(self, user_id: str, log_date: date) -> Dict[str, float]:
+        """Running totals for one day: an in-process lookup, or a single rollup row read on a miss."""
+        key = (user_id, log_date.isoformat())
+        with _day_totals_lock:
+            cached = day_totals_cache.get(key)
+            if cached is not MISS:
+                return dict(cached)
+            changes = _day_totals_changes
+        if self.store is not None:
+            rollup = self.store.day_totals(user_id, log_date.isoformat())
+            totals = {key: rollup[col] for key, col in ROLLUP_FIELDS.items()}
+        elif self.demo_mode:
+            summary = self.day_summary(self.list_meal_entries(user_id, log_date))
+            totals = {key: float(value) for key, value in summary.items()}
+        else:
+            try:
+                resp = read_guard.read(
+                    "daily_logs",
+                    ("day_totals", key),
+                    lambda: self.client.table("daily_logs")
+                    .select(",".join(ROLLUP_FIELDS.values()))
+                    .eq("user_id", user_id)
+                    .eq("log_date", log_date.isoformat())
+                    .limit(1)
+                    .execute(),
+                )
+            except Exception as e:
+                logger.error(f"Error reading daily totals: {e}")
+                return self.day_summary(self.list_meal_entries(user_id, log_date))
+            row = (resp.data or [{}])[0]
+            totals = {key: float(row.get(col) or 0) for key, col in ROLLUP_FIELDS.items()}
+        with _day_totals_lock:
+            # A meal change during the read may be missing from `totals`: serve it, don't cache it.
+            if _day_totals_changes == changes:
+                day_totals_cache.set(key, dict(totals))
+        return totals
 
     def list_meal_entries(self, user_id: str, log_date: date) -> List[Dict]:
+        if self.store is not None:
+            return self.store.list_meal_entries(user_id, log_date.isoformat())
         if self.demo_mode:
             return [e for e in st.session_state["demo_meals"] if e["log_date"] == log_date.isoformat()]
         try:
-            resp = (
-                self.client.table("meal_entries")
+            resp = read_guard.read(
+                "meal_entries",
+                ("list_meal_entries", user_id, log_date.isoformat()),
+                lambda: self.client.table("meal_entries")
                 .select("*")
                 .eq("user_id", user_id)
                 .eq("log_date", log_date.isoformat())
                 .order("created_at", desc=True)
-                .execute()
+                .execute(),
             )
             return resp.data or []
         except Exception as e:
             logger.error(f"Error listing meal entries: {e}")
             return []
 
+    def list_meal_entries_range(
+        self,
+        user_id: str,
+        start: date,
+        end: date,
+        columns: Sequence[str] = MEAL_RANGE_COLUMNS,
+        page_size: int = 1000,
+    ) -> Tuple[List[Dict], Dict[str, Dict[str, float]]]:
+        """Fetch all meal entries in [start, end], paged past the PostgREST row cap, plus per-day totals.
+
+        Replaces one `list_meal_entries` + `day_summary` round trip per day in week/month views.
+        Callers that only need the totals should use `daily_totals_range`.
+        """
+        columns = list(dict.fromkeys(["log_date", *columns, *MEAL_TOTAL_FIELDS]))
+        if self.store is not None:
+            entries = self.store.list_meal_entries_range(user_id, start.isoformat(), end.isoformat(), columns)
+            return entries, summarize_by_day(entries, start, end)
+        if self.demo_mode:
+            entries = [
+                {col: e.get(col) for col in columns}
+                for e in st.session_state["demo_meals"]
+                if start.isoformat() <= e["log_date"] <= end.isoformat()
+            ]
+            return entries, summarize_by_day(entries, start, end)
+        entries: List[Dict] = []
+        try:
+            while True:
+                resp = (
+                    self.client.table("meal_entries")
+                    .select(",".join(columns))
+                    .eq("user_id", user_id)
+                    .gte("log_date", start.isoformat())
+                    .lte("log_date", end.isoformat())
+                    .order("log_date")
+                    .order("id")
+                    .range(len(entries), len(entries) + page_size - 1)
+                    .execute()
+                )
+                if not resp.data:
+                    break
+                entries.extend(resp.data)
+        except Exception as e:
+            logger.error(f"Error listing meal entries range: {e}")
+            entries = []
+        return entries, summarize_by_day(entries, start, end)
+
+    def daily_totals_range(self, user_id: str, start: date, end: date) -> Dict[str, Dict[str, float]]:
+        """Per-day totals aggregated server-side by the `meal_daily_totals` RPC.
+
+        Falls back to fetching the entries and grouping locally when the RPC is not deployed.
+        """
+        if not self.demo_mode and self.store is None:
+            try:
+                resp = self.client.rpc(
+                    "meal_daily_totals",
+                    {"p_user_id": user_id, "p_start": start.isoformat(), "p_end": end.isoformat()},
+                ).execute()
+                totals = summarize_by_day([], start, end)
+                for row in resp.data or []:
+                    totals[str(row["log_date"])[:10]] = {key: float(row.get(key) or 0) for key in MEAL_TOTAL_FIELDS.values()}
+                return totals
+            except Exception as e:
+                logger.warning(f"meal_daily_totals RPC unavailable, aggregating locally: {e}")
+        _, totals = self.list_meal_entries_range(user_id, start, end, columns=("log_date",))
+        return totals
+
     def day_summary(self, entries: List[Dict]) -> Dict[str, float]:
         protein = sum(e.get("protein_g", 0) or 0 for e in entries)
         carbs = sum(e.get("carbs_g", 0) or 0 for e in entries)
@@ -0,0 +1,228 @@
+"""In-process query engine over the enriched exercise catalog.
+
+Built once from the compiled snapshot (`app.exercise_snapshot`). Every categorical value
+(equipment, main/secondary muscle, movement pattern, group, plane, level) gets a bitset of the
+rows that carry it, stored as a Python int so AND/OR/NOT run in C over ~30 machine words. Each
+score in `puntuaciones_1a5` keeps its rows sorted by value plus one cumulative bitset per
+distinct value ("score >= v"), so any range predicate is one or two bitset operations. A
+combined filter is therefore a handful of integer ops (microseconds), and top-k ranking by a
+weighted score expression runs on numpy over the matching rows only.
+
+    index = get_exercise_index()
+    mask = index.mask(equipment_within={"mancuernas", "peso corporal"}, muscles={"pectoral mayor"},
+                      max_level="intermedio", scores={"injury_risk": (None, 3)})
+    rows = index.top_k(mask, {"hypertrophy_potential": 1.0, "injury_risk": -0.5}, k=5)
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.exercise_snapshot import LIST_FIELDS, ExerciseSnapshot, load_exercise_snapshot
+
+LEVEL_ORDER = ("principiante", "intermedio", "avanzado")
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def bits_from_rows(rows: Iterable[int], n: int) -> int:
+    """Bitset (Python int, bit i = row i) of the given row indices."""
+    flags = np.zeros(n, dtype=bool)
+    flags[np.asarray(list(rows) if not isinstance(rows, np.ndarray) else rows, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def csr_rows(offsets: np.ndarray) -> np.ndarray:
+    """Row index of every code in a CSR codes array."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets.astype(np.int64)))
+
+
+class ExerciseIndex:
+    def __init__(self, snapshot: ExerciseSnapshot):
+        self.snapshot = snapshot
+        self.n = n = len(snapshot)
+        self.all = (1 << n) - 1
+        self._nbytes = (n + 7) // 8
+        self.ids = np.asarray(snapshot.ids)
+        self.scores = np.asarray(snapshot.scores, dtype=np.float32)
+        self.score_keys = list(snapshot.score_keys)
+
+        # facet -> value -> bitset
+        self.facets: Dict[str, Dict[str, int]] = {}
+        for facet, field in (
+            ("equipment", "equipamiento"),
+            ("muscles", "musculos_principales"),
+            ("secondary_muscles", "musculos_secundarios"),
+            ("modifiers", "modificadores"),
+            ("goals", "objetivos_tipicos"),
+        ):
+            offsets, codes = snapshot.lists(field)
+            self.facets[facet] = self._facet(csr_rows(offsets), np.asarray(codes), snapshot.vocab[LIST_FIELDS[field]])
+        for facet, field, vocab in (
+            ("patterns", "patron_movimiento_id", "patterns"),
+            ("groups", "grupo", "groups"),
+            ("planes", "plano", "planes"),
+            ("levels", "nivel_dificultad", "levels"),
+        ):
+            codes = np.asarray(snapshot.column(field))
+            self.facets[facet] = self._facet(np.arange(n), codes, snapshot.vocab[vocab])
+        self._within_cache: Dict[frozenset, int] = {}
+
+        # score -> (sorted distinct values, cumulative bitsets where bitsets[j] = rows with score >= values[j])
+        self.sorted_rows: Dict[str, np.ndarray] = {}
+        self._thresholds: Dict[str, Tuple[np.ndarray, List[int]]] = {}
+        for col, key in enumerate(self.score_keys):
+            column = self.scores[:, col]
+            order = np.argsort(column, kind="stable")
+            self.sorted_rows[key] = order
+            values = np.unique(column[column >= 0])
+            sorted_values = column[order]
+            cumulative = [bits_from_rows(order[np.searchsorted(sorted_values, v, side="left"):], n) for v in values]
+            self._thresholds[key] = (values, cumulative)
+        self._weighted_orders: Dict[Tuple, np.ndarray] = {}
+
+    def _facet(self, rows: np.ndarray, codes: np.ndarray, vocab: Sequence[str]) -> Dict[str, int]:
+        facet: Dict[str, int] = {}
+        for code, value in enumerate(vocab):
+            hits = rows[codes == code]
+            if len(hits):
+                facet[value] = bits_from_rows(hits, self.n)
+        return facet
+
+    # -- predicates ------------------------------------------------------------------------
+    def any_of(self, facet: str, values: Iterable[str]) -> int:
+        table = self.facets[facet]
+        bits = 0
+        for value in values:
+            bits |= table.get(value, 0)
+        return bits
+
+    def equipment_within(self, available: Iterable[str]) -> int:
+        """Rows whose every required equipment item is in `available` (bodyweight-only rows included)."""
+        available = frozenset(available)
+        bits = self._within_cache.get(available)
+        if bits is None:
+            blocked = 0
+            for value, value_bits in self.facets["equipment"].items():
+                if value not in available:
+                    blocked |= value_bits
+            bits = self._within_cache[available] = self.all & ~blocked
+        return bits
+
+    def score_range(self, key: str, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Rows with low <= score <= high (either bound optional)."""
+        values, cumulative = self._thresholds[key]
+        bits = self.all
+        if low is not None:
+            j = int(np.searchsorted(values, low, side="left"))
+            bits = cumulative[j] if j < len(values) else 0
+        if high is not None:
+            j = int(np.searchsorted(values, high, side="right"))
+            if j < len(values):
+                bits &= ~cumulative[j]
+        return bits
+
+    def max_level(self, level: str) -> int:
+        allowed = LEVEL_ORDER[: LEVEL_ORDER.index(level) + 1]
+        return self.any_of("levels", allowed)
+
+    def rows_bits(self, rows: Iterable[int]) -> int:
+        return bits_from_rows(list(rows), self.n)
+
+    def ids_bits(self, exercise_ids: Iterable[int]) -> int:
+        rows = [self.snapshot.index_of(int(i)) for i in exercise_ids]
+        return bits_from_rows([r for r in rows if r is not None], self.n)
+
+    def mask(
+        self,
+        equipment: Optional[Iterable[str]] = None,
+        equipment_within: Optional[Iterable[str]] = None,
+        muscles: Optional[Iterable[str]] = None,
+        secondary_muscles: Optional[Iterable[str]] = None,
+        patterns: Optional[Iterable[str]] = None,
+        groups: Optional[Iterable[str]] = None,
+        planes: Optional[Iterable[str]] = None,
+        levels: Optional[Iterable[str]] = None,
+        max_level: Optional[str] = None,
+        goals: Optional[Iterable[str]] = None,
+        scores: Optional[Mapping[str, Range]] = None,
+        exclude: int = 0,
+        within: Optional[int] = None,
+    ) -> int:
+        """AND of the given predicates; each iterable predicate matches any of its values."""
+        bits = self.all if within is None else within
+        for facet, values in (
+            ("equipment", equipment),
+            ("muscles", muscles),
+            ("secondary_muscles", secondary_muscles),
+            ("patterns", patterns),
+            ("groups", groups),
+            ("planes", planes),
+            ("levels", levels),
+            ("goals", goals),
+        ):
+            if values is not None:
+                bits &= self.any_of(facet, (values,) if isinstance(values, str) else values)
+        if equipment_within is not None:
+            bits &= self.equipment_within(equipment_within)
+        if max_level is not None:
+            bits &= self.max_level(max_level)
+        for key, (low, high) in (scores or {}).items():
+            bits &= self.score_range(key, low, high)
+        return bits & ~exclude
+
+    # -- results ---------------------------------------------------------------------------
+    def flags(self, bits: int) -> np.ndarray:
+        """Boolean row array of a bitset."""
+        raw = np.frombuffer(bits.to_bytes(self._nbytes, "little"), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little", count=self.n).astype(bool)
+
+    def rows(self, bits: int) -> np.ndarray:
+        return np.flatnonzero(self.flags(bits))
+
+    def exercise_ids(self, bits: int) -> List[int]:
+        return self.ids[self.rows(bits)].tolist()
+
+    @staticmethod
+    def count(bits: int) -> int:
+        return bin(bits).count("1")
+
+    def weighted(self, weights: Mapping[str, float]) -> np.ndarray:
+        vector = np.array([weights.get(key, 0.0) for key in self.score_keys], dtype=np.float32)
+        return self.scores @ vector
+
+    def _order(self, weights: Mapping[str, float]) -> np.ndarray:
+        key = tuple(sorted(weights.items()))
+        order = self._weighted_orders.get(key)
+        if order is None:
+            if len(self._weighted_orders) > 256:
+                self._weighted_orders.clear()
+            # Descending by weighted score, ties broken by row for determinism.
+            order = np.lexsort((np.arange(self.n), -self.weighted(weights)))
+            self._weighted_orders[key] = order
+        return order
+
+    def top_k(self, bits: int, weights: Mapping[str, float], k: int = 10) -> np.ndarray:
+        """Row indices of the k best matching rows by sum(weight * score), best first."""
+        order = self._order(weights)
+        return order[self.flags(bits)[order]][:k]
+
+    def select(self, weights: Mapping[str, float], k: int = 10, **filters) -> List[int]:
+        """Exercise ids of the top-k rows matching `filters` (see `mask`)."""
+        return self.ids[self.top_k(self.mask(**filters), weights, k)].tolist()
+
+
+_index: Optional[ExerciseIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_exercise_index(snapshot: Optional[ExerciseSnapshot] = None) -> ExerciseIndex:
+    """Process-wide index over the current snapshot (rebuilt when the dataset changes)."""
+    global _index
+    snapshot = snapshot or load_exercise_snapshot()
+    with _index_lock:
+        if _index is None or _index.snapshot is not snapshot:
+            _index = ExerciseIndex(snapshot)
+        return _index
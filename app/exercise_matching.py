@@ -0,0 +1,204 @@
+"""Fuzzy exercise-name matching for joining exercise datasets.
+
+Names are normalized to a set of tokens: accents and punctuation are stripped, equipment
+words and compounds are canonicalized ("DB" -> dumbbell, "push-ups" -> push up), plurals are
+folded and filler words and program prefixes dropped, so word order and spelling variants
+don't matter. Candidates come from an inverted index of character trigrams (one `np.bincount`
+per query), and the best few are scored by IDF-weighted token overlap blended with trigram
+Dice similarity.
+
+`NameIndex.match` returns the best record with a confidence in [0, 1] and flags the result as
+"matched", "ambiguous" (runner-up within AMBIGUITY_MARGIN) or "unmatched" (below
+MATCH_THRESHOLD).
+"""
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MATCH_THRESHOLD = 0.72
+AMBIGUITY_MARGIN = 0.03
+CANDIDATES = 16
+TOKEN_WEIGHT = 0.65
+
+# Applied to the lowercased, accent-free name before tokenizing (multi-word forms first).
+PHRASES = [
+    (r"\bbody ?weight\b", "bodyweight"),
+    (r"\bresistance bands?\b", "band"),
+    (r"\bsmith machine\b", "smith"),
+    (r"\bez[ -]?bar\b", "ezbar"),
+    (r"\bt[ -]bar\b", "tbar"),
+    (r"\btrap[ -]bar\b", "trapbar"),
+    (r"\b(push|pull|chin|sit|step)[ -]?ups?\b", r"\1 up"),
+    (r"\bsingle[ -]arm\b", "one arm"),
+    (r"\bsingle[ -]leg\b", "one leg"),
+    (r"\bone[ -]arm(ed)?\b", "one arm"),
+    (r"\bone[ -]leg(ged)?\b", "one leg"),
+]
+SYNONYMS = {
+    "db": "dumbbell", "dbs": "dumbbell", "bb": "barbell", "kb": "kettlebell", "kbs": "kettlebell",
+    "banded": "band", "pulley": "cable", "cables": "cable", "bw": "bodyweight",
+    "tricep": "triceps", "bicep": "biceps", "delt": "deltoid", "delts": "deltoid",
+    "ab": "abs", "lat": "lats", "alternating": "alternate", "declined": "decline", "inclined": "incline",
+}
+# Program/brand labels the CSV catalog prefixes onto titles ("Holman ...", "FYR2 ..."); leading only.
+# Ordinary words ("up", "un") and numbers ("30") are not listed: dropping them loses real titles.
+PROGRAM_PREFIXES = frozenset({"holman", "hm", "fyr", "fyr2", "metaburn", "am", "tbs", "uns"})
+STOPWORDS = frozenset({"with", "the", "a", "an", "on", "of", "and", "using", "to", "in", "at", "for", "exercise"})
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_PHRASES = [(re.compile(pattern), repl) for pattern, repl in PHRASES]
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")) or word in ("triceps", "biceps", "abs", "lats"):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_tokens(name: str) -> Tuple[str, ...]:
+    """Canonical, order-independent token tuple of an exercise name."""
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    text = _NON_ALNUM.sub(" ", text)
+    first, _, rest = text.strip().partition(" ")
+    if first in PROGRAM_PREFIXES and rest:
+        text = rest
+    for pattern, repl in _PHRASES:
+        text = pattern.sub(repl, text)
+    tokens = set()
+    for word in text.split():
+        word = SYNONYMS.get(word, word)
+        word = SYNONYMS.get(_singular(word), _singular(word))
+        if word not in STOPWORDS:
+            tokens.add(word)
+    return tuple(sorted(tokens))
+
+
+def trigrams(tokens: Sequence[str]) -> FrozenSet[str]:
+    grams = set()
+    for token in tokens:
+        padded = f"#{token}#"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+@dataclass
+class Match:
+    query: str
+    key: Optional[Hashable]
+    name: Optional[str]
+    score: float
+    status: str  # "matched" | "ambiguous" | "unmatched"
+    runner_up: Optional[Hashable] = None
+    runner_up_score: float = 0.0
+
+
+class NameIndex:
+    """Inverted trigram index over a list of names; keys default to positions."""
+
+    def __init__(self, names: Sequence[str], keys: Optional[Sequence[Hashable]] = None):
+        self.names = list(names)
+        if keys is None:
+            keys = range(len(self.names))
+        self.keys = keys.tolist() if isinstance(keys, np.ndarray) else list(keys)
+        self.tokens = [normalize_tokens(name) for name in self.names]
+        self.grams = [trigrams(tokens) for tokens in self.tokens]
+        self.gram_counts = np.array([len(g) for g in self.grams], dtype=np.float32)
+
+        df = Counter(token for tokens in self.tokens for token in set(tokens))
+        n = max(len(self.names), 1)
+        self.idf: Dict[str, float] = {token: math.log((n + 1) / (count + 0.5)) for token, count in df.items()}
+        self.unknown_idf = math.log((n + 1) / 0.5)
+        self.token_sets = [frozenset(tokens) for tokens in self.tokens]
+        self.token_weights = [self._weight(tokens) for tokens in self.token_sets]
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for row, grams in enumerate(self.grams):
+            for gram in grams:
+                postings[gram].append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        # Exact normalized-form lookups short-circuit scoring.
+        self.exact: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for row, tokens in enumerate(self.tokens):
+            self.exact[tokens].append(row)
+
+    def _weight(self, tokens) -> float:
+        return sum(self.idf.get(t, self.unknown_idf) for t in tokens)
+
+    def _token_score(self, query: FrozenSet[str], query_weight: float, row: int) -> float:
+        """IDF-weighted Jaccard of the two token sets."""
+        shared = self._weight(query & self.token_sets[row])
+        union = query_weight + self.token_weights[row] - shared
+        return shared / union if union else 0.0
+
+    def candidates(self, query_grams: FrozenSet[str], limit: int = CANDIDATES) -> List[Tuple[int, float]]:
+        lists = [self.postings[g] for g in query_grams if g in self.postings]
+        if not lists:
+            return []
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.names)).astype(np.float32)
+        dice = 2 * hits / (len(query_grams) + self.gram_counts)
+        top = np.argpartition(-dice, min(limit, len(dice) - 1))[:limit]
+        return [(int(row), float(dice[row])) for row in top if hits[row] > 0]
+
+    def match(self, name: str) -> Match:
+        query = normalize_tokens(name)
+        exact = self.exact.get(query)
+        if exact:
+            status = "matched" if len(exact) == 1 else "ambiguous"
+            runner = self.keys[exact[1]] if len(exact) > 1 else None
+            return Match(name, self.keys[exact[0]], self.names[exact[0]], 1.0, status, runner, 1.0 if runner is not None else 0.0)
+        query_set = frozenset(query)
+        query_weight = self._weight(query_set)
+        scored = sorted(
+            (
+                (TOKEN_WEIGHT * self._token_score(query_set, query_weight, row) + (1 - TOKEN_WEIGHT) * dice, row)
+                for row, dice in self.candidates(trigrams(query))
+            ),
+            reverse=True,
+        )
+        if not scored:
+            return Match(name, None, None, 0.0, "unmatched")
+        best_score, best = scored[0]
+        runner_score, runner = scored[1] if len(scored) > 1 else (0.0, None)
+        if best_score < MATCH_THRESHOLD:
+            status = "unmatched"
+        elif runner is not None and best_score - runner_score < AMBIGUITY_MARGIN:
+            status = "ambiguous"
+        else:
+            status = "matched"
+        return Match(
+            name,
+            self.keys[best],
+            self.names[best],
+            round(best_score, 4),
+            status,
+            self.keys[runner] if runner is not None else None,
+            round(runner_score, 4),
+        )
+
+    def match_many(self, names: Sequence[str]) -> List[Match]:
+        return [self.match(name) for name in names]
+
+
+def summarize(matches: Sequence[Match]) -> Dict[str, float]:
+    """Counts per status plus `coverage`, the matched fraction (ambiguous rows are not joined)."""
+    counts = Counter(m.status for m in matches)
+    total = len(matches)
+    return {
+        "total": total,
+        "matched": counts["matched"],
+        "ambiguous": counts["ambiguous"],
+        "unmatched": counts["unmatched"],
+        "coverage": counts["matched"] / total if total else 0.0,
+    }
@@ -0,0 +1,291 @@
+"""Personalized exercise ranking for many users at once.
+
+`ranking_score` (and `idx_exercises_ranking`) give a single global order. Here every exercise
+of the enriched catalog becomes a row of normalized features (the five `puntuaciones_1a5`
+scores, MET, rating and the global ranking score, the last three joined from the CSV by fuzzy
+title match), and every user a weight vector built from their goal, training level and
+injury-risk tolerance. Scores for a batch of users are one matrix product:
+
+    S (users x exercises) = W (users x features) @ F.T (features x exercises)
+
+Only about 17% of the catalog finds a CSV row (see scripts/match_exercise_datasets.py), so for
+most exercises met / rating / ranking_score are imputed with the column median. A median value
+shifts every unjoined exercise's score by the same amount, so those three features neither
+promote nor demote an unjoined exercise; they only separate the joined ones, whose values lie on
+both sides of the median. `ExerciseRanker.joined` and `Ranking.joined` flag which exercises
+carry real CSV data, and `ExerciseRanker.coverage` is the joined fraction.
+
+Exercises a user can't do (equipment outside `user_equipment`, or above their level) are masked
+to -inf. Users sharing the same equipment set and level share one mask, so masks cost one
+bitset query per distinct group. Top-k per body part (`grupo`) is one `argpartition` over the
+body part's columns plus a sort of the k survivors.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.exercise_index import LEVEL_ORDER, ExerciseIndex, get_exercise_index
+from app.exercise_matching import NameIndex
+from app.exercise_snapshot import ExerciseSnapshot, load_exercise_snapshot
+from app.exercise_table import ExerciseTable, load_exercise_table
+
+SCORE_FEATURES = ("technical_difficulty", "injury_risk", "hypertrophy_potential", "strength_potential", "stability_demand")
+CSV_FEATURES = ("met", "rating", "ranking_score")  # joined from the CSV; median-imputed when unjoined
+FEATURES = SCORE_FEATURES + CSV_FEATURES
+USER_CHUNK = 4096
+
+# user_equipment.equipment_type (CSV vocabulary) -> snapshot equipment values it makes available.
+# Exercises with unknown equipment ("desconocido") are mostly gym movements, so machines or
+# cables unlock them.
+EQUIPMENT_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "Barra": ("barra",),
+    "Barra Z": ("barra",),
+    "Mancuernas": ("mancuernas",),
+    "Bandas": ("banda elástica",),
+    "Kettlebell": ("kettlebell",),
+    "Máquina": ("máquina", "máquina Smith", "desconocido"),
+    "Poleas": ("cable/polea", "desconocido"),
+    "Peso corporal": ("peso corporal",),
+}
+ALWAYS_AVAILABLE = ("peso corporal",)
+
+# profiles.goal -> feature weights (before level / risk adjustments)
+GOAL_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "Volumen": {"hypertrophy_potential": 1.0, "strength_potential": 0.6, "stability_demand": 0.1, "met": 0.1},
+    "Definir": {"hypertrophy_potential": 0.6, "strength_potential": 0.3, "stability_demand": 0.2, "met": 0.9},
+    "Mantener": {"hypertrophy_potential": 0.6, "strength_potential": 0.6, "stability_demand": 0.3, "met": 0.4},
+}
+COMMON_WEIGHTS = {"rating": 0.2, "ranking_score": 0.1}
+# Weight on technical_difficulty by level: beginners are steered to simpler movements.
+LEVEL_DIFFICULTY = {"principiante": -0.8, "intermedio": -0.3, "avanzado": 0.1}
+RISK_PENALTY = 1.2
+
+
+@dataclass
+class UserPreferences:
+    user_id: str
+    equipment: Sequence[str] = ()  # user_equipment.equipment_type values (or snapshot equipment values)
+    level: str = "principiante"
+    goal: str = "Mantener"
+    risk_tolerance: float = 0.5  # 0 = avoid injury risk, 1 = ignore it
+    extra_weights: Dict[str, float] = field(default_factory=dict)
+
+    def available_equipment(self) -> frozenset:
+        available = set(ALWAYS_AVAILABLE)
+        for item in self.equipment:
+            available.update(EQUIPMENT_ALIASES.get(item, (item,)))
+        return frozenset(available)
+
+    def normalized_level(self) -> str:
+        level = (self.level or "principiante").strip().lower()
+        return level if level in LEVEL_ORDER else "principiante"
+
+    def weights(self) -> np.ndarray:
+        weights = dict(COMMON_WEIGHTS)
+        weights.update(GOAL_WEIGHTS.get(self.goal, GOAL_WEIGHTS["Mantener"]))
+        weights["technical_difficulty"] = LEVEL_DIFFICULTY[self.normalized_level()]
+        weights["injury_risk"] = -RISK_PENALTY * (1.0 - min(max(float(self.risk_tolerance), 0.0), 1.0))
+        weights.update(self.extra_weights)
+        return np.array([weights.get(name, 0.0) for name in FEATURES], dtype=np.float32)
+
+
+def _minmax(column: np.ndarray) -> np.ndarray:
+    low, high = np.nanmin(column), np.nanmax(column)
+    return (column - low) / (high - low) if high > low else np.zeros_like(column)
+
+
+def join_csv_columns(snapshot: ExerciseSnapshot, table: ExerciseTable) -> Dict[str, np.ndarray]:
+    """met / rating / ranking_score per snapshot row from the best-matching CSV row (NaN when unmatched)."""
+    index = NameIndex(table.texts("title"))
+    rows = np.full(len(snapshot), -1, dtype=np.int64)
+    for i in range(len(snapshot)):
+        match = index.match(snapshot.name_en(i))
+        if match.status == "matched":
+            rows[i] = match.key
+    rating = np.where(table.rating > 0, table.rating, np.nan)  # 0.0 means "not rated" in the CSV
+    joined = {}
+    for name, column in zip(CSV_FEATURES, (table.met, rating, table.ranking_score)):
+        values = np.full(len(snapshot), np.nan, dtype=np.float32)
+        values[rows >= 0] = column[rows[rows >= 0]]
+        joined[name] = values
+    return joined
+
+
+def joined_rows(joined: Dict[str, np.ndarray]) -> np.ndarray:
+    """Bool per snapshot row: True where the CSV join found a row (any CSV feature present)."""
+    return np.logical_or.reduce([np.isfinite(joined[name]) for name in CSV_FEATURES])
+
+
+def feature_matrix(snapshot: ExerciseSnapshot, joined: Dict[str, np.ndarray]) -> np.ndarray:
+    """(exercises, FEATURES) float32 in [0, 1]; missing values take the column median (see module docstring)."""
+    columns = []
+    for key in SCORE_FEATURES:
+        scores = snapshot.score(key).astype(np.float32)
+        columns.append(np.where(scores >= 1, (scores - 1) / 4, 0.5))
+    for name in CSV_FEATURES:
+        values = joined[name].astype(np.float32)
+        fill = np.nanmedian(values) if np.isfinite(values).any() else 0.0
+        columns.append(_minmax(np.where(np.isnan(values), fill, values)))
+    return np.stack(columns, axis=1).astype(np.float32)
+
+
+@dataclass
+class Ranking:
+    """Per body part: (users, k) exercise ids (-1 = fewer than k feasible) and scores, best first.
+
+    `joined` marks picks whose met / rating / ranking_score come from the CSV rather than the median.
+    """
+    user_ids: List[str]
+    ids: Dict[str, np.ndarray]
+    scores: Dict[str, np.ndarray]
+    joined: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def for_user(self, position: int) -> Dict[str, List[Tuple[int, float]]]:
+        return {
+            part: [(int(i), float(s)) for i, s in zip(ids[position], self.scores[part][position]) if i >= 0]
+            for part, ids in self.ids.items()
+        }
+
+
+class ExerciseRanker:
+    def __init__(self, index: ExerciseIndex, features: np.ndarray, joined: Optional[np.ndarray] = None):
+        self.index = index
+        self.snapshot = index.snapshot
+        self.features = features
+        self.joined = np.ones(len(features), dtype=bool) if joined is None else np.asarray(joined, dtype=bool)
+        self._features_t = np.ascontiguousarray(features.T)
+        parts = np.asarray(self.snapshot.column("grupo"))
+        self.body_parts: Dict[str, np.ndarray] = {
+            name: np.flatnonzero(parts == code) for code, name in enumerate(self.snapshot.vocab["groups"])
+        }
+        self._masks: Dict[Tuple[frozenset, str], np.ndarray] = {}
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of exercises with real (not imputed) CSV features."""
+        return float(self.joined.mean()) if len(self.joined) else 0.0
+
+    def _mask(self, equipment: frozenset, level: str) -> np.ndarray:
+        """Additive mask row: 0 where feasible, -inf elsewhere (cached per equipment set + level)."""
+        key = (equipment, level)
+        mask = self._masks.get(key)
+        if mask is None:
+            if len(self._masks) > 1024:
+                self._masks.clear()
+            flags = self.index.flags(self.index.mask(equipment_within=equipment, max_level=level))
+            mask = self._masks[key] = np.where(flags, 0.0, -np.inf).astype(np.float32)
+        return mask
+
+    def score(self, users: Sequence[UserPreferences], masked: bool = True) -> np.ndarray:
+        """(users, exercises) personalized scores, -inf where infeasible unless `masked` is False."""
+        weights = np.stack([user.weights() for user in users])
+        if not masked:
+            return weights @ self._features_t
+        groups: Dict[Tuple[frozenset, str], int] = {}
+        group_of = np.array(
+            [groups.setdefault((user.available_equipment(), user.normalized_level()), len(groups)) for user in users],
+            dtype=np.int64,
+        )
+        masks = np.stack([self._mask(equipment, level) for equipment, level in groups])
+        scores = weights @ self._features_t
+        scores += masks[group_of]
+        return scores
+
+    def rank(self, users: Sequence[UserPreferences], k: int = 5, body_parts: Optional[Iterable[str]] = None) -> Ranking:
+        """Top-k exercises per body part for every user, processed in chunks of USER_CHUNK users."""
+        parts = list(body_parts) if body_parts is not None else [p for p, cols in self.body_parts.items() if len(cols)]
+        ids: Dict[str, List[np.ndarray]] = {part: [] for part in parts}
+        values: Dict[str, List[np.ndarray]] = {part: [] for part in parts}
+        joined: Dict[str, List[np.ndarray]] = {part: [] for part in parts}
+        for start in range(0, len(users), USER_CHUNK):
+            scores = self.score(users[start:start + USER_CHUNK])
+            for part in parts:
+                cols = self.body_parts[part]
+                top = min(k, len(cols))
+                sub = scores[:, cols]
+                picked = np.argpartition(-sub, top - 1, axis=1)[:, :top] if top < len(cols) else np.tile(np.arange(top), (len(sub), 1))
+                picked_scores = np.take_along_axis(sub, picked, axis=1)
+                order = np.argsort(-picked_scores, axis=1, kind="stable")
+                picked = np.take_along_axis(picked, order, axis=1)
+                picked_scores = np.take_along_axis(picked_scores, order, axis=1)
+                part_ids = self.index.ids[cols[picked]].astype(np.int64)
+                part_ids[~np.isfinite(picked_scores)] = -1
+                ids[part].append(part_ids)
+                values[part].append(picked_scores)
+                joined[part].append(self.joined[cols[picked]] & (part_ids >= 0))
+        return Ranking(
+            [user.user_id for user in users],
+            {part: np.concatenate(chunks) if chunks else np.empty((0, k), dtype=np.int64) for part, chunks in ids.items()},
+            {part: np.concatenate(chunks) if chunks else np.empty((0, k), dtype=np.float32) for part, chunks in values.items()},
+            {part: np.concatenate(chunks) if chunks else np.empty((0, k), dtype=bool) for part, chunks in joined.items()},
+        )
+
+    def rank_user(self, user: UserPreferences, k: int = 5) -> Dict[str, List[Tuple[int, float]]]:
+        return self.rank([user], k).for_user(0)
+
+
+def preferences_from_rows(profiles: Iterable[Dict[str, Any]], equipment_rows: Iterable[Dict[str, Any]]) -> List[UserPreferences]:
+    """Build preferences from `profiles` rows and `user_equipment` rows."""
+    equipment: Dict[str, List[str]] = {}
+    for row in equipment_rows:
+        equipment.setdefault(row["user_id"], []).append(row["equipment_type"])
+    return [
+        UserPreferences(
+            user_id=profile["user_id"],
+            equipment=equipment.get(profile["user_id"], []),
+            level=profile.get("training_level") or "principiante",
+            goal=profile.get("goal") or "Mantener",
+            risk_tolerance=float(profile["risk_tolerance"]) if profile.get("risk_tolerance") is not None else 0.5,
+        )
+        for profile in profiles
+    ]
+
+
+def fetch_user_preferences(client, user_ids: Sequence[str], chunk_size: int = 500) -> List[UserPreferences]:
+    """Read profiles + user_equipment for `user_ids` in chunks."""
+    profiles: List[Dict[str, Any]] = []
+    equipment_rows: List[Dict[str, Any]] = []
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = list(user_ids[start:start + chunk_size])
+        profiles += client.table("profiles").select("user_id, goal, training_level, risk_tolerance").in_("user_id", chunk).execute().data or []
+        equipment_rows += client.table("user_equipment").select("user_id, equipment_type").in_("user_id", chunk).execute().data or []
+    return preferences_from_rows(profiles, equipment_rows)
+
+
+_ranker: Optional[ExerciseRanker] = None
+_ranker_table: Optional[ExerciseTable] = None
+_ranker_lock = threading.Lock()
+
+
+def _joined_columns(snapshot: ExerciseSnapshot, table: ExerciseTable) -> Dict[str, np.ndarray]:
+    """CSV join cached next to the snapshot, keyed by both datasets' hashes."""
+    path = os.path.join(os.path.dirname(snapshot.path), f"ranking.{snapshot.source_hash}.{table.source_hash}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}
+    joined = join_csv_columns(snapshot, table)
+    try:
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, **joined)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only cache dir: rebuild next process
+    return joined
+
+
+def get_exercise_ranker(snapshot: Optional[ExerciseSnapshot] = None, table: Optional[ExerciseTable] = None) -> ExerciseRanker:
+    """Process-wide ranker for the current datasets (rebuilt when either one changes)."""
+    global _ranker, _ranker_table
+    snapshot = snapshot or load_exercise_snapshot()
+    table = table or load_exercise_table()
+    with _ranker_lock:
+        if _ranker is None or _ranker.snapshot is not snapshot or _ranker_table is not table:
+            joined = _joined_columns(snapshot, table)
+            _ranker = ExerciseRanker(get_exercise_index(snapshot), feature_matrix(snapshot, joined), joined_rows(joined))
+            _ranker_table = table
+        return _ranker
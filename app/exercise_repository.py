@@ -0,0 +1,52 @@
+"""Exercise catalog retrieval utilities."""
+from __future__ import annotations
+
+from functools import partial
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.coalesce import query_key, supabase_flight
+from app.resilience import read_guard
+from app.supabase_client import get_supabase_client
+
+ExerciseRow = Dict[str, Any]
+
+PAGE_SIZE = 1000  # PostgREST max-rows; larger responses are silently truncated
+
+
+def read_exercises(
+    columns: str = "*",
+    filters: Optional[Mapping[str, Any]] = None,
+    limit: int | None = None,
+) -> List[ExerciseRow]:
+    """Read exercises from Supabase, filtering by column equality.
+
+    Rows are paged by id past the PostgREST row cap, up to `limit` when given. Identical
+    concurrent reads share one scan (see app.coalesce); each page is bounded by the read
+    deadline on its own, falling back to that page's last good result (see app.resilience).
+    """
+
+    def fetch_page(offset: int, size: int) -> List[ExerciseRow]:
+        query = get_supabase_client().table("exercises").select(columns)
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        return list(query.order("id").range(offset, offset + size - 1).execute().data or [])
+
+    def fetch() -> List[ExerciseRow]:
+        rows: List[ExerciseRow] = []
+        while not limit or len(rows) < limit:
+            offset, size = len(rows), min(PAGE_SIZE, limit - len(rows)) if limit else PAGE_SIZE
+            page_key = query_key("exercises", columns, filters, offset=offset, size=size)
+            page = read_guard.read("exercises", page_key, partial(fetch_page, offset, size))
+            if not page:
+                break
+            rows.extend(page)
+        return rows
+
+    key = query_key("exercises", columns, filters, limit=limit)
+    return list(supabase_flight.do(key, fetch))
+
+
+def read_exercise(slug: str, columns: str = "*") -> Optional[ExerciseRow]:
+    """Single exercise by slug, or None."""
+    rows = read_exercises(columns, {"slug": slug}, limit=1)
+    return rows[0] if rows else None
@@ -0,0 +1,175 @@
+"""Exercise similarity and substitution graph over the enriched catalog.
+
+Each exercise becomes a feature vector:
+
+- muscles, weighted by involvement: EMG proxy alto 1.0 / medio 0.6 / bajo 0.3, main muscles 1.0,
+  secondary 0.5 (the max per muscle wins),
+- its movement pattern (one-hot, PATTERN_WEIGHT) and plane (PLANE_WEIGHT),
+- its equipment (EQUIPMENT_WEIGHT, kept low so substitutes can cross equipment).
+
+Rows are L2-normalized and the top-K cosine neighbours of every exercise are precomputed into
+dense (n, K) arrays, cached next to the compiled snapshot and keyed by the dataset hash. A
+substitution query walks one row of that graph and keeps the neighbours allowed by a bitset
+mask from `app.exercise_index` (available equipment, level, ...), so it is O(K); only when
+fewer than `k` neighbours survive the constraints does it fall back to scoring the allowed
+rows directly.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.exercise_index import ExerciseIndex, csr_rows, get_exercise_index
+from app.exercise_snapshot import ExerciseSnapshot, load_exercise_snapshot
+
+K = 48
+MUSCLE_LEVELS = {"alto": 1.0, "medio": 0.6, "bajo": 0.3}
+MAIN_WEIGHT = 1.0
+SECONDARY_WEIGHT = 0.5
+PATTERN_WEIGHT = 0.8
+PLANE_WEIGHT = 0.2
+EQUIPMENT_WEIGHT = 0.3
+
+
+def feature_matrix(snapshot: ExerciseSnapshot) -> np.ndarray:
+    """(n, features) float32 matrix with L2-normalized rows."""
+    n = len(snapshot)
+    vocab = snapshot.vocab
+    n_muscles, n_patterns, n_planes = len(vocab["muscles"]), len(vocab["patterns"]), len(vocab["planes"])
+    n_equipment = len(vocab["equipment"])
+    features = np.zeros((n, n_muscles + n_patterns + n_planes + n_equipment), dtype=np.float32)
+
+    muscles = features[:, :n_muscles]
+    for field, weight in [
+        ("musculos_principales", MAIN_WEIGHT),
+        ("musculos_secundarios", SECONDARY_WEIGHT),
+        *((f"emg.activacion_proxy.{level}", w) for level, w in MUSCLE_LEVELS.items()),
+    ]:
+        offsets, codes = snapshot.lists(field)
+        np.maximum.at(muscles, (csr_rows(offsets), np.asarray(codes, dtype=np.int64)), weight)
+
+    col = n_muscles
+    for field, size, weight in (("patron_movimiento_id", n_patterns, PATTERN_WEIGHT), ("plano", n_planes, PLANE_WEIGHT)):
+        codes = np.asarray(snapshot.column(field), dtype=np.int64)
+        known = codes < size
+        features[np.flatnonzero(known), col + codes[known]] = weight
+        col += size
+
+    offsets, codes = snapshot.lists("equipamiento")
+    rows = csr_rows(offsets)
+    counts = np.maximum(np.diff(offsets.astype(np.int64)), 1)
+    # Spread the weight across an exercise's equipment so multi-equipment rows aren't favoured.
+    features[rows, col + np.asarray(codes, dtype=np.int64)] = EQUIPMENT_WEIGHT / np.sqrt(counts[rows])
+
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.where(norms == 0, 1.0, norms)
+
+
+def build_graph(features: np.ndarray, k: int = K) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine neighbours (excluding self) per row: (neighbors int32, weights float32), best first."""
+    n = len(features)
+    k = min(k, n - 1)
+    neighbors = np.empty((n, k), dtype=np.int32)
+    weights = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, 512):
+        block = features[start:start + 512] @ features.T
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = -np.inf
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        neighbors[start:start + len(block)] = np.take_along_axis(part, order, axis=1)
+        weights[start:start + len(block)] = np.take_along_axis(part_scores, order, axis=1)
+    return neighbors, weights
+
+
+class SimilarityGraph:
+    def __init__(self, index: ExerciseIndex, features: np.ndarray, neighbors: np.ndarray, weights: np.ndarray):
+        self.index = index
+        self.snapshot = index.snapshot
+        self.features = features
+        self.neighbors = neighbors
+        self.weights = weights
+
+    def _row(self, exercise_id: int) -> int:
+        row = self.snapshot.index_of(exercise_id)
+        if row is None:
+            raise KeyError(f"Unknown exercise id {exercise_id}")
+        return row
+
+    def similar(self, exercise_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """Most similar exercises as (id, cosine), best first."""
+        row = self._row(exercise_id)
+        ids = self.index.ids[self.neighbors[row, :k]]
+        return [(int(i), float(w)) for i, w in zip(ids, self.weights[row, :k])]
+
+    def substitutes(
+        self,
+        exercise_id: int,
+        available_equipment: Optional[Iterable[str]] = None,
+        k: int = 5,
+        min_similarity: float = 0.0,
+        exclude_ids: Iterable[int] = (),
+        **filters,
+    ) -> List[Tuple[int, float]]:
+        """Best substitutes doable with `available_equipment` (plus any `ExerciseIndex.mask` filters)."""
+        row = self._row(exercise_id)
+        allowed = self.index.mask(equipment_within=available_equipment, **filters)
+        exclude = set(exclude_ids)
+        flags = self.index.flags(allowed)
+        ids, neighbors, weights = self.index.ids, self.neighbors[row], self.weights[row]
+        picked = [
+            (int(ids[j]), float(w))
+            for j, w in zip(neighbors, weights)
+            if flags[j] and w >= min_similarity and int(ids[j]) not in exclude
+        ][:k]
+        if len(picked) >= k:
+            return picked
+        # The precomputed neighbourhood ran dry under these constraints: score allowed rows directly.
+        flags[row] = False
+        candidates = np.flatnonzero(flags)
+        scores = self.features[candidates] @ self.features[row]
+        order = np.argsort(-scores, kind="stable")
+        result = []
+        for j in order:
+            exercise = int(ids[candidates[j]])
+            if scores[j] < min_similarity or len(result) == k:
+                break
+            if exercise not in exclude:
+                result.append((exercise, float(scores[j])))
+        return result
+
+
+_graph: Optional[SimilarityGraph] = None
+_graph_lock = threading.Lock()
+
+
+def _cache_path(snapshot: ExerciseSnapshot) -> str:
+    return os.path.join(os.path.dirname(snapshot.path), f"similarity.{snapshot.source_hash}.k{K}.npz")
+
+
+def get_similarity_graph(snapshot: Optional[ExerciseSnapshot] = None) -> SimilarityGraph:
+    """Process-wide graph for the current dataset, loaded from the cache or built and cached."""
+    global _graph
+    snapshot = snapshot or load_exercise_snapshot()
+    with _graph_lock:
+        if _graph is not None and _graph.snapshot is snapshot:
+            return _graph
+        index = get_exercise_index(snapshot)
+        features = feature_matrix(snapshot)
+        path = _cache_path(snapshot)
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                neighbors, weights = cached["neighbors"], cached["weights"]
+        else:
+            neighbors, weights = build_graph(features)
+            try:
+                tmp = f"{path}.tmp.npz"
+                np.savez(tmp, neighbors=neighbors, weights=weights)
+                os.replace(tmp, path)
+            except OSError:
+                pass  # read-only cache dir: rebuild next process
+        _graph = SimilarityGraph(index, features, neighbors, weights)
+        return _graph
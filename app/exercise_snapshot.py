@@ -0,0 +1,372 @@
+"""Compiled, memory-mapped snapshot of ejercicios_enriquecidos_es.json.
+
+The enriched dataset is a 2.6 MB JSON file that every consumer used to parse in full. This
+module compiles it once into a columnar binary file keyed by the JSON's content hash:
+
+- categorical strings (muscles, equipment, goals, groups, patterns, ...) are interned into
+  vocabularies and stored as uint16 codes; list fields use CSR (offsets + codes),
+- `puntuaciones_1a5` becomes an int8 matrix (-1 = missing),
+- `patron_movimiento_id` codes index `templates.patterns` in template order,
+- names live in one UTF-8 blob, and `meta`/`templates` stay as raw JSON parsed on first use.
+
+Loading maps the file and wraps each column with `np.frombuffer` (no copy), so cold load is
+the content hash plus a small header parse. Records are materialized on access with the same
+shape as the JSON; vectorized consumers read the columns directly.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ejercicios_enriquecidos_es.json")
+MAGIC = b"SFEXSNP1"
+FORMAT_VERSION = 1
+NONE = 0xFFFF
+
+# field -> vocabulary for scalar categorical columns (dotted names are nested keys)
+SCALAR_FIELDS = {
+    "grupo": "groups",
+    "plano": "planes",
+    "patron_movimiento_id": "patterns",
+    "nivel_dificultad": "levels",
+    "familia_variantes.clave": "families",
+    "emg.estado": "emg_states",
+    "emg.confianza": "confidences",
+    "emg.nota": "notes",
+}
+# field -> vocabulary for list-of-categorical columns (stored as CSR)
+LIST_FIELDS = {
+    "modificadores": "modifiers",
+    "equipamiento": "equipment",
+    "musculos_principales": "muscles",
+    "musculos_secundarios": "muscles",
+    "objetivos_tipicos": "goals",
+    "emg.activacion_proxy.alto": "muscles",
+    "emg.activacion_proxy.medio": "muscles",
+    "emg.activacion_proxy.bajo": "muscles",
+}
+TEXT_FIELDS = ("nombre_en", "nombre_es_sugerido")
+
+
+def _dig(record: Dict[str, Any], dotted: str) -> Any:
+    value: Any = record
+    for part in dotted.split("."):
+        value = (value or {}).get(part)
+    return value
+
+
+def content_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def default_cache_dir(source: str) -> str:
+    return os.getenv("EXERCISE_SNAPSHOT_DIR") or os.path.join(os.path.dirname(os.path.abspath(source)), ".snapshot_cache")
+
+
+class _Vocab:
+    def __init__(self, initial: Optional[List[str]] = None):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+        for value in initial or []:
+            self.code(value)
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def compile_snapshot(source: str, target: str, source_hash: Optional[str] = None) -> None:
+    """Compile the enriched JSON at `source` into a snapshot file at `target` (atomic write)."""
+    with open(source, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    exercises = data.get("exercises", [])
+    templates = data.get("templates", {})
+    n = len(exercises)
+
+    vocabs: Dict[str, _Vocab] = {name: _Vocab() for name in set(SCALAR_FIELDS.values()) | set(LIST_FIELDS.values())}
+    vocabs["patterns"] = _Vocab(list(templates.get("patterns", {})))
+    vocabs["reps"] = _Vocab()
+    score_keys: List[str] = []
+    for ex in exercises:
+        for key in ex.get("puntuaciones_1a5") or {}:
+            if key not in score_keys:
+                score_keys.append(key)
+
+    arrays: Dict[str, np.ndarray] = {"ids": np.array([ex.get("id", -1) for ex in exercises], dtype=np.int32)}
+    for field, vocab in SCALAR_FIELDS.items():
+        arrays[field] = np.array([vocabs[vocab].code(_dig(ex, field)) for ex in exercises], dtype=np.uint16)
+
+    scores = np.full((n, len(score_keys)), -1, dtype=np.int8)
+    for row, ex in enumerate(exercises):
+        for col, key in enumerate(score_keys):
+            value = (ex.get("puntuaciones_1a5") or {}).get(key)
+            if value is not None:
+                scores[row, col] = value
+    arrays["scores"] = scores
+
+    def csr(name: str, lists: List[List[int]], dtype) -> None:
+        offsets = np.zeros(n + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(items) for items in lists])
+        arrays[f"{name}.offsets"] = offsets
+        arrays[f"{name}.codes"] = np.array([code for items in lists for code in items], dtype=dtype)
+
+    for field, vocab in LIST_FIELDS.items():
+        csr(field, [[vocabs[vocab].code(v) for v in (_dig(ex, field) or [])] for ex in exercises], np.uint16)
+    csr("familia_variantes.relacionados_ids", [_dig(ex, "familia_variantes.relacionados_ids") or [] for ex in exercises], np.int32)
+    reps = [list((ex.get("reps_sugeridas_por_objetivo") or {}).items()) for ex in exercises]
+    csr("reps_sugeridas_por_objetivo", [[vocabs["goals"].code(goal) for goal, _ in items] for items in reps], np.uint16)
+    arrays["reps_sugeridas_por_objetivo.values"] = np.array(
+        [vocabs["reps"].code(value) for items in reps for _, value in items], dtype=np.uint16
+    )
+
+    blobs: Dict[str, bytes] = {}
+    for field in TEXT_FIELDS:
+        encoded = [(ex.get(field) or "").encode("utf-8") for ex in exercises]
+        offsets = np.zeros(n + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        arrays[f"{field}.offsets"] = offsets
+        blobs[field] = b"".join(encoded)
+    blobs["meta"] = json.dumps(data.get("meta", {}), ensure_ascii=False).encode("utf-8")
+    blobs["templates"] = json.dumps(templates, ensure_ascii=False).encode("utf-8")
+
+    layout: Dict[str, Any] = {}
+    sections: Dict[str, Tuple[int, int]] = {}
+    chunks: List[bytes] = []
+    cursor = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout[name] = [array.dtype.str, list(array.shape), cursor]
+        chunks.append(array.tobytes())
+        cursor += array.nbytes
+        pad = -cursor % 8
+        chunks.append(b"\0" * pad)
+        cursor += pad
+    for name, blob in blobs.items():
+        sections[name] = (cursor, len(blob))
+        chunks.append(blob)
+        cursor += len(blob)
+
+    header = json.dumps(
+        {
+            "format": FORMAT_VERSION,
+            "source_hash": source_hash or hashlib.blake2b(raw, digest_size=16).hexdigest(),
+            "count": n,
+            "score_keys": score_keys,
+            "vocab": {name: vocab.values for name, vocab in vocabs.items()},
+            "arrays": layout,
+            "sections": sections,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % 8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(prefix)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, target)
+
+
+class ExerciseSnapshot:
+    """Read-only view over a compiled snapshot; `snapshot[i]` materializes record i as a dict."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an exercise snapshot")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mm[start : start + header_len])
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {header.get('format')}, expected {FORMAT_VERSION}")
+        base = start + header_len
+        self._base = base + (-base % 8)
+        self.source_hash: str = header["source_hash"]
+        self.count: int = header["count"]
+        self.score_keys: List[str] = header["score_keys"]
+        self.vocab: Dict[str, List[str]] = header["vocab"]
+        self._sections: Dict[str, List[int]] = header["sections"]
+        self._arrays: Dict[str, np.ndarray] = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            array = np.frombuffer(self._mm, dtype=np.dtype(dtype), count=int(np.prod(shape)), offset=self._base + offset)
+            self._arrays[name] = array.reshape(shape)
+        self.ids: np.ndarray = self._arrays["ids"]
+        self.scores: np.ndarray = self._arrays["scores"]
+        self._id_order = np.argsort(self.ids, kind="stable")
+        self._meta: Optional[Dict[str, Any]] = None
+        self._templates: Optional[Dict[str, Any]] = None
+
+    # -- columns ---------------------------------------------------------------------------
+    def column(self, field: str) -> np.ndarray:
+        """Codes of a scalar field (see SCALAR_FIELDS); decode with `vocab[SCALAR_FIELDS[field]]`."""
+        return self._arrays[field]
+
+    def lists(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(offsets, codes) CSR pair of a list field; row i is codes[offsets[i]:offsets[i + 1]]."""
+        return self._arrays[f"{field}.offsets"], self._arrays[f"{field}.codes"]
+
+    def score(self, key: str) -> np.ndarray:
+        return self.scores[:, self.score_keys.index(key)]
+
+    def _text(self, field: str, i: int) -> str:
+        offsets = self._arrays[f"{field}.offsets"]
+        start = self._base + self._sections[field][0]
+        return self._mm[start + int(offsets[i]) : start + int(offsets[i + 1])].decode("utf-8")
+
+    def name_en(self, i: int) -> str:
+        return self._text("nombre_en", i)
+
+    def name_es(self, i: int) -> str:
+        return self._text("nombre_es_sugerido", i)
+
+    def _section(self, name: str) -> Any:
+        offset, length = self._sections[name]
+        return json.loads(self._mm[self._base + offset : self._base + offset + length])
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            self._meta = self._section("meta")
+        return self._meta
+
+    @property
+    def templates(self) -> Dict[str, Any]:
+        if self._templates is None:
+            self._templates = self._section("templates")
+        return self._templates
+
+    def pattern_template(self, i: int) -> Optional[Dict[str, Any]]:
+        """The `templates.patterns` entry referenced by record i."""
+        code = int(self._arrays["patron_movimiento_id"][i])
+        if code == NONE:
+            return None
+        return self.templates.get("patterns", {}).get(self.vocab["patterns"][code])
+
+    # -- records ---------------------------------------------------------------------------
+    def index_of(self, exercise_id: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.ids, exercise_id, sorter=self._id_order))
+        if pos < self.count and self.ids[self._id_order[pos]] == exercise_id:
+            return int(self._id_order[pos])
+        return None
+
+    def by_id(self, exercise_id: int) -> Optional[Dict[str, Any]]:
+        i = self.index_of(exercise_id)
+        return None if i is None else self[i]
+
+    def _scalar(self, field: str, i: int) -> Optional[str]:
+        code = int(self._arrays[field][i])
+        return None if code == NONE else self.vocab[SCALAR_FIELDS[field]][code]
+
+    def _list(self, field: str, i: int, vocab: Optional[str] = None) -> List[Any]:
+        offsets, codes = self.lists(field)
+        row = codes[offsets[i] : offsets[i + 1]].tolist()
+        if vocab is None:
+            return row
+        values = self.vocab[vocab]
+        return [values[code] for code in row]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        offsets, goal_codes = self.lists("reps_sugeridas_por_objetivo")
+        rep_values = self._arrays["reps_sugeridas_por_objetivo.values"]
+        goals, reps = self.vocab["goals"], self.vocab["reps"]
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        return {
+            "id": int(self.ids[i]),
+            "nombre_en": self.name_en(i),
+            "nombre_es_sugerido": self.name_es(i),
+            "grupo": self._scalar("grupo", i),
+            "plano": self._scalar("plano", i),
+            "patron_movimiento_id": self._scalar("patron_movimiento_id", i),
+            "modificadores": self._list("modificadores", i, "modifiers"),
+            "equipamiento": self._list("equipamiento", i, "equipment"),
+            "musculos_principales": self._list("musculos_principales", i, "muscles"),
+            "musculos_secundarios": self._list("musculos_secundarios", i, "muscles"),
+            "objetivos_tipicos": self._list("objetivos_tipicos", i, "goals"),
+            "reps_sugeridas_por_objetivo": {
+                goals[int(goal_codes[j])]: reps[int(rep_values[j])] for j in range(start, end)
+            },
+            "nivel_dificultad": self._scalar("nivel_dificultad", i),
+            "puntuaciones_1a5": {
+                key: int(value) for key, value in zip(self.score_keys, self.scores[i]) if value >= 0
+            },
+            "familia_variantes": {
+                "clave": self._scalar("familia_variantes.clave", i),
+                "relacionados_ids": self._list("familia_variantes.relacionados_ids", i),
+            },
+            "emg": {
+                "estado": self._scalar("emg.estado", i),
+                "activacion_proxy": {
+                    level: self._list(f"emg.activacion_proxy.{level}", i, "muscles") for level in ("alto", "medio", "bajo")
+                },
+                "confianza": self._scalar("emg.confianza", i),
+                "nota": self._scalar("emg.nota", i),
+            },
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.count):
+            yield self[i]
+
+
+def _remove_stale(target: str, stem: str) -> None:
+    directory = os.path.dirname(target)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(f"{stem}.") and name.endswith(".snap") and path != target:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_snapshots: Dict[str, ExerciseSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def load_exercise_snapshot(source: str = DEFAULT_SOURCE, cache_dir: Optional[str] = None) -> ExerciseSnapshot:
+    """Snapshot of the enriched JSON at `source`, compiling it first if its content changed."""
+    digest = content_hash(source)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(digest)
+        if snapshot is not None:
+            return snapshot
+        stem = os.path.splitext(os.path.basename(source))[0]
+        target = os.path.join(cache_dir or default_cache_dir(source), f"{stem}.{digest}.snap")
+        if not os.path.exists(target):
+            try:
+                compile_snapshot(source, target, source_hash=digest)
+                _remove_stale(target, stem)
+            except OSError:
+                # Read-only checkout (e.g. a serverless bundle): compile into the temp dir instead.
+                target = os.path.join(tempfile.gettempdir(), "summerfit-snapshots", f"{stem}.{digest}.snap")
+                if not os.path.exists(target):
+                    compile_snapshot(source, target, source_hash=digest)
+        snapshot = _snapshots[digest] = ExerciseSnapshot(target)
+        return snapshot
@@ -0,0 +1,272 @@
+"""Typed, columnar view of exercises_summerfit_es_final.csv.
+
+The CSV stores list columns as Python literals ("['Banco', 'Barra Z']") and numeric columns as
+text, so every consumer used to re-parse it row by row. `load_exercise_table` parses it once:
+
+- list literals go through a small dedicated parser (memoized per distinct literal, of which
+  there are a few dozen) instead of `ast.literal_eval`,
+- `type` / `level` / `body_part` / `rating_desc` become uint8 categorical codes (NONE = missing),
+- `equipment_required` / `lugar_entrenamiento` become multi-hot bitsets (bit j = vocab[j]),
+- `met` / `ranking_score` / `rating` become float32 with NaN for missing,
+- text columns live in one UTF-8 blob per column plus offsets.
+
+The result is cached as an uncompressed .npz next to the exercise snapshots, keyed by the CSV's
+content hash, so later loads are a hash plus a handful of array reads.
+"""
+from __future__ import annotations
+
+import ast
+import csv
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.exercise_snapshot import content_hash, default_cache_dir
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exercises_summerfit_es_final.csv")
+FORMAT_VERSION = 1
+NONE = 0xFF
+
+CATEGORICAL_COLUMNS = ("type", "level", "body_part", "rating_desc")
+MULTI_HOT_COLUMNS = {"equipment_required": "equipment", "lugar_entrenamiento": "location"}
+NUMERIC_COLUMNS = ("met", "ranking_score", "rating")
+TEXT_COLUMNS = ("slug", "title", "description")
+
+
+def parse_list_literal(text: str) -> List[str]:
+    """Parse a list-of-strings literal such as "['Banco', 'Barra Z']"."""
+    text = (text or "").strip()
+    if not text or text == "[]":
+        return []
+    if text[0] == "[" and text[-1] == "]":
+        inner = text[1:-1].strip()
+        quote = inner[:1]
+        if quote in ("'", '"') and inner.endswith(quote) and "\\" not in inner:
+            items = inner[1:-1].split(f"{quote}, {quote}")
+            if not any(quote in item for item in items):
+                return items
+    # Escapes, mixed quotes or odd spacing: fall back to the general parser.
+    value = ast.literal_eval(text)
+    return [str(item) for item in (value if isinstance(value, (list, tuple)) else [value])]
+
+
+def _number(text: str) -> float:
+    try:
+        return float(text) if text and text.strip() else np.nan
+    except ValueError:
+        return np.nan
+
+
+def _bitset_dtype(size: int):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if size <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"{size} values do not fit a 64-bit multi-hot column")
+
+
+def compile_table(source: str, target: str, source_hash: Optional[str] = None) -> None:
+    """Parse the CSV at `source` into the columnar .npz at `target` (atomic write)."""
+    with open(source, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    n = len(rows)
+    arrays: Dict[str, np.ndarray] = {}
+    vocab: Dict[str, List[str]] = {}
+
+    for column in CATEGORICAL_COLUMNS:
+        values = sorted({row.get(column) for row in rows if row.get(column)})
+        index = {value: code for code, value in enumerate(values)}
+        vocab[column] = values
+        arrays[column] = np.array([index.get(row.get(column) or "", NONE) for row in rows], dtype=np.uint8)
+
+    parsed: Dict[str, List[str]] = {}
+    for column, name in MULTI_HOT_COLUMNS.items():
+        lists = []
+        for row in rows:
+            literal = row.get(column) or ""
+            if literal not in parsed:
+                parsed[literal] = parse_list_literal(literal)
+            lists.append(parsed[literal])
+        values = sorted({item for items in lists for item in items})
+        index = {value: bit for bit, value in enumerate(values)}
+        vocab[name] = values
+        dtype = _bitset_dtype(len(values))
+        arrays[name] = np.array([sum(1 << index[item] for item in set(items)) for items in lists], dtype=dtype)
+
+    for column in NUMERIC_COLUMNS:
+        arrays[column] = np.array([_number(row.get(column)) for row in rows], dtype=np.float32)
+
+    for column in TEXT_COLUMNS:
+        encoded = [(row.get(column) or "").encode("utf-8") for row in rows]
+        offsets = np.zeros(n + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        arrays[f"{column}.offsets"] = offsets
+        arrays[f"{column}.blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    header = {"format": FORMAT_VERSION, "source_hash": source_hash or content_hash(source), "count": n, "vocab": vocab}
+    arrays["header"] = np.frombuffer(json.dumps(header, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp.npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, target)
+
+
+class ExerciseTable:
+    """Read-only columns of the exercise CSV; `table[i]` materializes row i as a dict."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        header = json.loads(arrays.pop("header").tobytes())
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has table format {header.get('format')}, expected {FORMAT_VERSION}")
+        self.source_hash: str = header["source_hash"]
+        self.count: int = header["count"]
+        self.vocab: Dict[str, List[str]] = header["vocab"]
+        self._arrays = arrays
+        self._blobs = {column: arrays[f"{column}.blob"].tobytes() for column in TEXT_COLUMNS}
+        self.met: np.ndarray = arrays["met"]
+        self.ranking_score: np.ndarray = arrays["ranking_score"]
+        self.rating: np.ndarray = arrays["rating"]
+        self.equipment: np.ndarray = arrays["equipment"]
+        self.location: np.ndarray = arrays["location"]
+        self._slug_rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    # -- columns ---------------------------------------------------------------------------
+    def codes(self, column: str) -> np.ndarray:
+        """uint8 codes of a categorical column; decode with `vocab[column]` (NONE = missing)."""
+        return self._arrays[column]
+
+    def category(self, column: str, i: int) -> Optional[str]:
+        code = int(self._arrays[column][i])
+        return None if code == NONE else self.vocab[column][code]
+
+    def text(self, column: str, i: int) -> str:
+        offsets = self._arrays[f"{column}.offsets"]
+        return self._blobs[column][int(offsets[i]) : int(offsets[i + 1])].decode("utf-8")
+
+    def texts(self, column: str) -> List[str]:
+        blob, offsets = self._blobs[column], self._arrays[f"{column}.offsets"].tolist()
+        return [blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(self.count)]
+
+    def bits(self, name: str, values: Iterable[str]) -> int:
+        """Bit mask of `values` in a multi-hot column ("equipment" or "location"); unknown values are ignored."""
+        vocab = self.vocab[name]
+        return sum(1 << vocab.index(value) for value in set(values) if value in vocab)
+
+    def decode(self, name: str, bits: int) -> List[str]:
+        return [value for j, value in enumerate(self.vocab[name]) if int(bits) >> j & 1]
+
+    # -- row selections --------------------------------------------------------------------
+    def where(self, column: str, value: str) -> np.ndarray:
+        """Boolean rows whose categorical `column` equals `value`."""
+        vocab = self.vocab[column]
+        if value not in vocab:
+            return np.zeros(self.count, dtype=bool)
+        return self._arrays[column] == vocab.index(value)
+
+    def equipment_within(self, available: Iterable[str]) -> np.ndarray:
+        """Boolean rows whose every required item is in `available`."""
+        allowed = self._arrays["equipment"].dtype.type(self.bits("equipment", available))
+        return (self.equipment & ~allowed) == 0
+
+    def any_equipment(self, values: Iterable[str]) -> np.ndarray:
+        return (self.equipment & self.equipment.dtype.type(self.bits("equipment", values))) != 0
+
+    def at_location(self, values: Iterable[str]) -> np.ndarray:
+        return (self.location & self.location.dtype.type(self.bits("location", values))) != 0
+
+    def row_of(self, slug: str) -> Optional[int]:
+        if self._slug_rows is None:
+            self._slug_rows = {}
+            for i, value in enumerate(self.texts("slug")):
+                self._slug_rows.setdefault(value, i)
+        return self._slug_rows.get(slug)
+
+    # -- records ---------------------------------------------------------------------------
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+
+        def number(array: np.ndarray) -> Optional[float]:
+            value = float(array[i])
+            return None if np.isnan(value) else value
+
+        return {
+            "slug": self.text("slug", i),
+            "title": self.text("title", i),
+            "description": self.text("description", i) or None,
+            "type": self.category("type", i),
+            "level": self.category("level", i),
+            "body_part": self.category("body_part", i),
+            "equipment_required": self.decode("equipment", self.equipment[i]),
+            "training_location": self.decode("location", self.location[i]),
+            "met": number(self.met),
+            "ranking_score": number(self.ranking_score),
+            "rating": number(self.rating),
+            "rating_desc": self.category("rating_desc", i),
+        }
+
+    def to_frame(self):
+        """pandas DataFrame with categorical dtypes (equipment/location stay as bitsets)."""
+        import pandas as pd
+
+        frame = pd.DataFrame({column: self.texts(column) for column in ("slug", "title")})
+        for column in ("type", "level", "body_part", "rating_desc"):
+            codes = self._arrays[column].astype(np.int16)
+            codes[codes == NONE] = -1
+            frame[column] = pd.Categorical.from_codes(codes, categories=self.vocab[column])
+        for column in NUMERIC_COLUMNS:
+            frame[column] = self._arrays[column]
+        frame["equipment_bits"] = self.equipment
+        frame["location_bits"] = self.location
+        return frame
+
+
+def _remove_stale(target: str, stem: str) -> None:
+    directory = os.path.dirname(target)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(f"{stem}.") and name.endswith(".table.npz") and path != target:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_tables: Dict[str, ExerciseTable] = {}
+_tables_lock = threading.Lock()
+
+
+def load_exercise_table(source: str = DEFAULT_SOURCE, cache_dir: Optional[str] = None) -> ExerciseTable:
+    """Typed table of the CSV at `source`, compiling it first if its content changed."""
+    digest = content_hash(source)
+    with _tables_lock:
+        table = _tables.get(digest)
+        if table is not None:
+            return table
+        stem = os.path.splitext(os.path.basename(source))[0]
+        target = os.path.join(cache_dir or default_cache_dir(source), f"{stem}.{digest}.table.npz")
+        if not os.path.exists(target):
+            try:
+                compile_table(source, target, source_hash=digest)
+                _remove_stale(target, stem)
+            except OSError:
+                # Read-only checkout (e.g. a serverless bundle): compile into the temp dir instead.
+                target = os.path.join(tempfile.gettempdir(), "summerfit-snapshots", f"{stem}.{digest}.table.npz")
+                if not os.path.exists(target):
+                    compile_table(source, target, source_hash=digest)
+        table = _tables[digest] = ExerciseTable(target)
+        return table
@@ -0,0 +1,403 @@
+"""Declarative validation of the enriched exercise JSON.
+
+Rules are data (`RULES`): a name, a severity, a kind and a path into the record. Paths are
+dotted, `*` walks every value of a dict and a trailing `[]` walks a list, e.g.
+`emg.activacion_proxy.*[]` visits every muscle in every EMG bucket.
+
+Per-record kinds (`type`, `required`, `range`, `enum`, `vocabulary`) only look at one record, so
+they run in shards, optionally on a process pool. Cross-record kinds (`reference`, `template`,
+`unique`) need the whole file and run once in the parent over the values their paths extract.
+
+The file is streamed: `stream_document` decodes the top-level sections and the records of the
+`exercises` array one at a time from a rolling buffer, so memory stays bounded by the largest
+record rather than the file. Each record's raw text is digested; with a previous report, records
+whose digest is unchanged reuse their per-record issues instead of being re-checked.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+REPORT_VERSION = 1
+RECORDS_KEY = "exercises"
+CHUNK_SIZE = 1 << 16
+SHARD_SIZE = 500
+# Files below this size are validated in-process; pool start-up would cost more than it saves.
+POOL_MIN_BYTES = 32 * 1024 * 1024
+
+SCORE_KEYS = ("technical_difficulty", "injury_risk", "hypertrophy_potential", "strength_potential", "stability_demand")
+LEVELS = ("principiante", "intermedio", "avanzado")
+# Base muscle names; a trailing qualifier such as "(estabilizador)" or "(según variante)" is allowed.
+MUSCLES = frozenset({
+    "bíceps braquial", "braquial", "braquiorradial", "pectoral mayor", "tríceps braquial",
+    "deltoides anterior", "deltoides medio", "deltoides posterior", "deltoides (anterior y medio)",
+    "deltoides anterior/posterior", "trapecio", "trapecio superior", "trapecio medio", "trapecio inferior",
+    "trapecio medio/inferior", "trapecio superior e inferior", "romboides", "dorsal ancho", "redondo mayor",
+    "elevador de la escápula", "manguito rotador", "serrato anterior", "cuádriceps", "isquiotibiales",
+    "glúteo mayor", "glúteo medio", "aductores", "flexores de cadera", "tensor de la fascia lata",
+    "gastrocnemio", "sóleo", "tibial posterior", "peroneos", "erectores espinales", "cuadrado lumbar",
+    "recto abdominal", "transverso abdominal", "oblicuos", "core", "flexores del antebrazo",
+    "flexores/extensores del antebrazo", "agarre/antebrazo", "supinador", "pronador redondo", "ancóneo",
+})
+_QUALIFIER = re.compile(r"\s*\((estabilizador|estabilidad|asistente|mínimo|según variante)\)$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    severity: str  # "error" | "warning"
+    kind: str
+    path: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+RULES: List[Rule] = [
+    Rule("id_is_int", "error", "type", "id", {"type": "int"}),
+    Rule("name_present", "error", "required", "nombre_en"),
+    Rule("scores_present", "error", "required", "puntuaciones_1a5", {"keys": SCORE_KEYS}),
+    Rule("score_range", "error", "range", "puntuaciones_1a5.*", {"min": 1, "max": 5}),
+    Rule("level_known", "error", "enum", "nivel_dificultad", {"values": LEVELS}),
+    Rule("main_muscles_present", "warning", "required", "musculos_principales"),
+    Rule("muscle_vocabulary", "warning", "vocabulary", "musculos_principales[]", {"vocabulary": "muscles"}),
+    Rule("secondary_muscle_vocabulary", "warning", "vocabulary", "musculos_secundarios[]", {"vocabulary": "muscles"}),
+    Rule("emg_muscle_vocabulary", "warning", "vocabulary", "emg.activacion_proxy.*[]", {"vocabulary": "muscles"}),
+    Rule("related_ids_exist", "error", "reference", "familia_variantes.relacionados_ids[]", {"target": "id"}),
+    Rule("pattern_has_template", "error", "template", "patron_movimiento_id", {"section": "templates.patterns"}),
+    Rule("unique_name", "warning", "unique", "nombre_en", {"normalize": "casefold"}),
+]
+RECORD_KINDS = frozenset({"type", "required", "range", "enum", "vocabulary"})
+VOCABULARIES = {"muscles": MUSCLES}
+_TYPES = {"int": int, "str": str, "list": list, "dict": dict}
+
+
+# -- paths -----------------------------------------------------------------------------------
+def resolve(record: Any, path: str) -> List[Tuple[str, Any]]:
+    """(location, value) pairs reached by `path`; missing keys yield nothing."""
+    found = [("", record)]
+    for segment in path.split("."):
+        walk_list = segment.endswith("[]")
+        key = segment[:-2] if walk_list else segment
+        step = []
+        for location, value in found:
+            if key == "*":
+                if isinstance(value, dict):
+                    step.extend((f"{location}.{k}".lstrip("."), v) for k, v in value.items())
+            elif isinstance(value, dict) and key in value:
+                step.append((f"{location}.{key}".lstrip("."), value[key]))
+        if walk_list:
+            step = [(f"{loc}[{i}]", item) for loc, value in step if isinstance(value, list) for i, item in enumerate(value)]
+        found = step
+    return found
+
+
+# -- per-record rules ------------------------------------------------------------------------
+def _issue(rule: Rule, record: Dict[str, Any], location: str, value: Any, message: str) -> Dict[str, Any]:
+    return {
+        "rule": rule.name,
+        "severity": rule.severity,
+        "id": record.get("id") if isinstance(record, dict) else None,
+        "name": record.get("nombre_en") if isinstance(record, dict) else None,
+        "path": location or rule.path,
+        "value": value,
+        "message": message,
+    }
+
+
+def check_record(record: Dict[str, Any], rules: Sequence[Rule] = RULES) -> List[Dict[str, Any]]:
+    issues = []
+    for rule in rules:
+        if rule.kind not in RECORD_KINDS:
+            continue
+        values = resolve(record, rule.path)
+        if rule.kind == "required":
+            if not values or values[0][1] in (None, "", [], {}):
+                issues.append(_issue(rule, record, rule.path, None, "missing or empty"))
+                continue
+            missing = [k for k in rule.params.get("keys", ()) if k not in values[0][1]]
+            if missing:
+                issues.append(_issue(rule, record, rule.path, missing, f"missing keys {missing}"))
+        elif rule.kind == "type":
+            expected = _TYPES[rule.params["type"]]
+            for location, value in values or [(rule.path, None)]:
+                if not isinstance(value, expected) or isinstance(value, bool):
+                    issues.append(_issue(rule, record, location, value, f"expected {rule.params['type']}"))
+        elif rule.kind == "range":
+            low, high = rule.params.get("min"), rule.params.get("max")
+            for location, value in values:
+                if not isinstance(value, (int, float)) or (low is not None and value < low) or (high is not None and value > high):
+                    issues.append(_issue(rule, record, location, value, f"outside [{low}, {high}]"))
+        elif rule.kind == "enum":
+            for location, value in values:
+                if value not in rule.params["values"]:
+                    issues.append(_issue(rule, record, location, value, "unknown value"))
+        elif rule.kind == "vocabulary":
+            vocabulary = VOCABULARIES[rule.params["vocabulary"]]
+            for location, value in values:
+                if not isinstance(value, str) or _QUALIFIER.sub("", value) not in vocabulary:
+                    issues.append(_issue(rule, record, location, value, f"not in {rule.params['vocabulary']} vocabulary"))
+    return issues
+
+
+def check_shard(shard: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, List[Dict[str, Any]]]]:
+    """Per-record rules over (position, record) pairs; top-level so it pickles for the pool."""
+    return [(position, check_record(record)) for position, record in shard]
+
+
+# -- cross-record rules ----------------------------------------------------------------------
+def check_dataset(
+    facts: Dict[str, List[Tuple[int, Any, Any, str, Any]]],
+    sections: Dict[str, Any],
+    rules: Sequence[Rule] = RULES,
+) -> List[Dict[str, Any]]:
+    """`facts[rule]` holds (position, id, name, location, value) for every value a cross-record path reached."""
+    issues = []
+    ids = {fact[1] for fact in facts.get("__ids__", [])}
+    for rule in rules:
+        if rule.kind in RECORD_KINDS:
+            continue
+        rows = facts.get(rule.name, [])
+        if rule.kind == "reference":
+            for _, record_id, name, location, value in rows:
+                if value not in ids:
+                    issues.append(_issue(rule, {"id": record_id, "nombre_en": name}, location, value, "references a missing id"))
+        elif rule.kind == "template":
+            known = resolve(sections, rule.params["section"])
+            known = known[0][1] if known else {}
+            for _, record_id, name, location, value in rows:
+                if value not in known:
+                    issues.append(_issue(rule, {"id": record_id, "nombre_en": name}, location, value, f"no entry in {rule.params['section']}"))
+        elif rule.kind == "unique":
+            seen: Dict[Any, List[Tuple[Any, Any, str]]] = defaultdict(list)
+            for _, record_id, name, location, value in rows:
+                key = value.strip().casefold() if isinstance(value, str) and rule.params.get("normalize") == "casefold" else value
+                seen[key].append((record_id, name, location))
+            for key, holders in seen.items():
+                for record_id, name, location in holders[1:]:
+                    issues.append(_issue(rule, {"id": record_id, "nombre_en": name}, location, key, f"duplicate of id {holders[0][0]}"))
+    return issues
+
+
+def extract_facts(position: int, record: Dict[str, Any], facts: Dict[str, list], rules: Sequence[Rule] = RULES) -> None:
+    record_id, name = record.get("id"), record.get("nombre_en")
+    facts["__ids__"].append((position, record_id, name, "id", record_id))
+    for rule in rules:
+        if rule.kind not in RECORD_KINDS:
+            for location, value in resolve(record, rule.path):
+                facts[rule.name].append((position, record_id, name, location, value))
+
+
+# -- streaming -------------------------------------------------------------------------------
+_WS = re.compile(r"\s*")
+
+
+class _Stream:
+    """Rolling text buffer over a file with refills on demand."""
+
+    def __init__(self, handle, chunk_size: int):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.handle.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_ws(self) -> None:
+        while True:
+            self.pos = _WS.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_ws()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON document")
+        return self.buffer[self.pos]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.buffer[self.pos]!r}")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder) -> Tuple[Any, str]:
+        """Decode the next value, refilling until it is complete; returns (value, raw text)."""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+                # A number can end at the buffer boundary while more digits are still unread.
+                if end < len(self.buffer) or self.eof:
+                    raw = self.buffer[self.pos:end]
+                    self.pos = end
+                    return value, raw
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def stream_document(path: str, records_key: str = RECORDS_KEY, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any, Any]]:
+    """Yield ("section", key, value) for top-level keys and ("record", position, (record, raw)) per record."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as handle:
+        stream = _Stream(handle, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key, _ = stream.value(decoder)
+            stream.expect(":")
+            if key == records_key:
+                stream.expect("[")
+                position = 0
+                if stream.peek() != "]":
+                    while True:
+                        record, raw = stream.value(decoder)
+                        yield "record", position, (record, raw)
+                        position += 1
+                        if stream.peek() == "]":
+                            break
+                        stream.expect(",")
+                stream.expect("]")
+            else:
+                value, _ = stream.value(decoder)
+                yield "section", key, value
+            if stream.peek() == "}":
+                return
+            stream.expect(",")
+
+
+def digest(raw: str) -> str:
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+# -- driver ----------------------------------------------------------------------------------
+def load_report(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if report.get("version") != REPORT_VERSION or report.get("rules") != [r.name for r in RULES]:
+        return None  # rules changed: everything must be re-checked
+    return report
+
+
+def validate_file(
+    path: str,
+    previous: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE,
+) -> Dict[str, Any]:
+    """Stream and validate `path`; `previous` (a prior report) enables incremental re-checks.
+
+    `workers=None` uses a process pool only for large files; 0 or 1 keeps everything in-process.
+    """
+    started = time.perf_counter()
+    if workers is None:
+        workers = (os.cpu_count() or 1) if os.path.getsize(path) >= POOL_MIN_BYTES else 0
+    cached = (previous or {}).get("records", {})
+
+    sections: Dict[str, Any] = {}
+    facts: Dict[str, list] = defaultdict(list)
+    digests: Dict[str, str] = {}
+    record_issues: Dict[int, List[Dict[str, Any]]] = {}
+    stats = {"missing_scores": 0, "generic_emg": 0, "missing_muscles": 0}
+    reused = 0
+    shard: List[Tuple[int, Dict[str, Any]]] = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = []
+
+    def flush() -> None:
+        if not shard:
+            return
+        batch = list(shard)
+        shard.clear()
+        if pool is not None:
+            pending.append(pool.submit(check_shard, batch))
+        else:
+            record_issues.update(check_shard(batch))
+
+    try:
+        for event, key, value in stream_document(path):
+            if event == "section":
+                sections[key] = value
+                continue
+            record, raw = value
+            record_digest = digest(raw)
+            digests[str(key)] = record_digest
+            extract_facts(key, record, facts)
+            if not isinstance(record, dict):
+                record = {"value": record}
+            scores = record.get("puntuaciones_1a5") or {}
+            stats["missing_scores"] += any(v == 0 for v in scores.values()) if isinstance(scores, dict) else 1
+            stats["generic_emg"] += (record.get("emg") or {}).get("estado") == "proxy_sin_tabla_emg"
+            stats["missing_muscles"] += not record.get("musculos_principales")
+
+            previous_entry = cached.get(str(key))
+            if previous_entry and previous_entry.get("digest") == record_digest:
+                record_issues[key] = previous_entry.get("issues", [])
+                reused += 1
+                continue
+            shard.append((key, record))
+            if len(shard) >= shard_size:
+                flush()
+        flush()
+        for future in pending:
+            record_issues.update(future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    issues = [issue for position in sorted(record_issues) for issue in record_issues[position]]
+    issues.extend(check_dataset(facts, sections))
+    by_rule: Dict[str, int] = defaultdict(int)
+    for issue in issues:
+        by_rule[issue["rule"]] += 1
+    total = len(digests)
+    return {
+        "version": REPORT_VERSION,
+        "source": os.path.abspath(path),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rules": [r.name for r in RULES],
+        "rule_definitions": [asdict(r) for r in RULES],
+        "summary": {
+            "records": total,
+            "checked": total - reused,
+            "reused": reused,
+            "errors": sum(1 for i in issues if i["severity"] == "error"),
+            "warnings": sum(1 for i in issues if i["severity"] == "warning"),
+            "by_rule": dict(by_rule),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+        "stats": stats,
+        "issues": issues,
+        "records": {
+            position: ({"digest": d, "issues": record_issues[int(position)]} if record_issues.get(int(position)) else {"digest": d})
+            for position, d in digests.items()
+        },
+    }
+
+
+def exit_code(report: Dict[str, Any], strict: bool = False) -> int:
+    """0 when clean, 1 on errors (or on warnings too when `strict`)."""
+    summary = report["summary"]
+    return 1 if summary["errors"] or (strict and summary["warnings"]) else 0
@@ -1,6 +1,7 @@
 """Food data ingestion and retrieval utilities."""
 from __future__ import annotations
 
+from functools import partial
 from typing import Any, Dict, List, Sequence
 
 import requests
@@ -10,10 +11,14 @@ from app.config import (
     get_foods_api_timeout,
     get_foods_api_url,
 )
+from app.coalesce import query_key, supabase_flight
+from app.resilience import read_guard
 from app.supabase_client import get_supabase_client
 
 FoodRow = Dict[str, Any]
 
+PAGE_SIZE = 1000  # PostgREST max-rows; larger responses are silently truncated
+
 
 def fetch_foods_from_api() -> Sequence[FoodRow]:
     """Fetch the entire foods dataset from the external API.
@@ -67,10 +72,27 @@ def upsert_foods(rows: Sequence[FoodRow]) -> None:
 
 
 def read_foods(limit: int | None = None) -> List[FoodRow]:
-    """Read foods from Supabase (cached in the app layer)."""
-    client = get_supabase_client()
-    query = client.table("foods").select("*")
-    if limit:
-        query = query.limit(limit)
-    response = query.execute()
-    return list(response.data or [])
+    """Read foods from Supabase (cached in the app layer).
+
+    Rows are paged by id past the PostgREST row cap, up to `limit` when given. Identical
+    concurrent reads share one scan (see app.coalesce); each page is bounded by the read
+    deadline on its own, falling back to that page's last good result (see app.resilience).
+    """
+
+    def fetch_page(offset: int, size: int) -> List[FoodRow]:
+        query = get_supabase_client().table("foods").select("*")
+        return list(query.order("id").range(offset, offset + size - 1).execute().data or [])
+
+    def fetch() -> List[FoodRow]:
+        rows: List[FoodRow] = []
+        while not limit or len(rows) < limit:
+            offset, size = len(rows), min(PAGE_SIZE, limit - len(rows)) if limit else PAGE_SIZE
+            page_key = query_key("foods", offset=offset, size=size)
+            page = read_guard.read("foods", page_key, partial(fetch_page, offset, size))
+            if not page:
+                break
+            rows.extend(page)
+        return rows
+
+    key = query_key("foods", limit=limit)
+    return list(supabase_flight.do(key, fetch))
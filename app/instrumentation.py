@@ -0,0 +1,294 @@
+"""Per-query instrumentation for Supabase (PostgREST) traffic.
+
+Every request made through the shared HTTP pools (`app.supabase_client` and `app.async_data`)
+is recorded here by the transport: table, operation, filter shape (column + operator, never
+values), row count, payload bytes, latency and error class. Aggregates are exported in the
+Prometheus text format (`render_prometheus`, `serve_metrics`), and calls slower than
+SLOW_QUERY_THRESHOLD_MS are appended to a rotating JSONL log.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket bounds in seconds.
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Query-string keys that shape the response rather than filter rows.
+MODIFIER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "logs/slow_queries.jsonl")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "3"))
+
+
+@dataclass
+class QueryEvent:
+    table: str
+    operation: str
+    filters: str
+    status: int
+    rows: Optional[int]
+    request_bytes: int
+    response_bytes: int
+    latency_ms: float
+    error: Optional[str] = None
+
+
+def describe_request(request: httpx.Request) -> Tuple[str, str, str]:
+    """(table, operation, filter shape) of a PostgREST request, e.g. ("daily_logs", "select", "log_date=gte,user_id=eq")."""
+    parts = urlsplit(str(request.url)).path.rstrip("/").split("/")
+    if "rest" not in parts:
+        return (parts[-1] if parts else "", request.method.lower(), "")
+    resource = parts[parts.index("rest") + 2:] if len(parts) > parts.index("rest") + 2 else [""]
+    if resource[0] == "rpc":
+        table, operation = f"rpc:{resource[-1]}", "rpc"
+    else:
+        table = resource[0]
+        prefer = request.headers.get("prefer", "")
+        operation = {
+            "GET": "select",
+            "HEAD": "count",
+            "PATCH": "update",
+            "DELETE": "delete",
+            "POST": "upsert" if "resolution=" in prefer else "insert",
+        }.get(request.method, request.method.lower())
+    shape = []
+    for key, value in parse_qsl(request.url.query.decode(), keep_blank_values=True):
+        if key in MODIFIER_PARAMS:
+            continue
+        if key in ("or", "and"):
+            shape.append(key)
+        else:
+            shape.append(f"{key}={value.split('.', 1)[0]}")
+    return table, operation, ",".join(sorted(shape))
+
+
+def row_count(response: httpx.Response) -> Optional[int]:
+    """Rows in a PostgREST response, from Content-Range ("0-24/*" -> 25, "*/0" -> 0)."""
+    content_range = response.headers.get("content-range")
+    if not content_range:
+        return None
+    span = content_range.split("/", 1)[0]
+    if span == "*":
+        return 0
+    start, _, end = span.partition("-")
+    if start.isdigit() and end.isdigit():
+        return int(end) - int(start) + 1
+    return None
+
+
+def _request_bytes(request: httpx.Request) -> int:
+    try:
+        return len(request.content)
+    except httpx.RequestNotRead:
+        return 0
+
+
+class _Series:
+    __slots__ = ("count", "errors", "rows", "request_bytes", "response_bytes", "latency_sum", "buckets")
+
+    def __init__(self):
+        self.count = self.errors = self.rows = self.request_bytes = self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+
+class QueryMetrics:
+    """Thread-safe aggregates keyed by (table, operation)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = defaultdict(_Series)
+        self._errors: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._slow_logger: Optional[logging.Logger] = None
+        self.slow_threshold_ms = SLOW_QUERY_THRESHOLD_MS
+
+    def record(self, event: QueryEvent) -> None:
+        seconds = event.latency_ms / 1000.0
+        index = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+        with self._lock:
+            series = self._series[(event.table, event.operation)]
+            series.count += 1
+            series.rows += event.rows or 0
+            series.request_bytes += event.request_bytes
+            series.response_bytes += event.response_bytes
+            series.latency_sum += seconds
+            series.buckets[index] += 1
+            if event.error:
+                series.errors += 1
+                self._errors[(event.table, event.operation, event.error)] += 1
+        if event.latency_ms >= self.slow_threshold_ms:
+            self._log_slow(event)
+
+    def configure_slow_log(
+        self,
+        path: str = SLOW_QUERY_LOG_PATH,
+        threshold_ms: Optional[float] = None,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backups: int = SLOW_QUERY_LOG_BACKUPS,
+    ) -> None:
+        if threshold_ms is not None:
+            self.slow_threshold_ms = threshold_ms
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        slow_logger = logging.getLogger(f"{__name__}.slow")
+        slow_logger.propagate = False
+        slow_logger.setLevel(logging.INFO)
+        for handler in list(slow_logger.handlers):
+            slow_logger.removeHandler(handler)
+            handler.close()
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_logger.addHandler(handler)
+        self._slow_logger = slow_logger
+
+    def _log_slow(self, event: QueryEvent) -> None:
+        if self._slow_logger is None:
+            try:
+                self.configure_slow_log()
+            except OSError as e:
+                logger.error(f"Error opening slow query log: {e}")
+                self.slow_threshold_ms = float("inf")
+                return
+        self._slow_logger.info(json.dumps({"ts": time.time(), **asdict(event)}, ensure_ascii=False))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                f"{table}.{operation}": {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "rows": s.rows,
+                    "avg_ms": round(s.latency_sum * 1000 / s.count, 2) if s.count else 0.0,
+                }
+                for (table, operation), s in self._series.items()
+            }
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            series = sorted(self._series.items())
+            errors = sorted(self._errors.items())
+            metric("supabase_query_duration_seconds", "histogram", "Latency of Supabase REST calls.")
+            for (table, operation), s in series:
+                labels = f'table="{table}",operation="{operation}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'supabase_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'supabase_query_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+                lines.append(f"supabase_query_duration_seconds_sum{{{labels}}} {s.latency_sum:.6f}")
+                lines.append(f"supabase_query_duration_seconds_count{{{labels}}} {s.count}")
+            for name, attr, help_text in (
+                ("supabase_query_rows_total", "rows", "Rows returned or affected."),
+                ("supabase_query_request_bytes_total", "request_bytes", "Request payload bytes."),
+                ("supabase_query_response_bytes_total", "response_bytes", "Response payload bytes."),
+            ):
+                metric(name, "counter", help_text)
+                for (table, operation), s in series:
+                    lines.append(f'{name}{{table="{table}",operation="{operation}"}} {getattr(s, attr)}')
+            metric("supabase_query_errors_total", "counter", "Failed calls by error class.")
+            for (table, operation, error), count in errors:
+                lines.append(
+                    f'supabase_query_errors_total{{table="{table}",operation="{operation}",error="{error}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._errors.clear()
+
+
+metrics = QueryMetrics()
+
+
+def _event(request: httpx.Request, response: Optional[httpx.Response], started: float, error: Optional[str]) -> QueryEvent:
+    table, operation, filters = describe_request(request)
+    status = response.status_code if response is not None else 0
+    if error is None and status >= 400:
+        error = f"HTTP{status}"
+    return QueryEvent(
+        table=table,
+        operation=operation,
+        filters=filters,
+        status=status,
+        rows=row_count(response) if response is not None and status < 400 else None,
+        request_bytes=_request_bytes(request),
+        response_bytes=len(response.content) if response is not None else 0,
+        latency_ms=round((time.perf_counter() - started) * 1000, 3),
+        error=error,
+    )
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """Sync transport that records a QueryEvent per request (the body is read eagerly)."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+            response.read()
+        except Exception as e:
+            metrics.record(_event(request, None, started, type(e).__name__))
+            raise
+        metrics.record(_event(request, response, started, None))
+        return response
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Async counterpart of InstrumentedTransport."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+            await response.aread()
+        except Exception as e:
+            metrics.record(_event(request, None, started, type(e).__name__))
+            raise
+        metrics.record(_event(request, response, started, None))
+        return response
+
+
+def serve_metrics(port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve `GET /metrics` in Prometheus text format from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="supabase-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,468 @@
+"""Offline-first SQLite storage for DailyTracker and AuthService, with Supabase sync.
+
+Reads and writes go to a local SQLite database (indexed by user and day), so the dashboard
+never waits on the network. `SyncWorker` reconciles with Supabase in the background: it pulls
+rows changed since a per-table cursor, then pushes local dirty rows. Two timestamps are
+involved:
+
+- the server's `updated_at`, stamped with now() on every write, is the pull cursor (paged on
+  the `(updated_at, id)` keyset), so an offline edit pushed late is still pulled by replicas
+  whose cursor has passed its edit time;
+- `client_updated_at` carries the edit time of the writer and resolves conflicts
+  last-writer-wins against the local `updated_at` (the local edit time).
+
+The daily_logs macro totals are owned by the server's rollup trigger and never pushed; locally
+they are recomputed from the local meal entries whenever those change.
+
+Remote hard deletes are not pulled (there is no tombstone on the server); local deletes are
+pushed. With `":memory:"` and no worker the store is a complete offline backend for demos,
+tests and benchmarks.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = (
+    "gender", "age", "height_cm", "weight_kg", "target_weight_kg", "goal", "activity_level", "diet_type",
+)
+DAILY_LOG_FIELDS = (
+    "weight_kg", "calories_consumed", "protein_g", "carbs_g", "fat_g", "exercise_minutes", "calories_burned",
+)
+MEAL_FIELDS = ("log_date", "meal_type", "food_name", "grams", "calories", "protein_g", "carbs_g", "fat_g")
+# meal_entries column -> daily_logs rollup column
+ROLLUP = {"calories": "calories_consumed", "protein_g": "protein_g", "carbs_g": "carbs_g", "fat_g": "fat_g"}
+# daily_logs columns a client may write; the rollup columns belong to the server trigger
+LOG_PUSH_FIELDS = tuple(f for f in DAILY_LOG_FIELDS if f not in ROLLUP.values())
+# Second keyset column of the pull cursor, for rows sharing one updated_at
+PULL_TIEBREAK = {"profiles": "user_id", "daily_logs": "id", "meal_entries": "id"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    gender TEXT, age INTEGER, height_cm REAL, weight_kg REAL, target_weight_kg REAL,
+    goal TEXT, activity_level TEXT, diet_type TEXT,
+    updated_at TEXT NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS daily_logs (
+    user_id TEXT NOT NULL,
+    log_date TEXT NOT NULL,
+    weight_kg REAL, calories_consumed REAL DEFAULT 0, protein_g REAL DEFAULT 0, carbs_g REAL DEFAULT 0,
+    fat_g REAL DEFAULT 0, exercise_minutes INTEGER DEFAULT 0, calories_burned INTEGER DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, log_date)
+);
+CREATE TABLE IF NOT EXISTS meal_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    remote_id INTEGER UNIQUE,
+    user_id TEXT NOT NULL,
+    log_date TEXT NOT NULL,
+    meal_type TEXT, food_name TEXT, grams REAL, calories REAL, protein_g REAL, carbs_g REAL, fat_g REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_meal_entries_user_date ON meal_entries (user_id, log_date);
+CREATE INDEX IF NOT EXISTS idx_meal_entries_dirty ON meal_entries (user_id) WHERE dirty = 1;
+CREATE INDEX IF NOT EXISTS idx_daily_logs_dirty ON daily_logs (user_id) WHERE dirty = 1;
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    cursor TEXT NOT NULL,
+    PRIMARY KEY (user_id, table_name)
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _ts(value: Any) -> str:
+    """Normalize a Postgres/ISO timestamp so string comparison matches time order."""
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _edit_time(row: Dict[str, Any]) -> str:
+    """Last-writer-wins timestamp of a pulled row (servers without client_updated_at fall back)."""
+    return _ts(row.get("client_updated_at") or row["updated_at"])
+
+
+class LocalStore:
+    """Thread-safe SQLite store mirroring profiles, daily_logs and meal_entries."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        with self._lock, self._conn:
+            yield self._conn
+
+    def _rows(self, sql: str, params: Sequence[Any] = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    # -- profiles -------------------------------------------------------
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows(f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE user_id = ?", (user_id,))
+        return rows[0] if rows else None
+
+    def upsert_profile(self, user_id: str, profile: Dict[str, Any], dirty: bool = True, updated_at: Optional[str] = None) -> None:
+        values = [profile.get(f) for f in PROFILE_FIELDS]
+        assignments = ", ".join(f"{f} = excluded.{f}" for f in (*PROFILE_FIELDS, "updated_at", "dirty"))
+        with self._tx() as conn:
+            conn.execute(
+                f"INSERT INTO profiles (user_id, {', '.join(PROFILE_FIELDS)}, updated_at, dirty) "
+                f"VALUES (?, {', '.join('?' * len(PROFILE_FIELDS))}, ?, ?) "
+                f"ON CONFLICT (user_id) DO UPDATE SET {assignments}",
+                (user_id, *values, updated_at or _now(), int(dirty)),
+            )
+
+    # -- daily logs -----------------------------------------------------
+
+    def list_logs(self, user_id: str, limit: Optional[int] = 30, ascending: bool = False) -> List[Dict]:
+        order = "ASC" if ascending else "DESC"
+        return self._rows(
+            f"SELECT user_id, log_date, {', '.join(DAILY_LOG_FIELDS)} FROM daily_logs "
+            f"WHERE user_id = ? ORDER BY log_date {order} LIMIT ?",
+            (user_id, -1 if limit is None else limit),
+        )
+
+    def upsert_log(self, user_id: str, payload: Dict[str, Any], dirty: bool = True, updated_at: Optional[str] = None) -> None:
+        fields = [f for f in DAILY_LOG_FIELDS if f in payload]
+        assignments = ", ".join(f"{f} = excluded.{f}" for f in (*fields, "updated_at", "dirty"))
+        with self._tx() as conn:
+            conn.execute(
+                f"INSERT INTO daily_logs (user_id, log_date, {''.join(f + ', ' for f in fields)}updated_at, dirty) "
+                f"VALUES (?, ?, {''.join('?, ' for _ in fields)}?, ?) "
+                f"ON CONFLICT (user_id, log_date) DO UPDATE SET {assignments}",
+                (user_id, str(payload["log_date"])[:10], *(payload[f] for f in fields), updated_at or _now(), int(dirty)),
+            )
+
+    def day_totals(self, user_id: str, log_date: str) -> Dict[str, float]:
+        rows = self._rows(
+            f"SELECT {', '.join(ROLLUP.values())} FROM daily_logs WHERE user_id = ? AND log_date = ?",
+            (user_id, log_date),
+        )
+        row = rows[0] if rows else {}
+        return {col: float(row.get(col) or 0) for col in ROLLUP.values()}
+
+    def _recompute_rollup(self, conn: sqlite3.Connection, user_id: str, log_date: str) -> None:
+        """Set a day's totals to the sum of its local meal entries."""
+        sums = conn.execute(
+            f"SELECT {', '.join(f'COALESCE(SUM({col}), 0)' for col in ROLLUP)} FROM meal_entries "
+            "WHERE user_id = ? AND log_date = ? AND deleted = 0",
+            (user_id, log_date),
+        ).fetchone()
+        conn.execute(
+            f"INSERT INTO daily_logs (user_id, log_date, {', '.join(ROLLUP.values())}, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, log_date) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in ROLLUP.values()),
+            (user_id, log_date, *sums, _now()),
+        )
+
+    def _bump_rollup(self, conn: sqlite3.Connection, user_id: str, log_date: str, entry: Dict[str, Any], sign: int) -> None:
+        """Apply a meal entry to its day's totals in the caller's transaction (mirrors the Supabase trigger)."""
+        deltas = [sign * float(entry.get(col) or 0) for col in ROLLUP]
+        conn.execute(
+            f"INSERT INTO daily_logs (user_id, log_date, {', '.join(ROLLUP.values())}, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, log_date) DO UPDATE SET "
+            + ", ".join(f"{col} = COALESCE({col}, 0) + excluded.{col}" for col in ROLLUP.values()),
+            (user_id, log_date, *deltas, _now()),
+        )
+
+    # -- meal entries ---------------------------------------------------
+
+    def list_meal_entries(self, user_id: str, log_date: str) -> List[Dict]:
+        return self._rows(
+            f"SELECT id, user_id, {', '.join(MEAL_FIELDS)}, created_at FROM meal_entries "
+            "WHERE user_id = ? AND log_date = ? AND deleted = 0 ORDER BY created_at DESC",
+            (user_id, log_date),
+        )
+
+    def list_meal_entries_range(self, user_id: str, start: str, end: str, columns: Sequence[str]) -> List[Dict]:
+        columns = [c for c in columns if c in MEAL_FIELDS or c in ("id", "created_at")]
+        return self._rows(
+            f"SELECT {', '.join(columns)} FROM meal_entries "
+            "WHERE user_id = ? AND log_date BETWEEN ? AND ? AND deleted = 0 ORDER BY log_date",
+            (user_id, start, end),
+        )
+
+    def add_meal_entry(self, entry: Dict[str, Any]) -> int:
+        now = _now()
+        with self._tx() as conn:
+            cur = conn.execute(
+                f"INSERT INTO meal_entries (user_id, {', '.join(MEAL_FIELDS)}, created_at, updated_at, dirty) "
+                f"VALUES (?, {', '.join('?' * len(MEAL_FIELDS))}, ?, ?, 1)",
+                (entry["user_id"], *(entry.get(f) for f in MEAL_FIELDS), now, now),
+            )
+            self._bump_rollup(conn, entry["user_id"], entry["log_date"], entry, 1)
+            return int(cur.lastrowid)
+
+    def update_meal_entry(self, user_id: str, entry_id: int, changes: Dict[str, Any]) -> None:
+        fields = [f for f in MEAL_FIELDS if f in changes]
+        with self._tx() as conn:
+            old = conn.execute("SELECT * FROM meal_entries WHERE id = ? AND user_id = ?", (entry_id, user_id)).fetchone()
+            if old is None:
+                return
+            conn.execute(
+                f"UPDATE meal_entries SET {''.join(f + ' = ?, ' for f in fields)}updated_at = ?, dirty = 1 WHERE id = ?",
+                (*(changes[f] for f in fields), _now(), entry_id),
+            )
+            new = {**dict(old), **{f: changes[f] for f in fields}}
+            self._bump_rollup(conn, user_id, old["log_date"], dict(old), -1)
+            self._bump_rollup(conn, user_id, new["log_date"], new, 1)
+
+    def delete_meal_entry(self, user_id: str, entry_id: int) -> None:
+        with self._tx() as conn:
+            old = conn.execute(
+                "SELECT * FROM meal_entries WHERE id = ? AND user_id = ? AND deleted = 0", (entry_id, user_id)
+            ).fetchone()
+            if old is None:
+                return
+            if old["remote_id"] is None:
+                conn.execute("DELETE FROM meal_entries WHERE id = ?", (entry_id,))
+            else:
+                conn.execute("UPDATE meal_entries SET deleted = 1, dirty = 1, updated_at = ? WHERE id = ?", (_now(), entry_id))
+            self._bump_rollup(conn, user_id, old["log_date"], dict(old), -1)
+
+    # -- sync bookkeeping -----------------------------------------------
+
+    def get_cursor(self, user_id: str, table: str) -> Optional[str]:
+        rows = self._rows("SELECT cursor FROM sync_state WHERE user_id = ? AND table_name = ?", (user_id, table))
+        return rows[0]["cursor"] if rows else None
+
+    def set_cursor(self, user_id: str, table: str, cursor: str) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (user_id, table_name, cursor) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, table_name) DO UPDATE SET cursor = excluded.cursor",
+                (user_id, table, cursor),
+            )
+
+    def dirty_rows(self, table: str, user_id: str) -> List[Dict]:
+        return self._rows(f"SELECT * FROM {table} WHERE user_id = ? AND dirty = 1", (user_id,))
+
+    def mark_clean(self, table: str, key: Dict[str, Any], updated_at: str, remote_id: Optional[int] = None) -> None:
+        """Clear the dirty flag unless the row was written again while it was being pushed."""
+        where = " AND ".join(f"{k} = ?" for k in key)
+        with self._tx() as conn:
+            if table == "meal_entries":
+                conn.execute(
+                    f"DELETE FROM meal_entries WHERE {where} AND deleted = 1 AND updated_at = ?", (*key.values(), updated_at)
+                )
+                if remote_id is not None:
+                    conn.execute(f"UPDATE meal_entries SET remote_id = ? WHERE {where}", (remote_id, *key.values()))
+            conn.execute(
+                f"UPDATE {table} SET dirty = 0 WHERE {where} AND updated_at = ?", (*key.values(), updated_at)
+            )
+
+    def apply_remote_meal(self, row: Dict[str, Any]) -> bool:
+        """Last-writer-wins merge of a pulled meal entry; returns False when the local copy wins.
+
+        The affected days' totals are recomputed from the local entries in the same transaction.
+        """
+        remote_ts = _edit_time(row)
+        log_date = str(row["log_date"])[:10]
+        with self._tx() as conn:
+            local = conn.execute(
+                "SELECT id, log_date, updated_at, dirty FROM meal_entries WHERE remote_id = ?", (row["id"],)
+            ).fetchone()
+            if local is not None and local["dirty"] and local["updated_at"] > remote_ts:
+                return False
+            values = [row.get(f) for f in MEAL_FIELDS]
+            values[0] = log_date
+            if local is None:
+                conn.execute(
+                    f"INSERT INTO meal_entries (remote_id, user_id, {', '.join(MEAL_FIELDS)}, created_at, updated_at) "
+                    f"VALUES (?, ?, {', '.join('?' * len(MEAL_FIELDS))}, ?, ?)",
+                    (row["id"], row["user_id"], *values, _ts(row.get("created_at") or remote_ts), remote_ts),
+                )
+            else:
+                conn.execute(
+                    f"UPDATE meal_entries SET {''.join(f + ' = ?, ' for f in MEAL_FIELDS)}updated_at = ?, dirty = 0, deleted = 0 "
+                    "WHERE id = ?",
+                    (*values, remote_ts, local["id"]),
+                )
+                if local["log_date"] != log_date:
+                    self._recompute_rollup(conn, row["user_id"], local["log_date"])
+            self._recompute_rollup(conn, row["user_id"], log_date)
+            return True
+
+    def apply_remote_log(self, user_id: str, row: Dict[str, Any]) -> bool:
+        """Last-writer-wins merge of a pulled daily log; returns False when the local copy wins.
+
+        The server's totals are taken only while the day has no unpushed meal entries; otherwise
+        the local totals (which already include them) are kept.
+        """
+        remote_ts = _edit_time(row)
+        log_date = str(row["log_date"])[:10]
+        with self._tx() as conn:
+            local = conn.execute(
+                "SELECT updated_at, dirty FROM daily_logs WHERE user_id = ? AND log_date = ?", (user_id, log_date)
+            ).fetchone()
+            if local is not None and local["dirty"] and local["updated_at"] > remote_ts:
+                return False
+            pending = conn.execute(
+                "SELECT 1 FROM meal_entries WHERE user_id = ? AND log_date = ? AND dirty = 1 LIMIT 1", (user_id, log_date)
+            ).fetchone()
+            fields = [f for f in (LOG_PUSH_FIELDS if pending else DAILY_LOG_FIELDS) if f in row]
+            assignments = ", ".join(f"{f} = excluded.{f}" for f in (*fields, "updated_at", "dirty"))
+            conn.execute(
+                f"INSERT INTO daily_logs (user_id, log_date, {''.join(f + ', ' for f in fields)}updated_at, dirty) "
+                f"VALUES (?, ?, {''.join('?, ' for _ in fields)}?, 0) "
+                f"ON CONFLICT (user_id, log_date) DO UPDATE SET {assignments}",
+                (user_id, log_date, *(row[f] for f in fields), remote_ts),
+            )
+            if pending:
+                self._recompute_rollup(conn, user_id, log_date)
+            return True
+
+    def local_wins(self, table: str, key: Dict[str, Any], remote_updated_at: str) -> bool:
+        where = " AND ".join(f"{k} = ?" for k in key)
+        rows = self._rows(f"SELECT updated_at, dirty FROM {table} WHERE {where}", tuple(key.values()))
+        return bool(rows) and bool(rows[0]["dirty"]) and rows[0]["updated_at"] > _ts(remote_updated_at)
+
+
+class SyncWorker:
+    """Background push/pull between a LocalStore and Supabase for one user."""
+
+    PAGE_SIZE = 500
+
+    def __init__(self, store: LocalStore, client, user_id: str, interval: float = 30.0):
+        self.store = store
+        self.client = client
+        self.user_id = user_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"pulled": 0, "pushed": 0, "conflicts": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"summerfit-sync-{self.user_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
+
+    def sync_once(self) -> Dict[str, int]:
+        """Pull remote changes, then push local ones. Failures are retried on the next cycle."""
+        try:
+            # meal_entries before daily_logs: the server rollup row is newer than the entries it sums.
+            for table in ("profiles", "meal_entries", "daily_logs"):
+                self._pull(table)
+            self._push_profile()
+            self._push_meals()
+            self._push_logs()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Sync cycle failed, will retry: {e}")
+        return dict(self.stats)
+
+    def _pull(self, table: str) -> None:
+        """Page through rows changed after the stored (updated_at, tiebreak) cursor until a page comes back empty."""
+        tiebreak = PULL_TIEBREAK[table]
+        cursor = self.store.get_cursor(self.user_id, table)
+        while True:
+            query = self.client.table(table).select("*").eq("user_id", self.user_id)
+            if cursor:
+                stamp, _, last = cursor.partition("|")
+                if last:
+                    query = query.or_(f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",{tiebreak}.gt."{last}")')
+                else:  # cursor from before the keyset: re-read the boundary rows (merging is idempotent)
+                    query = query.gte("updated_at", stamp)
+            rows = query.order("updated_at").order(tiebreak).limit(self.PAGE_SIZE).execute().data or []
+            if not rows:
+                return
+            for row in rows:
+                if self._apply_remote(table, row):
+                    self.stats["pulled"] += 1
+                else:
+                    self.stats["conflicts"] += 1
+            cursor = f"{_ts(rows[-1]['updated_at'])}|{rows[-1][tiebreak]}"
+            self.store.set_cursor(self.user_id, table, cursor)
+
+    def _apply_remote(self, table: str, row: Dict[str, Any]) -> bool:
+        if table == "meal_entries":
+            return self.store.apply_remote_meal(row)
+        if table == "profiles":
+            edited = _edit_time(row)
+            if self.store.local_wins("profiles", {"user_id": self.user_id}, edited):
+                return False
+            self.store.upsert_profile(self.user_id, row, dirty=False, updated_at=edited)
+            return True
+        return self.store.apply_remote_log(self.user_id, row)
+
+    def _push_profile(self) -> None:
+        for row in self.store.dirty_rows("profiles", self.user_id):
+            payload = {f: row[f] for f in PROFILE_FIELDS}
+            self.client.table("profiles").upsert(
+                {"user_id": self.user_id, **payload, "client_updated_at": row["updated_at"]}, on_conflict="user_id"
+            ).execute()
+            self.store.mark_clean("profiles", {"user_id": self.user_id}, row["updated_at"])
+            self.stats["pushed"] += 1
+
+    def _push_logs(self) -> None:
+        rows = self.store.dirty_rows("daily_logs", self.user_id)
+        if not rows:
+            return
+        payload = [
+            {"user_id": self.user_id, "log_date": r["log_date"], "client_updated_at": r["updated_at"], **{f: r[f] for f in LOG_PUSH_FIELDS}}
+            for r in rows
+        ]
+        self.client.table("daily_logs").upsert(payload, on_conflict="user_id,log_date").execute()
+        for r in rows:
+            self.store.mark_clean("daily_logs", {"user_id": self.user_id, "log_date": r["log_date"]}, r["updated_at"])
+        self.stats["pushed"] += len(rows)
+
+    def _push_meals(self) -> None:
+        rows = self.store.dirty_rows("meal_entries", self.user_id)
+        created = [r for r in rows if r["remote_id"] is None and not r["deleted"]]
+        if created:
+            payload = [
+                {"user_id": self.user_id, "client_updated_at": r["updated_at"], **{f: r[f] for f in MEAL_FIELDS}} for r in created
+            ]
+            inserted = self.client.table("meal_entries").insert(payload).execute().data or []
+            for local, remote in zip(created, inserted):
+                self.store.mark_clean("meal_entries", {"id": local["id"]}, local["updated_at"], remote_id=remote["id"])
+        for r in rows:
+            if r["remote_id"] is None:
+                continue
+            table = self.client.table("meal_entries")
+            if r["deleted"]:
+                table.delete().eq("id", r["remote_id"]).eq("user_id", self.user_id).execute()
+            else:
+                changes = {"client_updated_at": r["updated_at"], **{f: r[f] for f in MEAL_FIELDS}}
+                table.update(changes).eq("id", r["remote_id"]).eq("user_id", self.user_id).execute()
+            self.store.mark_clean("meal_entries", {"id": r["id"]}, r["updated_at"])
+        self.stats["pushed"] += len(rows)
@@ -0,0 +1,252 @@
+"""Per-muscle-group fatigue and recovery from training history.
+
+Every logged exercise adds a stimulus to the groups it trains: working sets × the exercise's
+activation weight for the group (the same sparse matrix as `app.muscle_volume`). Residual
+fatigue then decays exponentially with a per-group half-life, so the state of a user is just
+one number per group plus the time it refers to:
+
+    F(t) = F(t0) · exp(-λ · (t - t0)) + stimulus,   λ = ln 2 / half-life
+
+Because the model is linear, a new session is an O(groups) update of the stored state (decay
+to the session time, add the stimulus), and a full rebuild has a closed form: the state of a
+user at time T is Σ stimulus_i · exp(-λ · (T - t_i)) over their sessions, which `rebuild`
+evaluates for every user at once with one `np.bincount` over (user, group) cells.
+
+Fatigue is measured in effective sets; a group counts as recovered once its residual drops
+below RECOVERED_SETS. `record_session` is the incremental write path: it folds freshly logged
+workout_logs rows into the stored user_muscle_fatigue row, over the `exercises` table ids that
+workout_logs reference (`get_catalog_fatigue_model`); scripts/refresh_muscle_fatigue.py
+rebuilds every row from scratch.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.exercise_repository import read_exercises
+from app.muscle_volume import MUSCLE_GROUPS, MuscleVolumeMatrix, get_volume_matrix
+from app.strength_progression import SessionBuffer
+
+# Hours for residual fatigue to halve; large lower-body and back muscles recover slowest.
+HALF_LIFE_HOURS: Dict[str, float] = {
+    "pecho": 48, "espalda": 48, "trapecio": 36, "hombros": 36, "bíceps": 30, "tríceps": 30,
+    "antebrazo": 24, "cuádriceps": 60, "isquiotibiales": 60, "glúteos": 60, "aductores": 48,
+    "gemelos": 24, "core": 24, "lumbar": 60,
+}
+DEFAULT_HALF_LIFE_HOURS = 48.0
+RECOVERED_SETS = 3.0  # residual effective sets below which a group is trainable again
+WARN_MIN_WEIGHT = 0.5  # only warn for groups the planned exercise trains at least as a secondary
+STATE_COLUMNS = "user_id, levels, state_at"
+CATALOG_COLUMNS = "id, activation_profile, primary_muscles, secondary_muscles"
+
+
+def _utc_hours(moment: Optional[datetime] = None) -> float:
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() / 3600.0
+
+
+@dataclass
+class FatigueState:
+    """Residual fatigue per group of one user, as of `at` (hours since epoch, UTC)."""
+
+    user_id: str
+    levels: np.ndarray
+    at: float = -np.inf
+
+    def to_row(self, groups: Sequence[str] = MUSCLE_GROUPS) -> Dict[str, Any]:
+        """Row for user_muscle_fatigue."""
+        return {
+            "user_id": self.user_id,
+            "levels": {group: round(float(v), 3) for group, v in zip(groups, self.levels) if v >= 1e-3},
+            "state_at": datetime.fromtimestamp(self.at * 3600.0, timezone.utc).isoformat() if np.isfinite(self.at) else None,
+        }
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any], groups: Sequence[str] = MUSCLE_GROUPS) -> "FatigueState":
+        levels = row.get("levels") or {}
+        stamp = row.get("state_at")
+        at = _utc_hours(datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))) if stamp else -np.inf
+        return cls(row["user_id"], np.array([float(levels.get(g, 0.0)) for g in groups]), at)
+
+
+@dataclass
+class FatigueWarning:
+    group: str
+    fatigue: float  # residual effective sets at the planned time
+    hours_to_recover: float
+    exercise_ids: List[int] = field(default_factory=list)
+
+
+class FatigueModel:
+    """Exponential-decay fatigue over a MuscleVolumeMatrix's groups."""
+
+    def __init__(self, matrix: MuscleVolumeMatrix, half_lives: Optional[Mapping[str, float]] = None):
+        self.matrix = matrix
+        self.groups = matrix.groups
+        half_lives = {**HALF_LIFE_HOURS, **(half_lives or {})}
+        self.half_lives = np.array([half_lives.get(g, DEFAULT_HALF_LIFE_HOURS) for g in self.groups], dtype=np.float64)
+        self.rates = np.log(2.0) / self.half_lives
+
+    def empty_state(self, user_id: str) -> FatigueState:
+        return FatigueState(user_id, np.zeros(len(self.groups)))
+
+    def stimulus(self, exercise_ids: Sequence[int], sets: Sequence[float]) -> np.ndarray:
+        """Effective sets per group for one session's (exercise id, working sets) entries."""
+        _, group, effective = self.matrix.expand(np.asarray(exercise_ids), np.asarray(sets, dtype=np.float64))
+        return np.bincount(group, weights=effective, minlength=len(self.groups))
+
+    def decayed(self, state: FatigueState, at: float) -> np.ndarray:
+        if not np.isfinite(state.at):
+            return state.levels.copy()
+        return state.levels * np.exp(-self.rates * max(at - state.at, 0.0))
+
+    def update(self, state: FatigueState, exercise_ids: Sequence[int], sets: Sequence[float], at: float) -> FatigueState:
+        """Fold one session logged at `at` into `state` in place.
+
+        A session older than the state (a late log) is decayed forward to the state's time
+        instead of moving the state back, which gives the same result as replaying in order.
+        """
+        stimulus = self.stimulus(exercise_ids, sets)
+        if np.isfinite(state.at) and at < state.at:
+            state.levels = state.levels + stimulus * np.exp(-self.rates * (state.at - at))
+        else:
+            state.levels = self.decayed(state, at) + stimulus
+            state.at = at
+        return state
+
+    def readiness(self, state: FatigueState, at: Optional[float] = None) -> Dict[str, float]:
+        """Residual effective sets per group at `at` (default: now)."""
+        levels = self.decayed(state, _utc_hours() if at is None else at)
+        return {group: round(float(v), 2) for group, v in zip(self.groups, levels)}
+
+    def hours_to_recover(self, levels: np.ndarray, threshold: float = RECOVERED_SETS) -> np.ndarray:
+        ratio = np.maximum(levels, threshold) / threshold
+        return self.half_lives * np.log2(ratio)
+
+    def warnings(
+        self,
+        state: FatigueState,
+        exercise_ids: Sequence[int],
+        at: Optional[float] = None,
+        threshold: float = RECOVERED_SETS,
+    ) -> List[FatigueWarning]:
+        """Groups a planned session trains that are still above `threshold` at `at` (default: now)."""
+        levels = self.decayed(state, _utc_hours() if at is None else at)
+        entry, group, weight = self.matrix.expand(np.asarray(exercise_ids), np.ones(len(exercise_ids)))
+        hit = (weight >= WARN_MIN_WEIGHT) & (levels[group] > threshold)
+        if not hit.any():
+            return []
+        recover = self.hours_to_recover(levels, threshold)
+        by_group: Dict[int, List[int]] = {}
+        for e, g in zip(entry[hit], group[hit]):
+            by_group.setdefault(int(g), []).append(int(exercise_ids[e]))
+        return sorted(
+            (FatigueWarning(self.groups[g], round(float(levels[g]), 2), round(float(recover[g]), 1), ids) for g, ids in by_group.items()),
+            key=lambda w: -w.fatigue,
+        )
+
+    def rebuild(
+        self,
+        user: np.ndarray,
+        exercise_ids: np.ndarray,
+        hours: np.ndarray,
+        sets: np.ndarray,
+        n_users: int,
+        at: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """States of many users from their whole history in one vectorized pass.
+
+        Sessions are columns (user code, exercise id, hours since epoch, working sets) in any
+        order. Returns ((n_users, groups) levels, (n_users,) state times): each user's state is
+        taken at their latest session, or at `at` for everyone when given, and matches
+        replaying `update` over their sessions.
+        """
+        user = np.asarray(user, dtype=np.int64)
+        hours = np.asarray(hours, dtype=np.float64)
+        valid = np.isfinite(hours)
+        user, hours = user[valid], hours[valid]
+        exercise_ids, sets = np.asarray(exercise_ids)[valid], np.asarray(sets, dtype=np.float64)[valid]
+
+        if at is None:
+            state_at = np.full(n_users, -np.inf)
+            np.maximum.at(state_at, user, hours)
+        else:
+            state_at = np.full(n_users, float(at))
+        entry, group, effective = self.matrix.expand(exercise_ids, sets)
+        age = np.maximum(state_at[user[entry]] - hours[entry], 0.0)
+        weights = effective * np.exp(-self.rates[group] * age)
+        levels = np.bincount(user[entry] * len(self.groups) + group, weights=weights, minlength=n_users * len(self.groups))
+        return levels.reshape(n_users, len(self.groups)), state_at
+
+
+def rebuild_states(model: FatigueModel, columns: Mapping[str, np.ndarray], user_codes: Mapping[str, int], at: Optional[float] = None) -> List[FatigueState]:
+    """FatigueStates for every user of a `SessionBuffer` (its `columns()` and `user_codes`)."""
+    levels, state_at = model.rebuild(
+        columns["user"], columns["exercise"], columns["hours"], columns["set_count"], len(user_codes), at=at
+    )
+    return [FatigueState(user_id, levels[code], float(state_at[code])) for user_id, code in user_codes.items()]
+
+
+_model: Optional[FatigueModel] = None
+_model_lock = threading.Lock()
+
+
+def get_fatigue_model(matrix: Optional[MuscleVolumeMatrix] = None) -> FatigueModel:
+    """Process-wide model over the enriched catalog's activation matrix."""
+    global _model
+    matrix = matrix or get_volume_matrix()
+    with _model_lock:
+        if _model is None or _model.matrix is not matrix:
+            _model = FatigueModel(matrix)
+        return _model
+
+
+_catalog_model: Optional[FatigueModel] = None
+
+
+def get_catalog_fatigue_model() -> FatigueModel:
+    """Process-wide model over the `exercises` table (DB ids, as referenced by workout_logs)."""
+    global _catalog_model
+    with _model_lock:
+        if _catalog_model is None:
+            _catalog_model = FatigueModel(MuscleVolumeMatrix.from_rows(read_exercises(CATALOG_COLUMNS)))
+        return _catalog_model
+
+
+def record_session(client, rows: Sequence[Mapping[str, Any]], model: Optional[FatigueModel] = None) -> List[FatigueState]:
+    """Fold newly logged workout_logs rows into user_muscle_fatigue and return the new states.
+
+    Rows are read like `SessionBuffer` reads them (working sets = sets with reps > 0) and
+    applied per user in time order with `FatigueModel.update` on top of the stored row, so the
+    result matches a full rebuild. `model` defaults to `get_catalog_fatigue_model()`.
+    """
+    model = model or get_catalog_fatigue_model()
+    buffer = SessionBuffer()
+    buffer.add_page(list(rows))
+    if not len(buffer):
+        return []
+    columns = buffer.columns()
+    user_ids = list(buffer.user_codes)
+    stored = (
+        client.table("user_muscle_fatigue").select(STATE_COLUMNS).in_("user_id", user_ids).execute().data or []
+    )
+    states = {row["user_id"]: FatigueState.from_row(row, model.groups) for row in stored}
+
+    for user_id, code in buffer.user_codes.items():
+        state = states.setdefault(user_id, model.empty_state(user_id))
+        mine = np.flatnonzero((columns["user"] == code) & np.isfinite(columns["hours"]))
+        for at in np.unique(columns["hours"][mine]):
+            session = mine[columns["hours"][mine] == at]
+            model.update(state, columns["exercise"][session], columns["set_count"][session], float(at))
+
+    result = [states[user_id] for user_id in user_ids]
+    client.table("user_muscle_fatigue").upsert(
+        [state.to_row(model.groups) for state in result], on_conflict="user_id"
+    ).execute()
+    return result
@@ -0,0 +1,274 @@
+"""Weekly effective sets per muscle group from EMG activation weights.
+
+Every exercise's `emg.activacion_proxy` (alto / medio / bajo) is compiled once into a sparse
+exercise × muscle-group weight matrix in CSR form (`indptr`, `indices`, `data`): a set of an
+exercise counts ACTIVATION_WEIGHTS[level] effective sets for each group it hits, keeping the
+highest weight when several muscles of the exercise fall in the same group. Exercises without
+an EMG proxy fall back to main (1.0) / secondary (0.5) muscles.
+
+A plan is a sparse vector of weekly sets per exercise, so volumes for many plans at once are one
+sparse × sparse product: each (plan, exercise, sets) entry is expanded over that exercise's
+CSR row and accumulated with `np.bincount` into a dense (plans × groups) matrix. numpy only;
+scipy is not a dependency of the app.
+
+Exercises with neither an EMG proxy nor mapped main / secondary muscles have an empty row and
+add no volume anywhere, so a plan built on them looks under-trained. `unknown_sets` measures
+those sets per plan, and `assess` reports them next to the plan's flags.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.exercise_index import csr_rows
+from app.exercise_snapshot import ExerciseSnapshot, load_exercise_snapshot
+
+ACTIVATION_WEIGHTS = {"alto": 1.0, "medio": 0.5, "bajo": 0.25}
+MAIN_WEIGHT = 1.0
+SECONDARY_WEIGHT = 0.5
+
+MUSCLE_GROUPS = (
+    "pecho", "espalda", "trapecio", "hombros", "bíceps", "tríceps", "antebrazo",
+    "cuádriceps", "isquiotibiales", "glúteos", "aductores", "gemelos", "core", "lumbar",
+)
+# Base muscle name (qualifier stripped) -> group; unlisted muscles (e.g. stabilizers of the
+# rotator cuff) don't count towards any group.
+MUSCLE_TO_GROUP = {
+    "pectoral mayor": "pecho", "serrato anterior": "pecho",
+    "dorsal ancho": "espalda", "redondo mayor": "espalda", "romboides": "espalda",
+    "trapecio medio": "espalda", "trapecio medio/inferior": "espalda", "trapecio inferior": "espalda",
+    "trapecio": "trapecio", "trapecio superior": "trapecio", "trapecio superior e inferior": "trapecio",
+    "elevador de la escápula": "trapecio",
+    "deltoides anterior": "hombros", "deltoides medio": "hombros", "deltoides posterior": "hombros",
+    "deltoides (anterior y medio)": "hombros", "deltoides anterior/posterior": "hombros",
+    "bíceps braquial": "bíceps", "braquial": "bíceps", "braquiorradial": "antebrazo",
+    "tríceps braquial": "tríceps", "ancóneo": "tríceps",
+    "flexores del antebrazo": "antebrazo", "flexores/extensores del antebrazo": "antebrazo",
+    "agarre/antebrazo": "antebrazo", "supinador": "antebrazo", "pronador redondo": "antebrazo",
+    "cuádriceps": "cuádriceps", "isquiotibiales": "isquiotibiales",
+    "glúteo mayor": "glúteos", "glúteo medio": "glúteos", "tensor de la fascia lata": "glúteos",
+    "tensor fascia lata": "glúteos", "aductores": "aductores",
+    "gastrocnemio": "gemelos", "sóleo": "gemelos",
+    "recto abdominal": "core", "transverso abdominal": "core", "oblicuos": "core", "core": "core",
+    "flexores de cadera": "core", "erectores espinales": "lumbar", "cuadrado lumbar": "lumbar",
+}
+# Weekly effective sets per group: (minimum, maximum) for a typical hypertrophy block.
+VOLUME_TARGETS: Dict[str, Tuple[float, float]] = {
+    "pecho": (10, 20), "espalda": (10, 22), "trapecio": (4, 16), "hombros": (8, 22),
+    "bíceps": (6, 20), "tríceps": (6, 18), "antebrazo": (2, 14), "cuádriceps": (8, 18),
+    "isquiotibiales": (6, 16), "glúteos": (6, 16), "aductores": (2, 12), "gemelos": (6, 16),
+    "core": (4, 16), "lumbar": (2, 10),
+}
+_QUALIFIER = re.compile(r"\s*\([^)]*\)$")
+
+
+def muscle_group(muscle: str) -> Optional[str]:
+    muscle = (muscle or "").strip()
+    return MUSCLE_TO_GROUP.get(muscle) or MUSCLE_TO_GROUP.get(_QUALIFIER.sub("", muscle))
+
+
+@dataclass
+class VolumeFlag:
+    group: str
+    sets: float
+    low: float
+    high: float
+    status: str  # "below" | "above"
+
+
+@dataclass
+class PlanVolume:
+    """Weekly volume of one plan, its out-of-range flags and the sets no group could count."""
+
+    volume: Dict[str, float]
+    flags: List[VolumeFlag]
+    total_sets: float
+    unknown_sets: float  # on exercises with an empty row or missing from the matrix
+    unknown_exercise_ids: List[int]
+
+    @property
+    def coverage(self) -> float:
+        """Share of the plan's weekly sets that count towards some group."""
+        return 1.0 - self.unknown_sets / self.total_sets if self.total_sets else 1.0
+
+
+class MuscleVolumeMatrix:
+    """Sparse exercise × group weights; rows are addressed by exercise id."""
+
+    def __init__(self, exercise_ids: Sequence[int], dense: np.ndarray, groups: Sequence[str] = MUSCLE_GROUPS):
+        self.groups = list(groups)
+        self.exercise_ids = np.asarray(exercise_ids, dtype=np.int64)
+        self._row_of = {int(i): row for row, i in enumerate(self.exercise_ids)}
+        rows, cols = np.nonzero(dense)
+        self.indptr = np.zeros(len(dense) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(dense)))
+        self.indices = cols.astype(np.int32)
+        self.data = dense[rows, cols].astype(np.float32)
+        self.unmapped = np.diff(self.indptr) == 0  # per row: no muscle data at all
+
+    @classmethod
+    def from_activations(cls, items: Iterable[Tuple[int, Mapping[str, Any], Sequence[str], Sequence[str]]]):
+        """Build from (exercise id, activacion_proxy dict, main muscles, secondary muscles) tuples."""
+        column = {group: j for j, group in enumerate(MUSCLE_GROUPS)}
+        ids, rows = [], []
+        for exercise_id, activation, main, secondary in items:
+            row = np.zeros(len(MUSCLE_GROUPS), dtype=np.float32)
+            sources = [(muscles or [], ACTIVATION_WEIGHTS[level]) for level, muscles in (activation or {}).items() if level in ACTIVATION_WEIGHTS]
+            if not any(muscles for muscles, _ in sources):
+                sources = [(main or [], MAIN_WEIGHT), (secondary or [], SECONDARY_WEIGHT)]
+            for muscles, weight in sources:
+                for muscle in muscles:
+                    group = muscle_group(muscle)
+                    if group is not None:
+                        row[column[group]] = max(row[column[group]], weight)
+            ids.append(int(exercise_id))
+            rows.append(row)
+        return cls(ids, np.stack(rows) if rows else np.zeros((0, len(MUSCLE_GROUPS)), dtype=np.float32))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ExerciseSnapshot) -> "MuscleVolumeMatrix":
+        """Vectorized build over the compiled snapshot (JSON exercise ids)."""
+        n = len(snapshot)
+        group_of_code = np.array(
+            [MUSCLE_GROUPS.index(g) if (g := muscle_group(m)) else -1 for m in snapshot.vocab["muscles"]] + [-1],
+            dtype=np.int64,
+        )
+
+        def fill(fields: Sequence[Tuple[str, float]]) -> np.ndarray:
+            dense = np.zeros((n, len(MUSCLE_GROUPS)), dtype=np.float32)
+            for field, weight in fields:
+                offsets, codes = snapshot.lists(field)
+                groups = group_of_code[np.asarray(codes, dtype=np.int64)]
+                keep = groups >= 0
+                np.maximum.at(dense, (csr_rows(offsets)[keep], groups[keep]), weight)
+            return dense
+
+        emg = fill([(f"emg.activacion_proxy.{level}", w) for level, w in ACTIVATION_WEIGHTS.items()])
+        fallback = fill([("musculos_principales", MAIN_WEIGHT), ("musculos_secundarios", SECONDARY_WEIGHT)])
+        has_emg = np.zeros(n, dtype=bool)
+        for level in ACTIVATION_WEIGHTS:
+            has_emg |= np.diff(snapshot.lists(f"emg.activacion_proxy.{level}")[0].astype(np.int64)) > 0
+        return cls(snapshot.ids, np.where(has_emg[:, None], emg, fallback))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, Any]]) -> "MuscleVolumeMatrix":
+        """Build from `exercises` table rows (id, activation_profile, primary_muscles, secondary_muscles)."""
+        return cls.from_activations(
+            (row["id"], row.get("activation_profile"), row.get("primary_muscles"), row.get("secondary_muscles")) for row in rows
+        )
+
+    # -- products --------------------------------------------------------------------------
+    def expand(self, exercise_ids: np.ndarray, sets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expand (exercise id, sets) entries over their CSR rows: (entry index, group index, effective sets).
+
+        Entries whose exercise is unknown contribute nothing.
+        """
+        rows = self._rows(exercise_ids)
+        known = np.flatnonzero(rows >= 0)
+        rows, sets = rows[known], np.asarray(sets, dtype=np.float64)[known]
+        starts, counts = self.indptr[rows], self.indptr[rows + 1] - self.indptr[rows]
+        entry = np.repeat(np.arange(len(rows)), counts)
+        nz = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        return known[entry], self.indices[nz].astype(np.int64), sets[entry] * self.data[nz]
+
+    def _rows(self, exercise_ids: np.ndarray) -> np.ndarray:
+        return np.array([self._row_of.get(int(i), -1) for i in exercise_ids], dtype=np.int64)
+
+    def unknown_sets(self, plan_index: np.ndarray, exercise_ids: np.ndarray, sets: np.ndarray, n_plans: int) -> np.ndarray:
+        """(n_plans,) weekly sets of COO plan entries whose exercise adds no volume to any group."""
+        rows = self._rows(exercise_ids)
+        blind = (rows < 0) | self.unmapped[np.maximum(rows, 0)]
+        plan_index = np.asarray(plan_index, dtype=np.int64)[blind]
+        return np.bincount(plan_index, weights=np.asarray(sets, dtype=np.float64)[blind], minlength=n_plans)
+
+    def volumes(self, plan_index: np.ndarray, exercise_ids: np.ndarray, sets: np.ndarray, n_plans: int) -> np.ndarray:
+        """(n_plans, groups) weekly effective sets from COO plan entries (plan, exercise id, weekly sets)."""
+        entry, group, effective = self.expand(exercise_ids, sets)
+        flat = np.asarray(plan_index, dtype=np.int64)[entry] * len(self.groups) + group
+        totals = np.bincount(flat, weights=effective, minlength=n_plans * len(self.groups))
+        return totals.reshape(n_plans, len(self.groups))
+
+    def volumes_for(self, plans: Sequence[Mapping[int, float]]) -> np.ndarray:
+        """Volumes for plans given as {exercise id: weekly sets}."""
+        entries = [(p, exercise_id, sets) for p, plan in enumerate(plans) for exercise_id, sets in plan.items()]
+        if not entries:
+            return np.zeros((len(plans), len(self.groups)))
+        plan_index, exercise_ids, sets = (np.array(column) for column in zip(*entries))
+        return self.volumes(plan_index, exercise_ids, sets, len(plans))
+
+    def weekly_volume(self, plan: Mapping[int, float]) -> Dict[str, float]:
+        row = self.volumes_for([plan])[0]
+        return {group: round(float(v), 2) for group, v in zip(self.groups, row)}
+
+    def assess(self, plan: Mapping[int, float], targets: Optional[Mapping[str, Tuple[float, float]]] = None) -> PlanVolume:
+        """Volume and flags of a plan ({exercise id: weekly sets}) with its unknown coverage.
+
+        A "below" flag is only conclusive when `unknown_sets` is 0; otherwise the uncounted
+        sets may well train that group.
+        """
+        ids = np.array(list(plan), dtype=np.int64)
+        sets = np.array([float(v) for v in plan.values()], dtype=np.float64)
+        row = self.volumes_for([plan])[0]
+        rows = self._rows(ids)
+        blind = (rows < 0) | self.unmapped[np.maximum(rows, 0)]
+        return PlanVolume(
+            volume={group: round(float(v), 2) for group, v in zip(self.groups, row)},
+            flags=self.flags(row, targets),
+            total_sets=float(sets.sum()),
+            unknown_sets=float(self.unknown_sets(np.zeros(len(ids)), ids, sets, 1)[0]),
+            unknown_exercise_ids=[int(i) for i in ids[blind]],
+        )
+
+    # -- targets ---------------------------------------------------------------------------
+    def target_bounds(self, targets: Optional[Mapping[str, Tuple[float, float]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        targets = {**VOLUME_TARGETS, **(targets or {})}
+        low = np.array([targets.get(g, (0, np.inf))[0] for g in self.groups], dtype=np.float64)
+        high = np.array([targets.get(g, (0, np.inf))[1] for g in self.groups], dtype=np.float64)
+        return low, high
+
+    def out_of_range(self, volumes: np.ndarray, targets: Optional[Mapping[str, Tuple[float, float]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Boolean (plans, groups) arrays: below minimum, above maximum."""
+        low, high = self.target_bounds(targets)
+        return volumes < low, volumes > high
+
+    def flags(self, volume_row: np.ndarray, targets: Optional[Mapping[str, Tuple[float, float]]] = None) -> List[VolumeFlag]:
+        low, high = self.target_bounds(targets)
+        return [
+            VolumeFlag(group, round(float(v), 2), float(lo), float(hi), "below" if v < lo else "above")
+            for group, v, lo, hi in zip(self.groups, volume_row, low, high)
+            if v < lo or v > hi
+        ]
+
+
+def plan_sets(rows: Iterable[Mapping[str, Any]]) -> Dict[int, float]:
+    """{exercise id: weekly sets} from planned-exercise rows (one row per weekly occurrence).
+
+    Ids are kept as given, so the matrix must use the same id space: `get_volume_matrix()` is
+    keyed by enriched-catalog (JSON) ids, as in generated plans, while workout_plan_exercises
+    rows carry `exercises.id` and need a matrix built with `MuscleVolumeMatrix.from_rows`.
+    """
+    sets: Dict[int, float] = {}
+    for row in rows:
+        exercise_id = row.get("exercise_id")
+        if exercise_id is not None:
+            sets[int(exercise_id)] = sets.get(int(exercise_id), 0.0) + float(row.get("sets") or 3)
+    return sets
+
+
+_matrix: Optional[MuscleVolumeMatrix] = None
+_matrix_snapshot: Optional[ExerciseSnapshot] = None
+_matrix_lock = threading.Lock()
+
+
+def get_volume_matrix(snapshot: Optional[ExerciseSnapshot] = None) -> MuscleVolumeMatrix:
+    """Process-wide matrix over the enriched catalog (JSON exercise ids)."""
+    global _matrix, _matrix_snapshot
+    snapshot = snapshot or load_exercise_snapshot()
+    with _matrix_lock:
+        if _matrix is None or _matrix_snapshot is not snapshot:
+            _matrix, _matrix_snapshot = MuscleVolumeMatrix.from_snapshot(snapshot), snapshot
+        return _matrix
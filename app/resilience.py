@@ -0,0 +1,221 @@
+"""Tail-latency protection for read paths: deadlines, hedged reads and circuit breakers.
+
+`read_guard.read(group, key, fn)` runs the blocking read `fn` on a worker thread and waits at
+most SUPABASE_READ_DEADLINE_SECONDS. If the call is still pending after the group's observed
+p95 latency, one duplicate (hedged) request is sent and whichever answers first wins; hedges
+are capped at HEDGE_RATIO of recent calls so a degraded backend doesn't see doubled load.
+Consecutive failures/timeouts open the group's circuit breaker, which then short-circuits
+calls until a half-open probe succeeds.
+
+When a read fails, times out or is short-circuited, the last good result for the same key is
+returned if there is one; otherwise the error is raised and the caller's existing fallback
+(default profile, demo data, empty list) applies. Only idempotent reads belong here.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Set
+
+from app.cache import MISS, TTLCache
+
+logger = logging.getLogger(__name__)
+
+READ_DEADLINE = float(os.getenv("SUPABASE_READ_DEADLINE_SECONDS", "2.0"))
+HEDGE_RATIO = 0.1
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 15.0
+WORKERS = 16
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self._clock()
+                self._probing = False
+
+
+class LatencyWindow:
+    """Recent successful latencies and hedge decisions for one group."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=size)
+        self._hedged: Deque[bool] = deque(maxlen=size)
+        self._p95: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) >= HEDGE_MIN_SAMPLES and len(self._latencies) % 10 == 0:
+                ordered = sorted(self._latencies)
+                self._p95 = ordered[int(0.95 * (len(ordered) - 1))]
+
+    def hedge_delay(self) -> Optional[float]:
+        return self._p95
+
+    def note_call(self, hedged: bool) -> None:
+        with self._lock:
+            self._hedged.append(hedged)
+
+    def may_hedge(self) -> bool:
+        with self._lock:
+            return sum(self._hedged) < HEDGE_RATIO * max(len(self._hedged), 1 / HEDGE_RATIO)
+
+
+class ReadGuard:
+    def __init__(self, deadline: float = READ_DEADLINE, workers: int = WORKERS, last_good_ttl: float = 86400.0,
+                 reset_timeout: float = RESET_TIMEOUT):
+        self.deadline = deadline
+        self.reset_timeout = reset_timeout
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._windows: Dict[str, LatencyWindow] = {}
+        self.last_good = TTLCache(maxsize=4096, ttl=last_good_ttl)
+        self.counters: Dict[str, int] = {
+            "calls": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "errors": 0, "short_circuits": 0, "stale_served": 0,
+        }
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="read-guard")
+        return self._executor
+
+    def breaker(self, group: str) -> CircuitBreaker:
+        with self._lock:
+            return self._breakers.setdefault(group, CircuitBreaker(reset_timeout=self.reset_timeout))
+
+    def _window(self, group: str) -> LatencyWindow:
+        with self._lock:
+            return self._windows.setdefault(group, LatencyWindow())
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def read(self, group: str, key: Hashable, fn: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        """Result of `fn()` within the deadline, else the last good value for `key`, else raise."""
+        self._count("calls")
+        breaker = self.breaker(group)
+        if not breaker.allow():
+            self._count("short_circuits")
+            return self._fallback(group, key, CircuitOpenError(f"circuit open for {group}"))
+        window = self._window(group)
+        deadline = self.deadline if deadline is None else deadline
+        hedge_delay = window.hedge_delay()
+        started = time.perf_counter()
+        first = self._pool().submit(fn)
+        pending: Set[Future] = {first}
+        hedged = hedge_delay is None or hedge_delay >= deadline
+        issued = 1
+        error: Optional[BaseException] = None
+        while True:
+            now = time.perf_counter()
+            remaining = started + deadline - now
+            if remaining <= 0:
+                break
+            timeout = remaining if hedged else min(remaining, max(started + hedge_delay - now, 0.0))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    window.record(time.perf_counter() - started)
+                    window.note_call(issued > 1)
+                    breaker.record_success()
+                    if future is not first:
+                        self._count("hedge_wins")
+                    result = future.result()
+                    self.last_good.set(key, result)
+                    return result
+                error = exc
+            if not pending:
+                break
+            if not hedged:
+                hedged = True
+                if window.may_hedge():
+                    self._count("hedges")
+                    pending.add(self._pool().submit(fn))
+                    issued += 1
+        window.note_call(issued > 1)
+        breaker.record_failure()
+        if error is None:
+            self._count("timeouts")
+            error = DeadlineExceeded(f"{group} read exceeded {deadline:.2f}s")
+        else:
+            self._count("errors")
+        return self._fallback(group, key, error)
+
+    def _fallback(self, group: str, key: Hashable, error: BaseException) -> Any:
+        value = self.last_good.get(key)
+        if value is not MISS:
+            self._count("stale_served")
+            logger.error(f"Serving last good {group} result: {error}")
+            return value
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "breakers": {group: b.state for group, b in self._breakers.items()},
+                "hedge_after_ms": {
+                    group: round(w.hedge_delay() * 1000, 1) for group, w in self._windows.items() if w.hedge_delay()
+                },
+            }
+
+
+read_guard = ReadGuard()
@@ -0,0 +1,328 @@
+"""Server-side weekly routine generation from split templates.
+
+A split (full body / upper-lower / push-pull-legs) is a list of training days, each a list of
+slots; a slot names the movement patterns of `templates.patterns` that may fill it. For one
+user:
+
+1. Candidate lookup is indexed: the feasible rows of a slot (its patterns AND the user's
+   equipment AND level, all `ExerciseIndex` bitsets) are cached per (equipment, level, slot),
+   and the user's personalized scores (`ExerciseRanker.score`, one matrix product for a batch
+   of users) pick the top CANDIDATES of them. A seeded Gumbel jitter on those scores varies
+   plans between seeds while keeping each (seed, user) pair deterministic.
+2. A beam search (BEAM_WIDTH states) walks the week slot by slot choosing an exercise and a
+   set count for each slot. States carry their weekly effective sets per muscle group (the
+   `app.muscle_volume` weights), and are ranked by exercise quality minus penalties for
+   exceeding the group's weekly maximum, falling short of its minimum by more than the
+   remaining slots can still add, and repeating exercises. Expansions of all states are scored at
+   once with numpy.
+
+Targets are `VOLUME_TARGETS` scaled by level. Exercise ids are those of the enriched catalog.
+"""
+from __future__ import annotations
+
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.exercise_index import LEVEL_ORDER, ExerciseIndex
+from app.exercise_ranking import ExerciseRanker, UserPreferences, get_exercise_ranker
+from app.muscle_volume import VOLUME_TARGETS, MuscleVolumeMatrix, get_volume_matrix
+
+Slot = Tuple[str, ...]  # movement patterns that may fill the slot
+
+SPLITS: Dict[str, List[Tuple[str, List[Slot]]]] = {
+    "full_body": [
+        ("Full body A", [("squat",), ("horizontal_press",), ("horizontal_pull",), ("hip_hinge",), ("shoulder_raise",), ("core_anti_extension", "core_flexion")]),
+        ("Full body B", [("hip_hinge", "hip_thrust_bridge"), ("vertical_press",), ("vertical_pull",), ("lunge_step",), ("elbow_flexion_curl",), ("triceps_extension",)]),
+        ("Full body C", [("lunge_step", "squat"), ("horizontal_press", "chest_fly"), ("vertical_pull", "horizontal_pull"), ("hip_thrust_bridge",), ("calf_raise",), ("core_rotation_antirotation", "core_flexion")]),
+    ],
+    "upper_lower": [
+        ("Upper A", [("horizontal_press",), ("horizontal_pull",), ("vertical_press",), ("vertical_pull",), ("elbow_flexion_curl",), ("triceps_extension",)]),
+        ("Lower A", [("squat",), ("hip_hinge",), ("lunge_step",), ("knee_flexion_isolation", "hip_thrust_bridge"), ("calf_raise",), ("core_anti_extension", "core_flexion")]),
+        ("Upper B", [("vertical_pull",), ("horizontal_press", "chest_fly"), ("horizontal_pull",), ("shoulder_raise",), ("scapular_retraction", "shrug"), ("elbow_flexion_curl", "triceps_extension")]),
+        ("Lower B", [("hip_hinge",), ("squat", "lunge_step"), ("hip_thrust_bridge",), ("knee_extension_isolation", "lunge_step"), ("hip_abduction_kickback", "calf_raise"), ("core_rotation_antirotation", "spinal_extension")]),
+    ],
+    "ppl": [
+        ("Push A", [("horizontal_press",), ("vertical_press",), ("chest_fly",), ("shoulder_raise",), ("triceps_extension",)]),
+        ("Pull A", [("vertical_pull",), ("horizontal_pull",), ("scapular_retraction", "shrug"), ("elbow_flexion_curl",), ("core_flexion", "core_anti_extension")]),
+        ("Legs A", [("squat",), ("hip_hinge",), ("lunge_step",), ("knee_flexion_isolation",), ("calf_raise",)]),
+        ("Push B", [("vertical_press",), ("horizontal_press",), ("shoulder_raise",), ("chest_fly", "horizontal_press"), ("triceps_extension",)]),
+        ("Pull B", [("horizontal_pull",), ("vertical_pull",), ("shoulder_raise", "scapular_retraction"), ("elbow_flexion_curl",), ("core_rotation_antirotation", "spinal_extension")]),
+        ("Legs B", [("hip_hinge",), ("squat", "lunge_step"), ("hip_thrust_bridge",), ("knee_extension_isolation", "knee_flexion_isolation"), ("calf_raise", "hip_abduction_kickback")]),
+    ],
+}
+DEFAULT_SPLIT_BY_LEVEL = {"principiante": "full_body", "intermedio": "upper_lower", "avanzado": "ppl"}
+WEEKDAYS_BY_SESSIONS = {3: (1, 3, 5), 4: (1, 2, 4, 5), 6: (1, 2, 3, 4, 5, 6)}
+
+# profiles.goal -> `rangos_repeticiones_por_objetivo` objective, and rest between sets.
+GOAL_OBJECTIVE = {"Volumen": "hipertrofia", "Mantener": "hipertrofia", "Definir": "fuerza_resistencia"}
+REST_SECONDS = {"fuerza_maxima": 180, "hipertrofia": 90, "fuerza_resistencia": 60, "resistencia": 45}
+DEFAULT_REPS = {"fuerza_maxima": "1-5", "hipertrofia": "6-12", "fuerza_resistencia": "15-25", "resistencia": "26+"}
+BASE_SETS = {"principiante": 3, "intermedio": 3, "avanzado": 4}
+SET_OPTIONS = (-1, 0, 1)  # searched around the base, clipped to [MIN_SETS, MAX_SETS]
+MIN_SETS, MAX_SETS = 2, 5
+VOLUME_SCALE = {"principiante": 0.6, "intermedio": 0.8, "avanzado": 1.0}
+
+CANDIDATES = 6
+BEAM_WIDTH = 4
+JITTER = 0.05  # Gumbel scale on exercise scores; 0 makes the seed irrelevant
+EXCESS_PENALTY = 0.3  # per effective set above a group's weekly maximum
+DEFICIT_PENALTY = 0.2  # per effective set the week can no longer reach of a group's minimum
+REPEAT_PENALTY = 0.5  # same exercise on another day of the week
+LEVEL_STEP_PENALTY = 0.3  # per level above the user's, for slots relaxed to harder exercises
+SET_COST = 0.02  # per set, so surplus sets have to buy volume
+
+
+@dataclass
+class PlannedExercise:
+    exercise_id: int
+    name: str
+    pattern: str
+    sets: int
+    reps: str
+    rest_seconds: int
+
+
+@dataclass
+class GeneratedPlan:
+    user_id: str
+    split: str
+    seed: int
+    days: List[Tuple[str, int, List[PlannedExercise]]]  # (name, day_of_week, exercises)
+    weekly_volume: Dict[str, float]
+    score: float
+    unfilled: List[Tuple[str, Slot]] = field(default_factory=list)  # (day, slot) with no feasible exercise
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """workout_plan_exercises-style rows (one per exercise and weekday)."""
+        return [
+            {
+                "exercise_id": item.exercise_id,
+                "day_of_week": day_of_week,
+                "sets": item.sets,
+                "reps": item.reps,
+                "rest_seconds": item.rest_seconds,
+            }
+            for _, day_of_week, items in self.days
+            for item in items
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "split": self.split,
+            "seed": self.seed,
+            "score": round(self.score, 4),
+            "days": [
+                {"name": name, "day_of_week": day_of_week, "exercises": [item.__dict__ for item in items]}
+                for name, day_of_week, items in self.days
+            ],
+            "weekly_volume": self.weekly_volume,
+            "unfilled": [{"day": day, "patterns": list(slot)} for day, slot in self.unfilled],
+        }
+
+
+def default_split(level: str) -> str:
+    return DEFAULT_SPLIT_BY_LEVEL.get(level, "full_body")
+
+
+def rep_ranges(templates: Dict[str, Any]) -> Dict[str, str]:
+    """Objective -> reps string from `global_principles.rangos_repeticiones_por_objetivo`."""
+    ranges = dict(DEFAULT_REPS)
+    for item in (templates.get("global_principles") or {}).get("rangos_repeticiones_por_objetivo") or []:
+        if item.get("objetivo") and item.get("reps"):
+            ranges[item["objetivo"]] = item["reps"]
+    return ranges
+
+
+def _user_seed(seed: int, user_id: str) -> np.random.Generator:
+    # crc32 rather than hash(): stable across processes, so (seed, user) always yields the same plan.
+    return np.random.default_rng([seed, zlib.crc32(str(user_id).encode("utf-8"))])
+
+
+class RoutineGenerator:
+    def __init__(self, ranker: ExerciseRanker, matrix: MuscleVolumeMatrix):
+        self.ranker = ranker
+        self.index: ExerciseIndex = ranker.index
+        self.snapshot = self.index.snapshot
+        if not np.array_equal(matrix.exercise_ids, self.index.ids):
+            raise ValueError("Volume matrix rows must follow the snapshot's row order")
+        self.matrix = matrix
+        self.groups = matrix.groups
+        weights = np.zeros((self.index.n, len(self.groups)), dtype=np.float64)
+        rows = np.repeat(np.arange(self.index.n), np.diff(matrix.indptr))
+        weights[rows, matrix.indices] = matrix.data
+        self.weights = weights
+        self.pattern_codes = np.asarray(self.snapshot.column("patron_movimiento_id"))
+        self.patterns = self.snapshot.vocab["patterns"]
+        self.reps = rep_ranges(self.snapshot.templates)
+        self._slot_rows: Dict[Tuple[frozenset, str, Slot], Tuple[np.ndarray, np.ndarray]] = {}
+
+    # -- candidates ------------------------------------------------------------------------
+    def slot_rows(self, equipment: frozenset, level: str, slot: Slot) -> Tuple[np.ndarray, np.ndarray]:
+        """Feasible rows for a slot and their score offsets, cached per (equipment, level, slot).
+
+        Some patterns have no exercises at the lower levels (no beginner squat or press), so a
+        slot with fewer than CANDIDATES rows is relaxed one level at a time, each step costing
+        LEVEL_STEP_PENALTY.
+        """
+        key = (equipment, level, slot)
+        cached = self._slot_rows.get(key)
+        if cached is None:
+            if len(self._slot_rows) > 8192:
+                self._slot_rows.clear()
+            base = self.index.mask(patterns=slot, equipment_within=equipment)
+            rows, offsets, seen = [], [], 0
+            for step, allowed in enumerate(LEVEL_ORDER[LEVEL_ORDER.index(level):]):
+                bits = base & self.index.max_level(allowed) & ~seen
+                seen |= bits
+                found = self.index.rows(bits)
+                rows.append(found)
+                offsets.append(np.full(len(found), -LEVEL_STEP_PENALTY * step))
+                if sum(len(r) for r in rows) >= CANDIDATES:
+                    break
+            cached = self._slot_rows[key] = (np.concatenate(rows), np.concatenate(offsets))
+        return cached
+
+    def _candidates(self, rows: np.ndarray, offsets: np.ndarray, scores: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Top CANDIDATES rows of a slot by jittered score, best first."""
+        values = scores[rows].astype(np.float64) + offsets
+        if JITTER:
+            values = values + rng.gumbel(0.0, JITTER, len(rows))
+        top = min(CANDIDATES, len(rows))
+        picked = np.argpartition(-values, top - 1)[:top] if top < len(rows) else np.arange(top)
+        picked = picked[np.lexsort((rows[picked], -values[picked]))]
+        return rows[picked], values[picked]
+
+    # -- search ----------------------------------------------------------------------------
+    def generate_scored(self, user: UserPreferences, scores: np.ndarray, split: Optional[str] = None, seed: int = 0) -> GeneratedPlan:
+        """Plan for one user given their row of unmasked `ExerciseRanker.score`s."""
+        level = user.normalized_level()
+        split = split or default_split(level)
+        template = SPLITS[split]
+        equipment = user.available_equipment()
+        rng = _user_seed(seed, user.user_id)
+        base_sets = BASE_SETS.get(level, 3)
+        set_options = np.clip(base_sets + np.array(SET_OPTIONS), MIN_SETS, MAX_SETS).astype(np.float64)
+        set_options = np.unique(set_options)
+        scale = VOLUME_SCALE.get(level, 1.0)
+        low = np.array([VOLUME_TARGETS.get(g, (0, np.inf))[0] for g in self.groups]) * scale
+        high = np.array([VOLUME_TARGETS.get(g, (0, np.inf))[1] for g in self.groups]) * scale
+
+        slots: List[Tuple[int, Slot, np.ndarray, np.ndarray]] = []  # (day, slot, candidate rows, values)
+        unfilled: List[Tuple[str, Slot]] = []
+        for day, (day_name, day_slots) in enumerate(template):
+            for slot in day_slots:
+                rows, offsets = self.slot_rows(equipment, level, slot)
+                if len(rows):
+                    slots.append((day, slot, *self._candidates(rows, offsets, scores, rng)))
+                else:
+                    unfilled.append((day_name, slot))
+
+        n_slots, n_sets = len(slots), len(set_options)
+        # Volume the slots after t can still add at base sets (best candidate per group), so a
+        # partial plan is only penalized for deficits the rest of the week can't make up.
+        reachable = np.zeros((n_slots + 1, len(self.groups)))
+        for t in range(n_slots - 1, -1, -1):
+            reachable[t] = reachable[t + 1] + base_sets * self.weights[slots[t][2]].max(0)
+        volume = np.zeros((1, len(self.groups)))
+        quality = np.zeros(1)
+        chosen = np.full((1, n_slots), -1, dtype=np.int64)
+        chosen_sets = np.zeros((1, n_slots))
+        day_of_slot = np.array([day for day, *_ in slots], dtype=np.int64)
+        for t, (day, _, rows, values) in enumerate(slots):
+            # Expansions: (beam, candidate, set option)
+            n_beam, n_cand = len(volume), len(rows)
+            added = set_options[None, :, None] * self.weights[rows][:, None, :]  # (cand, sets, groups)
+            new_volume = volume[:, None, None, :] + added[None]
+            excess = np.maximum(new_volume - high, 0.0).sum(-1)
+            deficit = np.maximum(low - reachable[t + 1] - new_volume, 0.0).sum(-1)
+
+            earlier = chosen[:, :t]
+            same = earlier[:, :, None] == rows[None, None, :]  # (beam, t, cand)
+            same_day = (same & (day_of_slot[:t] == day)[None, :, None]).any(1)
+            repeated = same.any(1)
+            gain = quality[:, None] + values[None, :] - REPEAT_PENALTY * repeated - np.where(same_day, np.inf, 0.0)
+            objective = gain[:, :, None] - SET_COST * set_options[None, None, :] - EXCESS_PENALTY * excess - DEFICIT_PENALTY * deficit
+
+            flat = objective.ravel()
+            keep = min(BEAM_WIDTH, int(np.isfinite(flat).sum()))
+            if keep == 0:
+                unfilled.append((template[day][0], slots[t][1]))  # only already-used candidates: leave empty
+                continue
+            best = np.argpartition(-flat, keep - 1)[:keep] if keep < len(flat) else np.arange(len(flat))
+            best = best[np.lexsort((best, -flat[best]))]
+            beam, cand, option = np.unravel_index(best, (n_beam, n_cand, n_sets))
+
+            volume = new_volume[beam, cand, option]
+            quality = gain[beam, cand] - SET_COST * set_options[option]
+            chosen = chosen[beam].copy()
+            chosen[:, t] = rows[cand]
+            chosen_sets = chosen_sets[beam].copy()
+            chosen_sets[:, t] = set_options[option]
+
+        final = quality - EXCESS_PENALTY * np.maximum(volume - high, 0.0).sum(-1) - DEFICIT_PENALTY * np.maximum(low - volume, 0.0).sum(-1)
+        winner = int(np.argmax(final))
+        return self._plan(user, split, seed, slots, chosen[winner], chosen_sets[winner], volume[winner], float(final[winner]), unfilled)
+
+    def _plan(self, user, split, seed, slots, rows, sets, volume, score, unfilled) -> GeneratedPlan:
+        template = SPLITS[split]
+        weekdays = WEEKDAYS_BY_SESSIONS.get(len(template), tuple(range(1, len(template) + 1)))
+        objective = GOAL_OBJECTIVE.get(user.goal, "hipertrofia")
+        reps, rest = self.reps.get(objective, DEFAULT_REPS["hipertrofia"]), REST_SECONDS.get(objective, 90)
+        days: List[Tuple[str, int, List[PlannedExercise]]] = [(name, weekdays[d], []) for d, (name, _) in enumerate(template)]
+        for (day, _, _, _), row, n_sets in zip(slots, rows, sets):
+            if row < 0:
+                continue
+            days[day][2].append(PlannedExercise(
+                exercise_id=int(self.index.ids[row]),
+                name=self.snapshot.name_es(int(row)) or self.snapshot.name_en(int(row)),
+                pattern=self.patterns[int(self.pattern_codes[row])],
+                sets=int(n_sets),
+                reps=reps,
+                rest_seconds=rest,
+            ))
+        return GeneratedPlan(
+            user_id=user.user_id,
+            split=split,
+            seed=seed,
+            days=days,
+            weekly_volume={group: round(float(v), 2) for group, v in zip(self.groups, volume)},
+            score=score,
+            unfilled=unfilled,
+        )
+
+    def generate(self, user: UserPreferences, split: Optional[str] = None, seed: int = 0) -> GeneratedPlan:
+        return self.generate_scored(user, self.ranker.score([user], masked=False)[0], split, seed)
+
+    def generate_many(
+        self,
+        users: Sequence[UserPreferences],
+        split: Optional[str] = None,
+        seed: int = 0,
+        chunk_size: int = 1024,
+    ) -> List[GeneratedPlan]:
+        """Plans for many users; scores are computed per chunk with one matrix product."""
+        plans: List[GeneratedPlan] = []
+        for start in range(0, len(users), chunk_size):
+            chunk = users[start:start + chunk_size]
+            scores = self.ranker.score(chunk, masked=False)
+            plans.extend(self.generate_scored(user, scores[i], split, seed) for i, user in enumerate(chunk))
+        return plans
+
+
+_generator: Optional[RoutineGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def get_routine_generator() -> RoutineGenerator:
+    """Process-wide generator over the current catalog."""
+    global _generator
+    ranker = get_exercise_ranker()
+    with _generator_lock:
+        if _generator is None or _generator.ranker is not ranker:
+            _generator = RoutineGenerator(ranker, get_volume_matrix(ranker.snapshot))
+        return _generator
@@ -0,0 +1,262 @@
+"""Strength-progression analytics over workout_logs.sets_data.
+
+Pipeline:
+
+1. `stream_logs` pages through workout_logs with keyset pagination (`id > last_id`, ordered by
+   id), for one user or the whole table, so each request is an index range scan however deep
+   it goes.
+2. `flatten_sets` turns a page's JSONB sets into columnar arrays, and `SessionBuffer.add_page`
+   immediately reduces them to one row per log (best e1RM, volume load, top weight, working
+   sets, timestamp). Only those session rows (40 bytes each) are kept, so memory scales with
+   sessions, not sets.
+3. `analyze` sorts sessions by (user, exercise, day) once and computes everything with
+   group-segmented numpy ops: running best e1RM (PRs), sessions since the last PR, a rolling
+   window of PR counts for plateau flags, and the recent volume load.
+
+e1RM uses Epley on reps-to-failure: weight × (1 + (reps + RIR) / 30).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+PAGE_SIZE = 1000
+LOG_COLUMNS = "id, user_id, exercise_id, date, sets_data"
+MAX_REPS_FOR_E1RM = 15  # Epley loses accuracy past this
+PLATEAU_WINDOW = 4  # sessions without a new best e1RM
+PR_TOLERANCE = 0.005  # a PR must beat the previous best by 0.5%
+VOLUME_WINDOW_DAYS = 28
+_EPOCH = date(1970, 1, 1)
+
+
+def stream_logs(client, user_id: Optional[str] = None, page_size: int = PAGE_SIZE, after_id: int = 0) -> Iterator[List[Dict[str, Any]]]:
+    """Pages of workout_logs rows in id order via keyset pagination, until a page comes back empty."""
+    last_id = after_id
+    while True:
+        query = client.table("workout_logs").select(LOG_COLUMNS).gt("id", last_id)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        rows = query.order("id").limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+@dataclass
+class SetColumns:
+    log: np.ndarray  # int32 position of the log within the page
+    weight: np.ndarray  # float32 kg
+    reps: np.ndarray  # float32
+    rir: np.ndarray  # float32, 0 when missing
+
+
+def flatten_sets(rows: Sequence[Dict[str, Any]]) -> SetColumns:
+    log, weight, reps, rir = [], [], [], []
+    for position, row in enumerate(rows):
+        for item in row.get("sets_data") or []:
+            if not isinstance(item, dict):
+                continue
+            log.append(position)
+            weight.append(_float(item.get("weight")))
+            reps.append(_float(item.get("reps")))
+            rir.append(_float(item.get("rir")))
+    rir_array = np.array(rir, dtype=np.float32)
+    return SetColumns(
+        log=np.array(log, dtype=np.int32),
+        weight=np.array(weight, dtype=np.float32),
+        reps=np.array(reps, dtype=np.float32),
+        rir=np.nan_to_num(rir_array, nan=0.0),
+    )
+
+
+def e1rm(weight: np.ndarray, reps: np.ndarray, rir: np.ndarray) -> np.ndarray:
+    """Epley estimate with RIR folded into reps; NaN for unusable sets."""
+    to_failure = reps + np.maximum(rir, 0)
+    valid = (weight > 0) & (reps > 0) & (to_failure <= MAX_REPS_FOR_E1RM)
+    return np.where(valid, weight * (1 + to_failure / 30.0), np.nan).astype(np.float32)
+
+
+def _day(value: Any) -> int:
+    text = str(value or "")[:10]
+    try:
+        return (date.fromisoformat(text) - _EPOCH).days
+    except ValueError:
+        return -1
+
+
+def _hours(value: Any) -> float:
+    """Hours since epoch (UTC) of a log date/timestamp; NaN when unparseable."""
+    text = str(value or "").strip().replace("Z", "+00:00")
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return np.nan
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() / 3600.0
+
+
+class SessionBuffer:
+    """Append-only columnar session rows (one per workout_logs row), grown in chunks."""
+
+    def __init__(self):
+        self.user_codes: Dict[str, int] = {}
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self.sets = 0
+
+    def add_page(self, rows: Sequence[Dict[str, Any]]) -> None:
+        rows = [row for row in rows if row.get("exercise_id") is not None and row.get("user_id")]
+        if not rows:
+            return
+        columns = flatten_sets(rows)
+        self.sets += len(columns.log)
+        n = len(rows)
+        estimates = e1rm(columns.weight, columns.reps, columns.rir)
+        best = np.full(n, -np.inf, dtype=np.float32)
+        np.maximum.at(best, columns.log, np.nan_to_num(estimates, nan=-np.inf))
+        top_weight = np.full(n, -np.inf, dtype=np.float32)
+        np.maximum.at(top_weight, columns.log, np.nan_to_num(columns.weight, nan=-np.inf))
+        load = np.bincount(columns.log, weights=np.nan_to_num(columns.weight * columns.reps), minlength=n)
+        working = np.bincount(columns.log, weights=columns.reps > 0, minlength=n)
+        self._chunks.append({
+            "user": np.array([self.user_codes.setdefault(row["user_id"], len(self.user_codes)) for row in rows], dtype=np.int32),
+            "exercise": np.array([row["exercise_id"] for row in rows], dtype=np.int64),
+            "day": np.array([_day(row.get("date")) for row in rows], dtype=np.int32),
+            "hours": np.array([_hours(row.get("date")) for row in rows], dtype=np.float64),
+            "e1rm": np.where(np.isfinite(best), best, np.nan).astype(np.float32),
+            "top_weight": np.where(np.isfinite(top_weight), top_weight, np.nan).astype(np.float32),
+            "volume_load": load.astype(np.float32),
+            "set_count": working.astype(np.int32),
+        })
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        names = ("user", "exercise", "day", "hours", "e1rm", "top_weight", "volume_load", "set_count")
+        if not self._chunks:
+            return {name: np.zeros(0) for name in names}
+        return {name: np.concatenate([chunk[name] for chunk in self._chunks]) for name in names}
+
+    def __len__(self) -> int:
+        return sum(len(chunk["user"]) for chunk in self._chunks)
+
+
+@dataclass
+class Progression:
+    user_ids: List[str]
+    exercise_ids: np.ndarray
+    estimated_1rm: np.ndarray  # latest session's best e1RM
+    best_e1rm: np.ndarray
+    last_successful_weight: np.ndarray  # top weight of the latest session
+    last_day: np.ndarray  # days since epoch
+    sessions: np.ndarray
+    pr_count: np.ndarray
+    consecutive_failures: np.ndarray  # sessions since the last PR
+    is_plateau: np.ndarray
+    volume_load_28d: np.ndarray
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Rows for user_progression (upsert on user_id, exercise_id)."""
+        def number(value: float) -> Optional[float]:
+            return None if not np.isfinite(value) else round(float(value), 2)
+
+        return [
+            {
+                "user_id": self.user_ids[i],
+                "exercise_id": int(self.exercise_ids[i]),
+                "estimated_1rm": number(self.estimated_1rm[i]),
+                "best_e1rm": number(self.best_e1rm[i]),
+                "last_successful_weight": number(self.last_successful_weight[i]),
+                "last_updated": (_EPOCH + timedelta(days=int(self.last_day[i]))).isoformat() if self.last_day[i] >= 0 else None,
+                "consecutive_failures": int(self.consecutive_failures[i]),
+                "session_count": int(self.sessions[i]),
+                "pr_count": int(self.pr_count[i]),
+                "is_plateau": bool(self.is_plateau[i]),
+                "volume_load_28d": number(self.volume_load_28d[i]),
+            }
+            for i in range(len(self.exercise_ids))
+        ]
+
+
+def _segment_running_max(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Running max that restarts at every group start (values may contain -inf)."""
+    # Offset each group above all earlier ones, accumulate once, then undo the offset.
+    finite = np.isfinite(values)
+    span = float(np.nanmax(np.abs(values[finite]))) * 2 + 1 if finite.any() else 1.0
+    shifted = np.where(finite, values, -span / 2) + group * span
+    out = np.maximum.accumulate(shifted) - group * span
+    return np.where(out <= -span / 2 + 1e-6, -np.inf, out)
+
+
+def analyze(buffer: SessionBuffer, window: int = PLATEAU_WINDOW, today: Optional[date] = None) -> Progression:
+    cols = buffer.columns()
+    users = {code: user for user, code in buffer.user_codes.items()}
+    n = len(cols["user"])
+    if n == 0:
+        empty = np.zeros(0)
+        return Progression([], empty.astype(np.int64), empty, empty, empty, empty, empty, empty, empty, empty.astype(bool), empty)
+
+    order = np.lexsort((cols["day"], cols["exercise"], cols["user"]))
+    user, exercise, day = cols["user"][order], cols["exercise"][order], cols["day"][order]
+    estimate, top_weight, load = cols["e1rm"][order], cols["top_weight"][order], cols["volume_load"][order]
+
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (user[1:] != user[:-1]) | (exercise[1:] != exercise[:-1])
+    group = np.cumsum(new_group) - 1
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], n) - 1
+    position = np.arange(n) - starts[group]
+
+    scored = np.where(np.isnan(estimate), -np.inf, estimate).astype(np.float64)
+    running_best = _segment_running_max(scored, group)
+    previous_best = np.full(n, -np.inf)
+    previous_best[1:] = running_best[:-1]
+    previous_best[new_group] = -np.inf
+    is_pr = np.isfinite(scored) & (scored > previous_best * (1 + PR_TOLERANCE)) & ~new_group
+
+    # Sessions since the last PR (the first session is the baseline).
+    marker = np.where(is_pr | new_group, np.arange(n), 0)
+    last_mark = np.maximum.accumulate(marker)
+    since_pr = np.arange(n) - last_mark
+
+    # Rolling PR count over the last `window` sessions of each group.
+    pr_cum = np.cumsum(is_pr)
+    prs_in_window = pr_cum - pr_cum[np.maximum(np.arange(n) - window, 0)]
+    plateau = (position >= window) & (prs_in_window == 0)
+
+    today_day = ((today or date.today()) - _EPOCH).days
+    recent = day >= today_day - VOLUME_WINDOW_DAYS
+    volume_28d = np.bincount(group[recent], weights=load[recent], minlength=len(starts))
+    pr_count = np.bincount(group, weights=is_pr, minlength=len(starts))
+
+    latest = np.where(np.isfinite(scored[ends]), scored[ends], np.nan)
+    best = running_best[ends]
+    return Progression(
+        user_ids=[users[int(code)] for code in user[starts]],
+        exercise_ids=exercise[starts],
+        estimated_1rm=latest,
+        best_e1rm=np.where(np.isfinite(best), best, np.nan),
+        last_successful_weight=top_weight[ends],
+        last_day=day[ends],
+        sessions=(ends - starts + 1),
+        pr_count=pr_count.astype(np.int64),
+        consecutive_failures=since_pr[ends],
+        is_plateau=plateau[ends],
+        volume_load_28d=volume_28d,
+    )
+
+
+def collect(pages: Iterable[List[Dict[str, Any]]]) -> SessionBuffer:
+    buffer = SessionBuffer()
+    for page in pages:
+        buffer.add_page(page)
+    return buffer
@@ -1,14 +1,159 @@
-"""Supabase client helper."""
-from functools import lru_cache
+"""Supabase client management: one tuned HTTP pool per process, one client per thread.
 
-from supabase import Client, create_client
+Every module (app and scripts) gets its client from `get_client_manager(...).client()`. The
+manager owns a keep-alive `httpx.Client` that all of its Supabase clients share, so a process
+holds a single connection pool per project/key instead of one per `create_client` call.
+Clients are cached per thread because supabase-py keeps auth session state on the client; the
+pool itself is thread-safe. After `fork()` the pool and clients are rebuilt in the child, since
+sockets must not be shared across processes.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from supabase import Client, ClientOptions, create_client
 
 from app.config import get_supabase_key, get_supabase_url
+from app.instrumentation import InstrumentedTransport
+
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = 30.0
+TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+class _MeteredTransport(InstrumentedTransport):
+    """HTTP transport that tracks in-flight requests for saturation metrics (and records per-query events)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class SupabaseClientManager:
+    def __init__(self, url: str, key: str, max_connections: int = MAX_CONNECTIONS, max_keepalive: int = MAX_KEEPALIVE):
+        self.url = url
+        self.key = key
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._transport: Optional[_MeteredTransport] = None
+        self._http: Optional[httpx.Client] = None
+        self._local = threading.local()
+        self._clients_created = 0
+
+    def _reset_after_fork(self) -> None:
+        # Drop (without closing) the parent's sockets and per-thread clients.
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._transport = None
+        self._http = None
+        self._local = threading.local()
+
+    def http_client(self) -> httpx.Client:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    self._transport = _MeteredTransport(
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=KEEPALIVE_EXPIRY,
+                        ),
+                        retries=1,
+                    )
+                    self._http = httpx.Client(transport=self._transport, timeout=TIMEOUT)
+        return self._http
+
+    def client(self) -> Client:
+        """The calling thread's Supabase client, built on the shared pool."""
+        http = self.http_client()
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = create_client(self.url, self.key, options=ClientOptions(httpx_client=http))
+            self._local.client = client
+            with self._lock:
+                self._clients_created += 1
+        return client
+
+    def pool_stats(self) -> Dict[str, float]:
+        transport = self._transport
+        if transport is None or self._pid != os.getpid():
+            return {"connections": 0, "idle": 0, "in_flight": 0, "peak_in_flight": 0, "saturation": 0.0,
+                    "requests": 0, "errors": 0, "clients": self._clients_created}
+        connections = list(transport._pool.connections)
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "in_flight": transport.in_flight,
+            "peak_in_flight": transport.peak_in_flight,
+            "saturation": transport.in_flight / self.max_connections,
+            "requests": transport.requests,
+            "errors": transport.errors,
+            "clients": self._clients_created,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http is not None and self._pid == os.getpid():
+                self._http.close()
+            self._http = None
+            self._transport = None
+            self._local = threading.local()
+
+
+_managers: Dict[Tuple[str, str], SupabaseClientManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_client_manager(url: Optional[str] = None, key: Optional[str] = None) -> SupabaseClientManager:
+    """Process-wide manager for a project/key; defaults to SUPABASE_URL/SUPABASE_KEY."""
+    url = url or get_supabase_url()
+    key = key or get_supabase_key()
+    with _managers_lock:
+        manager = _managers.get((url, key))
+        if manager is None:
+            manager = _managers[(url, key)] = SupabaseClientManager(url, key)
+        return manager
 
 
-@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Create and memoize a Supabase client."""
-    url = get_supabase_url()
-    key = get_supabase_key()
-    return create_client(url, key)
+    """Supabase client for the current thread, sharing the process connection pool."""
+    return get_client_manager().client()
+
+
+def _after_fork_in_child() -> None:
+    global _managers_lock
+    _managers_lock = threading.Lock()
+    for manager in _managers.values():
+        manager._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
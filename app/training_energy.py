@@ -0,0 +1,198 @@
+"""MET-based training energy expenditure, vectorized over whole plans.
+
+kcal = MET × body weight (kg) × hours. The duration of an exercise is `duration_minutes` when the plan
+sets it, otherwise it is estimated from sets × (reps × SECONDS_PER_REP + rest). Whole plans are
+computed with numpy: one row per planned exercise, summed per plan (and per plan-day for
+session totals) with `np.bincount`.
+
+The cardio prescription of a plan (`workout_plans.cardio_plan`, `saved_routines.schedule.cardio`)
+becomes `frequency_per_week` rows of `duration` minutes at the web generator's MET for its
+type, so forecasts match what the web stores (strength + cardio).
+
+For the calorie targets the *net* cost (MET − 1) is used, because resting metabolism is already
+in the BMR; plan forecasts (`total_met_hours`, `estimated_calories_weekly`) keep the gross figure
+the web editor shows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MET = 5.0
+DEFAULT_SETS = 3
+DEFAULT_REPS = 10
+DEFAULT_REST_SECONDS = 60
+DEFAULT_WEIGHT_KG = 70.0
+SECONDS_PER_REP = 3.0
+# CardioSession.type -> MET, as in the web generator's calculateEstimatedWeeklyBurn
+CARDIO_MET = {"low_impact": 3.5, "moderate": 7.0, "hiit": 8.5}
+DEFAULT_CARDIO_MET = 3.5
+
+
+def _number(value: Any) -> Optional[float]:
+    """Numeric value of a planned-exercise field, None when not numeric ("N/A").
+
+    Ranges give their midpoint ("8-12" -> 10, "60-90s" -> 75); duration suffixes are read as
+    seconds, the unit of `rest` ("90s" -> 90, "2min" -> 120).
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower().replace("–", "-").replace(",", ".")
+    scale = 1.0
+    for suffix, factor in (("min", 60.0), ("s", 1.0)):
+        if text.endswith(suffix):
+            text, scale = text[: -len(suffix)].strip(), factor
+            break
+    parts = [p.strip() for p in text.split("-")]
+    try:
+        numbers = [float(p) for p in parts if p]
+    except ValueError:
+        return None
+    return sum(numbers) / len(numbers) * scale if numbers else None
+
+
+def _column(rows: Sequence[Dict[str, Any]], key: str, default: float) -> np.ndarray:
+    values = [_number(row.get(key)) for row in rows]
+    return np.array([default if v is None else v for v in values], dtype=np.float64)
+
+
+def exercise_minutes(sets: np.ndarray, reps: np.ndarray, rest_seconds: np.ndarray, duration_minutes: np.ndarray) -> np.ndarray:
+    """Minutes per planned exercise: explicit duration when > 0, else sets × (reps × tempo + rest)."""
+    estimated = sets * (reps * SECONDS_PER_REP + rest_seconds) / 60.0
+    return np.where(duration_minutes > 0, duration_minutes, estimated)
+
+
+def kcal(met: np.ndarray, weight_kg: np.ndarray, minutes: np.ndarray, net: bool = False) -> np.ndarray:
+    """MET × kg × h (net subtracts the 1 MET of rest already counted in BMR)."""
+    met = np.maximum(met - 1.0, 0.0) if net else met
+    return met * weight_kg * minutes / 60.0
+
+
+@dataclass
+class PlanEnergy:
+    plan_ids: List[Any]
+    total_met_hours: np.ndarray  # per plan, per week
+    weekly_kcal: np.ndarray  # gross, per plan
+    weekly_net_kcal: np.ndarray
+    session_kcal: np.ndarray  # (plans, 7) gross kcal per day_of_week 1..7
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Rows for the forecasting columns of workout_plans / saved_routines."""
+        return [
+            {
+                "id": plan_id,
+                "total_met_hours": round(float(met_hours), 2),
+                "estimated_calories_weekly": int(round(float(weekly))),
+            }
+            for plan_id, met_hours, weekly in zip(self.plan_ids, self.total_met_hours, self.weekly_kcal)
+        ]
+
+
+def plan_energy(
+    plan_ids: Sequence[Any],
+    exercises: Sequence[Dict[str, Any]],
+    weight_by_plan: Optional[Dict[Any, float]] = None,
+) -> PlanEnergy:
+    """Weekly energy for many plans at once.
+
+    `exercises` are planned-exercise rows with `plan_id`, `day_of_week` (1..7), `met`, `sets`,
+    `reps`, `rest_seconds` and `duration_minutes` (missing values take the defaults). Each row
+    is performed once per week.
+    """
+    position = {plan_id: i for i, plan_id in enumerate(plan_ids)}
+    rows = [row for row in exercises if row.get("plan_id") in position]
+    n = len(plan_ids)
+    plan_index = np.array([position[row["plan_id"]] for row in rows], dtype=np.int64)
+    weights = np.array([(weight_by_plan or {}).get(plan_id) or DEFAULT_WEIGHT_KG for plan_id in plan_ids], dtype=np.float64)
+
+    met = _column(rows, "met", DEFAULT_MET)
+    met = np.where(met > 0, met, DEFAULT_MET)
+    minutes = exercise_minutes(
+        _column(rows, "sets", DEFAULT_SETS),
+        _column(rows, "reps", DEFAULT_REPS),
+        _column(rows, "rest_seconds", DEFAULT_REST_SECONDS),
+        _column(rows, "duration_minutes", 0),
+    )
+    row_weight = weights[plan_index] if len(rows) else np.zeros(0)
+    gross = kcal(met, row_weight, minutes)
+    net = kcal(met, row_weight, minutes, net=True)
+    days = np.clip(_column(rows, "day_of_week", 1).astype(np.int64), 1, 7) - 1
+
+    return PlanEnergy(
+        plan_ids=list(plan_ids),
+        total_met_hours=np.bincount(plan_index, weights=met * minutes / 60.0, minlength=n),
+        weekly_kcal=np.bincount(plan_index, weights=gross, minlength=n),
+        weekly_net_kcal=np.bincount(plan_index, weights=net, minlength=n),
+        session_kcal=np.bincount(plan_index * 7 + days, weights=gross, minlength=n * 7).reshape(n, 7),
+    )
+
+
+def routine_exercises(routine_id: Any, schedule: Dict[str, Any], met_by_id: Optional[Dict[Any, float]] = None) -> List[Dict[str, Any]]:
+    """Flatten a saved_routines.schedule into planned-exercise rows.
+
+    The web generator saves `{"days": [{"exercises": [{"exercise": {id, met, ...}, "sets": 4,
+    "reps": "8-12", "rest": "60-90s"}]}], "cardio": {...}}`; flat entries (`id`, `met` at the top
+    level) are read too. Cardio entries inside the days (`"20min"` reps, `cardio_*` patterns) are
+    skipped; the weekly cardio block comes from `schedule["cardio"]` (see `cardio_rows`).
+    """
+    rows = []
+    for day_index, day in enumerate((schedule or {}).get("days") or []):
+        for ex in day.get("exercises") or []:
+            exercise = ex.get("exercise") if isinstance(ex.get("exercise"), dict) else ex
+            if _is_cardio(ex, exercise):
+                continue
+            met = exercise.get("met", ex.get("met"))
+            if met is None and met_by_id:
+                met = met_by_id.get(exercise.get("id", ex.get("id")))
+            rows.append({
+                "plan_id": routine_id,
+                "day_of_week": day_index % 7 + 1,
+                "met": met,
+                "sets": ex.get("sets"),
+                "reps": ex.get("reps"),
+                "rest_seconds": ex.get("rest", ex.get("rest_seconds")),
+                "duration_minutes": ex.get("duration", ex.get("duration_minutes")),
+            })
+    return rows + cardio_rows(routine_id, (schedule or {}).get("cardio"))
+
+
+def cardio_rows(plan_id: Any, cardio: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """A CardioSession (`type`, `duration` minutes, `frequency_per_week`) as one row per weekly session.
+
+    Sessions are spread over the week for `session_kcal`; an absent or incomplete prescription
+    gives no rows.
+    """
+    if not isinstance(cardio, dict):
+        return []
+    frequency = _number(cardio.get("frequency_per_week"))
+    duration = _number(cardio.get("duration"))
+    if not frequency or not duration or frequency <= 0 or duration <= 0:
+        return []
+    sessions = int(round(frequency))
+    met = CARDIO_MET.get(str(cardio.get("type") or ""), DEFAULT_CARDIO_MET)
+    return [
+        {"plan_id": plan_id, "day_of_week": i * 7 // sessions + 1, "met": met, "duration_minutes": duration}
+        for i in range(sessions)
+    ]
+
+
+def _is_cardio(entry: Dict[str, Any], exercise: Dict[str, Any]) -> bool:
+    pattern = str(exercise.get("movement_pattern") or "")
+    reps = str(entry.get("reps") or "").strip().lower()
+    return pattern.startswith("cardio") or reps.endswith("min")
+
+
+def daily_exercise_kcal(plan: PlanEnergy, position: int = 0) -> int:
+    """Net training kcal per day for a plan, for `GoalCalculator` targets."""
+    if not len(plan.plan_ids):
+        return 0
+    return int(round(float(plan.weekly_net_kcal[position]) / 7.0))
+
+
+def session_kcal(met: float, weight_kg: float, minutes: float) -> int:
+    return int(round(float(kcal(np.float64(met), np.float64(weight_kg), np.float64(minutes)))))
+
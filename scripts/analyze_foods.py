@@ -6,10 +6,10 @@ This script analyzes foods from the database and classifies them into:
 - BÁSICOS: Raw ingredients (rice, tomato, chicken, eggs, fruits, vegetables)
 - PREPARADOS: Prepared dishes (restaurant food, fast food, snacks, pastries)
 
-Usage:
-    python analyze_foods.py --analyze    # Analyze and show statistics
-    python analyze_foods.py --update     # Update database with food_type column
-    python analyze_foods.py --export     # Export classification to JSON
+Usage (from the repo root):
+    python -m scripts.analyze_foods --analyze    # Analyze and show statistics
+    python -m scripts.analyze_foods --update     # Update database with food_type column
+    python -m scripts.analyze_foods --export     # Export classification to JSON
 """
 
 import os
@@ -19,7 +19,8 @@ from typing import Literal
 
 # Try to import supabase, but allow the script to work without it for testing
 try:
-    from supabase import create_client, Client
+    from supabase import Client
+    from app.supabase_client import get_client_manager
     HAS_SUPABASE = True
 except ImportError:
     HAS_SUPABASE = False
@@ -127,7 +128,7 @@ def get_supabase_client() -> "Client":
             "Make sure web/.env.local exists with NEXT_PUBLIC_SUPABASE_URL and NEXT_PUBLIC_SUPABASE_ANON_KEY"
         )
     
-    return create_client(url, key)
+    return get_client_manager(url, key).client()
 
 
 def analyze_foods():
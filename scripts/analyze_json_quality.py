@@ -1,59 +1,74 @@
 
+import os
+import sys
 import json
-import statistics
-
-# Load the file
-try:
-    with open('ejercicios_enriquecidos_es.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-except FileNotFoundError:
-    print("File not found")
-    exit(1)
-
-exercises = data.get('exercises', [])
-total = len(exercises)
-print(f"Total exercises in JSON: {total}")
-
-# Metrics
-missing_scores = 0
-low_hypertrophy_count = 0 
-generic_emg = 0
-missing_muscles = 0
-
-sample_errors = []
-
-for ex in exercises:
-    # Check scores
-    scores = ex.get('puntuaciones_1a5', {})
-    if any(s == 0 for s in scores.values()):
-        missing_scores += 1
-    
-    # Check if hypertrophy is suspiciously low for known builders? (subjective, skip)
-    
-    # Check EMG state
-    if ex.get('emg', {}).get('estado') == 'proxy_sin_tabla_emg':
-        generic_emg += 1
-        
-    # Check muscles
-    if not ex.get('musculos_principales'):
-        missing_muscles += 1
-        sample_errors.append(f"{ex['nombre_en']}: No main muscles")
-
-    # Check consistent IDs logic
-    if not isinstance(ex.get('id'), int):
-         sample_errors.append(f"{ex['nombre_en']}: Invalid ID")
-
-print(f"--- Quality Report ---")
-print(f"Missing/Zero Scores: {missing_scores} ({missing_scores/total*100:.1f}%)")
-print(f"Generic EMG Proxy: {generic_emg} ({generic_emg/total*100:.1f}%)")
-print(f"Missing Muscle Targets: {missing_muscles}")
-
-if sample_errors:
-    print("Sample Errors:", sample_errors[:5])
-
-# Print a specific sample to manual verify biomechanics
-target_ex = next((x for x in exercises if "Bench Press" in x['nombre_en'] and "Barbell" in x['nombre_en']), None)
-if target_ex:
-    print("\n--- Sample: Bench Press ---")
-    print(json.dumps(target_ex, indent=2, ensure_ascii=False))
+import argparse
 
+from app.exercise_validation import RULES, exit_code, load_report, stream_document, validate_file
+
+DEFAULT_REPORT = 'logs/exercise_quality_report.json'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validate the enriched exercise JSON before the catalog build")
+    parser.add_argument('source', nargs='?', default='ejercicios_enriquecidos_es.json')
+    parser.add_argument('--report', default=DEFAULT_REPORT, help="Machine-readable JSON report path")
+    parser.add_argument('--incremental', action='store_true', help="Only re-check records changed since --report")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: pool only for large files)")
+    parser.add_argument('--strict', action='store_true', help="Fail on warnings as well as errors")
+    parser.add_argument('--sample', default=None, help="Print the first record whose English name contains this text")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.source):
+        print("File not found")
+        return 2
+
+    previous = load_report(args.report) if args.incremental else None
+    try:
+        report = validate_file(args.source, previous=previous, workers=args.workers)
+    except ValueError as e:
+        print(f"❌ Could not parse {args.source}: {e}")
+        return 2
+
+    summary, stats = report['summary'], report['stats']
+    total = max(summary['records'], 1)
+    print(f"Total exercises in JSON: {summary['records']} "
+          f"({summary['checked']} checked, {summary['reused']} unchanged since last report, {summary['elapsed_ms']:.0f} ms)")
+
+    print(f"--- Quality Report ---")
+    print(f"Missing/Zero Scores: {stats['missing_scores']} ({stats['missing_scores']/total*100:.1f}%)")
+    print(f"Generic EMG Proxy: {stats['generic_emg']} ({stats['generic_emg']/total*100:.1f}%)")
+    print(f"Missing Muscle Targets: {stats['missing_muscles']}")
+
+    print(f"--- Rules ({len(RULES)}) ---")
+    for rule in RULES:
+        count = summary['by_rule'].get(rule.name, 0)
+        mark = "✅" if not count else ("❌" if rule.severity == 'error' else "⚠️ ")
+        print(f"{mark} {rule.name}: {count}")
+    print(f"Errors: {summary['errors']}  Warnings: {summary['warnings']}")
+
+    if report['issues']:
+        print("Sample Issues:", [f"{i['name']}: {i['rule']} at {i['path']} ({i['value']!r})" for i in report['issues'][:5]])
+
+    if args.report:
+        os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"📝 Report written to {args.report}")
+
+    # Print a specific sample to manual verify biomechanics
+    if args.sample:
+        target_ex = next((value[0] for event, _, value in stream_document(args.source)
+                          if event == 'record' and args.sample in value[0].get('nombre_en', '')), None)
+        if target_ex:
+            print(f"\n--- Sample: {args.sample} ---")
+            print(json.dumps(target_ex, indent=2, ensure_ascii=False))
+
+    return exit_code(report, strict=args.strict)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from app.supabase_client import get_client_manager
+from app.training_energy import DEFAULT_WEIGHT_KG, cardio_rows, plan_energy, routine_exercises
+
+# Load env variables
+load_dotenv('web/.env.local')
+
+url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+key = os.getenv('SUPABASE_SERVICE_KEY')
+
+if not url or not key:
+    print("❌ Missing credentials. Please check web/.env.local")
+    exit(1)
+
+manager = get_client_manager(url, key)
+supabase = manager.client()
+
+PAGE_SIZE = 1000
+
+
+def fetch_all(table, columns, order='id'):
+    """Every row of `table`, paged."""
+    rows = []
+    offset = 0
+    while True:
+        res = supabase.table(table).select(columns).order(order).range(offset, offset + PAGE_SIZE - 1).execute()
+        if not res.data:
+            break
+        rows.extend(res.data)
+        offset += PAGE_SIZE
+    return rows
+
+
+def fetch_in(table, columns, column, values, order='id', chunk_size=200):
+    """Rows whose `column` is in `values`; each chunk is paged too, since one chunk can match
+    more rows than the server's max-rows cap (e.g. plans with many exercises)."""
+    rows = []
+    values = list(values)
+    for i in range(0, len(values), chunk_size):
+        offset = 0
+        while True:
+            res = (supabase.table(table).select(columns).in_(column, values[i:i + chunk_size])
+                   .order(order).range(offset, offset + PAGE_SIZE - 1).execute())
+            if not res.data:
+                break
+            rows.extend(res.data)
+            offset += PAGE_SIZE
+    return rows
+
+
+def changed_rows(plans, energy):
+    """Forecast rows whose stored values differ; id/user_id/name ride along for the upsert's INSERT half."""
+    by_id = {plan['id']: plan for plan in plans}
+    pending = []
+    for row in energy.to_rows():
+        plan = by_id[row['id']]
+        stored = (round(float(plan.get('total_met_hours') or 0), 2), int(round(float(plan.get('estimated_calories_weekly') or 0))))
+        if stored == (row['total_met_hours'], row['estimated_calories_weekly']):
+            continue
+        pending.append({'id': plan['id'], 'user_id': plan['user_id'], 'name': plan['name'], **row})
+    return pending
+
+
+def computable(plans, rows):
+    """Plans with at least one planned row; the rest keep their stored forecast rather than drop to 0."""
+    planned_ids = {row['plan_id'] for row in rows}
+    return [plan for plan in plans if plan['id'] in planned_ids]
+
+
+def write_chunk(table, rows):
+    manager.client().table(table).upsert(rows, on_conflict='id').execute()
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill total_met_hours / estimated_calories_weekly for stored plans")
+    parser.add_argument('--chunk-size', type=int, default=200, help="Rows per bulk upsert")
+    parser.add_argument('--concurrency', type=int, default=4, help="Upserts in flight at once")
+    parser.add_argument('--dry-run', action='store_true', help="Compute and diff without writing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    print("🔥 Backfilling plan energy forecasts...")
+
+    # 1. Plans, their owners' body weight and the MET of every catalog exercise
+    plans = fetch_all('workout_plans', 'id, user_id, name, cardio_plan, total_met_hours, estimated_calories_weekly')
+    routines = fetch_all('saved_routines', 'id, user_id, name, schedule, total_met_hours, estimated_calories_weekly')
+    print(f"📥 {len(plans)} workout plans, {len(routines)} saved routines")
+
+    user_ids = {row['user_id'] for row in plans + routines if row.get('user_id')}
+    weights = {row['user_id']: row.get('weight_kg') for row in fetch_in('profiles', 'user_id, weight_kg', 'user_id', user_ids, order='user_id')}
+    met_by_id = {row['id']: row.get('met') for row in fetch_all('exercises', 'id, met')}
+
+    # 2. workout_plans: one row per workout_plan_exercises entry, plus the cardio prescription
+    planned = fetch_in(
+        'workout_plan_exercises',
+        'id, workout_plan_id, exercise_id, day_of_week, sets, reps, rest_seconds, duration_minutes',
+        'workout_plan_id',
+        [plan['id'] for plan in plans],
+    )
+    plan_rows = [
+        {**row, 'plan_id': row['workout_plan_id'], 'met': met_by_id.get(row.get('exercise_id'))}
+        for row in planned
+    ] + [row for plan in plans for row in cardio_rows(plan['id'], plan.get('cardio_plan'))]
+    plan_weights = {plan['id']: float(weights.get(plan['user_id']) or DEFAULT_WEIGHT_KG) for plan in plans}
+    loaded = len(plans) + len(routines)
+    plans = computable(plans, plan_rows)
+    plan_result = plan_energy([plan['id'] for plan in plans], plan_rows, plan_weights)
+
+    # 3. saved_routines: exercises live in the schedule JSON
+    routine_rows = [row for routine in routines for row in routine_exercises(routine['id'], routine.get('schedule'), met_by_id)]
+    routine_weights = {r['id']: float(weights.get(r['user_id']) or DEFAULT_WEIGHT_KG) for r in routines}
+    routines = computable(routines, routine_rows)
+    print(f"⏭️  {loaded - len(plans) - len(routines)} plans/routines with no exercises or cardio left untouched")
+    routine_result = plan_energy([r['id'] for r in routines], routine_rows, routine_weights)
+
+    work = [('workout_plans', changed_rows(plans, plan_result)), ('saved_routines', changed_rows(routines, routine_result))]
+    for table, rows in work:
+        print(f"🧮 {table}: {len(rows)} to update")
+
+    # 4. Apply as chunked bulk upserts with bounded concurrency
+    updated = 0
+    errors = 0
+    if args.dry_run:
+        print("🔎 Dry run: no rows written.")
+    else:
+        chunks = [(table, rows[i:i + args.chunk_size]) for table, rows in work for i in range(0, len(rows), args.chunk_size)]
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as pool:
+            futures = {pool.submit(write_chunk, table, chunk): (table, chunk) for table, chunk in chunks}
+            for future in as_completed(futures):
+                table, chunk = futures[future]
+                try:
+                    updated += future.result()
+                except Exception as e:
+                    print(f"❌ Error upserting {table} chunk starting at id {chunk[0]['id']}: {e}")
+                    errors += len(chunk)
+
+    print(f"\n🎉 Backfill Complete!")
+    print(f"   - Updated: {updated}")
+    print(f"   - Errors: {errors}")
+    print(f"   - Weekly kcal (median): plans {_median(plan_result.weekly_kcal):.0f}, routines {_median(routine_result.weekly_kcal):.0f}")
+    print(f"   - {time.perf_counter() - started:.1f}s total")
+
+
+def _median(values):
+    return float(sorted(values)[len(values) // 2]) if len(values) else 0.0
+
+
+if __name__ == "__main__":
+    main()
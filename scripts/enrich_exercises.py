@@ -2,9 +2,15 @@
 import os
 import json
 import time
-from supabase import create_client
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from app.exercise_matching import NameIndex
+from app.exercise_snapshot import load_exercise_snapshot
+from app.supabase_client import get_client_manager
+
 # Load env variables
 load_dotenv('web/.env.local')
 
@@ -15,88 +21,152 @@ if not url or not key:
     print("❌ Missing credentials. Please check web/.env.local")
     exit(1)
 
-supabase = create_client(url, key)
+manager = get_client_manager(url, key)
+supabase = manager.client()
+
+# Columns written by this script; rows whose current values already match are skipped
+SCIENCE_COLUMNS = [
+    'movement_pattern', 'score_hypertrophy', 'score_difficulty', 'score_risk',
+    'score_strength', 'score_stability', 'activation_profile', 'scientific_notes',
+]
+
+
+def science_digest(row):
+    """Stable digest of a row's scientific columns (same value whether it came from the JSON or the DB)."""
+    canonical = json.dumps({col: row.get(col) for col in SCIENCE_COLUMNS}, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def build_payload(science_data):
+    scores = science_data.get('puntuaciones_1a5', {})
+    emg = science_data.get('emg', {})
+    return {
+        'movement_pattern': science_data.get('patron_movimiento_id'),
+        'score_hypertrophy': scores.get('hypertrophy_potential'),
+        'score_difficulty': scores.get('technical_difficulty'),
+        'score_risk': scores.get('injury_risk'),
+        'score_strength': scores.get('strength_potential'),
+        'score_stability': scores.get('stability_demand'),
+        'activation_profile': emg.get('activacion_proxy'), # JSONB
+        # Could add notes from templates here if we did a lookup,
+        # for now the 'nota' from emg is used as a temp note
+        'scientific_notes': emg.get('nota')
+    }
+
+
+def write_chunk(rows):
+    """Bulk upsert one chunk on the calling thread's client (shared connection pool)."""
+    # id/slug/title ride along so the INSERT half of the upsert satisfies NOT NULL; on conflict
+    # PostgREST merges only these columns into the existing row.
+    manager.client().table('exercises').upsert(rows, on_conflict='id').execute()
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Copy scientific columns from the enriched JSON into exercises")
+    parser.add_argument('--chunk-size', type=int, default=200, help="Rows per bulk upsert")
+    parser.add_argument('--concurrency', type=int, default=4, help="Upserts in flight at once")
+    parser.add_argument('--dry-run', action='store_true', help="Build and diff payloads without writing")
+    return parser.parse_args()
+
 
 def main():
+    args = parse_args()
+    started = time.perf_counter()
     print("🚀 Starting Science Enrichment...")
 
-    # 1. Load the Scientific Source of Truth (JSON)
+    # 1. Load the Scientific Source of Truth (compiled snapshot of the JSON)
     try:
-        with open('ejercicios_enriquecidos_es.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            enrichment_db = data.get('exercises', [])
-            print(f"📚 Loaded {len(enrichment_db)} scientific records.")
+        enrichment_db = load_exercise_snapshot('ejercicios_enriquecidos_es.json')
+        print(f"📚 Loaded {len(enrichment_db)} scientific records.")
     except FileNotFoundError:
         print("❌ 'ejercicios_enriquecidos_es.json' not found.")
         exit(1)
 
-    # Index enrichment data by English Title for O(1) lookup
-    # Normalize keys to lowercase for better matching
-    science_map = {ex['nombre_en'].lower().strip(): ex for ex in enrichment_db}
+    # Index enrichment data by English Title; exact lowercase hits first, fuzzy index for the rest
+    # (plurals, word order, "DB"/"Dumbbell", ...). Records are materialized only on a match
+    science_map = {enrichment_db.name_en(i).lower().strip(): i for i in range(len(enrichment_db))}
+    name_index = NameIndex([enrichment_db.name_en(i) for i in range(len(enrichment_db))])
 
-    # 2. Fetch Target Database (Supabase)
+    # 2. Fetch Target Database (Supabase), including the current scientific columns
     print("📥 Fetching exercises from Supabase...")
     all_db_exercises = []
     count = 0
     batch_size = 1000
-    
+    columns = ', '.join(['id', 'slug', 'title', 'title_en'] + SCIENCE_COLUMNS)
+
     while True:
-        res = supabase.table('exercises').select('id, title, title_en').range(count, count + batch_size - 1).execute()
+        res = supabase.table('exercises').select(columns).order('id').range(count, count + batch_size - 1).execute()
         if not res.data:
             break
         all_db_exercises.extend(res.data)
         count += batch_size
-    
-    print(f"🎯 Found {len(all_db_exercises)} exercises in DB to potentially enrich.")
 
-    # 3. Fuse Data
-    updates_count = 0
-    errors_count = 0
+    print(f"🎯 Found {len(all_db_exercises)} exercises in DB to potentially enrich.")
 
+    # 3. Fuse Data: build every payload first, keep only rows whose digest changed
+    matched = 0
+    fuzzy_matched = 0
+    ambiguous = 0
+    unmatched = []
+    pending = []
     for db_ex in all_db_exercises:
         # Match primarily by title_en, fallback to title (if it happens to be english)
         match_key = (db_ex.get('title_en') or db_ex.get('title') or "").lower().strip()
-        
-        science_data = science_map.get(match_key)
-
-        if science_data:
-            try:
-                scores = science_data.get('puntuaciones_1a5', {})
-                emg = science_data.get('emg', {})
-                
-                # Prepare payload
-                payload = {
-                    'movement_pattern': science_data.get('patron_movimiento_id'),
-                    'score_hypertrophy': scores.get('hypertrophy_potential'),
-                    'score_difficulty': scores.get('technical_difficulty'),
-                    'score_risk': scores.get('injury_risk'),
-                    'score_strength': scores.get('strength_potential'),
-                    'score_stability': scores.get('stability_demand'),
-                    'activation_profile': emg.get('activacion_proxy'), # JSONB
-                    # Could add notes from templates here if we did a lookup, 
-                    # for now let's leave scientific_notes empty or add a placeholder?
-                    # Let's add the 'nota' from emg as a temp note
-                    'scientific_notes': emg.get('nota')
-                }
-
-                # Update DB
-                supabase.table('exercises').update(payload).eq('id', db_ex['id']).execute()
-                updates_count += 1
-                
-                if updates_count % 50 == 0:
-                    print(f"✅ Enriched {updates_count}: {db_ex.get('title_en')}")
-
-            except Exception as e:
-                print(f"❌ Error updating {match_key}: {e}")
-                errors_count += 1
-        else:
-            # print(f"⚠️ No science match for: {match_key}")
-            pass
+
+        science_index = science_map.get(match_key)
+        if science_index is None and match_key:
+            fuzzy = name_index.match(match_key)
+            if fuzzy.status == 'ambiguous':
+                ambiguous += 1
+            if fuzzy.status != 'matched':
+                unmatched.append(db_ex['slug'])
+                continue
+            science_index = fuzzy.key
+            fuzzy_matched += 1
+        if science_index is None:
+            unmatched.append(db_ex['slug'])
+            continue
+        matched += 1
+        payload = build_payload(enrichment_db[science_index])
+        if science_digest(payload) == science_digest(db_ex):
+            continue
+        pending.append({'id': db_ex['id'], 'slug': db_ex['slug'], 'title': db_ex['title'], **payload})
+
+    unchanged = matched - len(pending)
+    print(f"🔗 {matched - fuzzy_matched} exact title matches, {fuzzy_matched} fuzzy, {ambiguous} ambiguous (skipped).")
+    print(f"❌ {len(unmatched)} exercises have no science record and keep their current values"
+          f"{' (e.g. ' + ', '.join(unmatched[:5]) + ')' if unmatched else ''}.")
+    print(f"🧮 {matched} matched, {unchanged} already up to date, {len(pending)} to write.")
+
+    # 4. Apply as chunked bulk upserts with bounded concurrency
+    updates_count = 0
+    errors_count = 0
+    write_started = time.perf_counter()
+    chunks = [pending[i:i + args.chunk_size] for i in range(0, len(pending), args.chunk_size)]
+    if args.dry_run:
+        print("🔎 Dry run: no rows written.")
+    elif chunks:
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as pool:
+            futures = {pool.submit(write_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    updates_count += future.result()
+                    print(f"✅ Enriched {updates_count}/{len(pending)}")
+                except Exception as e:
+                    print(f"❌ Error upserting chunk starting at id {chunk[0]['id']}: {e}")
+                    errors_count += len(chunk)
+    write_elapsed = time.perf_counter() - write_started
+    elapsed = time.perf_counter() - started
 
     print(f"\n🎉 Enrichment Complete!")
-    print(f"   - Updated: {updates_count}")
+    print(f"   - Updated: {updates_count} in {len(chunks)} bulk upserts")
+    print(f"   - Unchanged (skipped by digest): {unchanged}")
     print(f"   - Errors: {errors_count}")
-    print(f"   - Coverage: {updates_count/len(all_db_exercises)*100:.1f}%")
+    print(f"   - Coverage: {matched/max(len(all_db_exercises), 1)*100:.1f}% of DB exercises have science data")
+    print(f"   - Throughput: {updates_count/write_elapsed if write_elapsed and updates_count else 0:.0f} rows/s written, "
+          f"{elapsed:.1f}s total")
 
 if __name__ == "__main__":
     main()
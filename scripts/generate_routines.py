@@ -0,0 +1,84 @@
+
+import os
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+
+from app.exercise_ranking import fetch_user_preferences
+from app.routine_generator import SPLITS, get_routine_generator
+from app.supabase_client import get_client_manager
+
+# Load env variables
+load_dotenv('web/.env.local')
+
+url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+key = os.getenv('SUPABASE_SERVICE_KEY')
+
+if not url or not key:
+    print("❌ Missing credentials. Please check web/.env.local")
+    exit(1)
+
+supabase = get_client_manager(url, key).client()
+
+PAGE_SIZE = 1000
+DEFAULT_OUTPUT = 'logs/generated_routines.jsonl'
+
+
+def fetch_user_ids(limit=None):
+    """profiles.user_id, paged, up to `limit`."""
+    ids = []
+    offset = 0
+    while limit is None or len(ids) < limit:
+        res = supabase.table('profiles').select('user_id').order('user_id').range(offset, offset + PAGE_SIZE - 1).execute()
+        if not res.data:
+            break
+        ids.extend(row['user_id'] for row in res.data if row.get('user_id'))
+        offset += PAGE_SIZE
+    return ids[:limit] if limit is not None else ids
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate weekly routines server-side from the enriched catalog")
+    parser.add_argument('--user', action='append', default=None, help="User id (repeatable; default: every profile)")
+    parser.add_argument('--limit', type=int, default=None, help="At most this many profiles")
+    parser.add_argument('--split', choices=sorted(SPLITS), default=None, help="Split template (default: by training level)")
+    parser.add_argument('--seed', type=int, default=0, help="Same seed + user always yields the same plan")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON Lines file, one plan per user")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    # 1. Users and their equipment / level / goal
+    user_ids = args.user or fetch_user_ids(args.limit)
+    users = fetch_user_preferences(supabase, user_ids)
+    print(f"👥 {len(users)} users")
+
+    # 2. Generate
+    generator = get_routine_generator()
+    print(f"🧮 Ranking features: {generator.ranker.coverage * 100:.0f}% of exercises have CSV met/rating "
+          f"(the rest use the median)")
+    generating = time.perf_counter()
+    plans = generator.generate_many(users, split=args.split, seed=args.seed)
+    elapsed = time.perf_counter() - generating
+    rate = len(plans) / elapsed * 60 if elapsed > 0 else 0
+    print(f"🏋️ {len(plans)} plans in {elapsed:.1f}s ({rate:.0f}/min)")
+
+    # 3. Write
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for plan in plans:
+            f.write(json.dumps(plan.to_dict(), ensure_ascii=False) + '\n')
+
+    incomplete = sum(1 for plan in plans if plan.unfilled)
+    print(f"\n🎉 Generation Complete!")
+    print(f"   - Plans: {len(plans)} -> {args.output}")
+    print(f"   - With unfilled slots (missing equipment): {incomplete}")
+    print(f"   - {time.perf_counter() - started:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
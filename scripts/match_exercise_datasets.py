@@ -0,0 +1,77 @@
+
+import csv
+import os
+import time
+import argparse
+
+from app.exercise_matching import MATCH_THRESHOLD, NameIndex, summarize
+from app.exercise_snapshot import load_exercise_snapshot
+from app.exercise_table import load_exercise_table
+
+DEFAULT_UNMATCHED = 'logs/exercise_match_unmatched.csv'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fuzzy-join the CSV catalog against the enriched exercise JSON")
+    parser.add_argument('--csv', default='exercises_summerfit_es_final.csv', help="CSV with slug,title columns")
+    parser.add_argument('--json', default='ejercicios_enriquecidos_es.json', help="Enriched exercise JSON")
+    parser.add_argument('--report', default=None, help="Write every row's match (slug,title,json_id,json_name,score,status) here")
+    parser.add_argument('--unmatched', default=DEFAULT_UNMATCHED,
+                        help="Write the rows left unjoined (unmatched and ambiguous) here for curation; '' to skip")
+    parser.add_argument('--show', type=int, default=15, help="Ambiguous/unmatched rows to print")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    snapshot = load_exercise_snapshot(args.json)
+    table = load_exercise_table(args.csv)
+    slugs, titles = table.texts('slug'), table.texts('title')
+
+    started = time.perf_counter()
+    index = NameIndex([snapshot.name_en(i) for i in range(len(snapshot))], snapshot.ids)
+    built = time.perf_counter()
+    matches = index.match_many(titles)
+    matched_at = time.perf_counter()
+
+    summary = summarize(matches)
+    print(f"📚 {len(snapshot)} JSON records, {len(table)} CSV rows")
+    print(f"⏱️  Index built in {(built - started) * 1000:.0f} ms, matched in {(matched_at - built) * 1000:.0f} ms")
+    total = max(summary['total'], 1)
+    print(f"🎯 Coverage: {summary['coverage'] * 100:.1f}% of CSV rows joined to a JSON record "
+          f"({summary['matched']}/{summary['total']})")
+    print(f"✅ Matched: {summary['matched']} ({summary['matched'] / total * 100:.1f}%)  "
+          f"⚠️ Ambiguous: {summary['ambiguous']} ({summary['ambiguous'] / total * 100:.1f}%)  "
+          f"❌ Unmatched (< {MATCH_THRESHOLD}): {summary['unmatched']} ({summary['unmatched'] / total * 100:.1f}%)")
+    print("   Unmatched rows have no science data (met, muscles, rating); downstream code must treat them as such.")
+
+    for status in ('ambiguous', 'unmatched'):
+        subset = [m for m in matches if m.status == status]
+        if subset and args.show:
+            print(f"\n{status.capitalize()} (first {min(args.show, len(subset))}):")
+            for m in subset[:args.show]:
+                print(f"   {m.query!r} -> {m.name!r} ({m.score:.2f}, runner-up {m.runner_up_score:.2f})")
+
+    if args.unmatched:
+        os.makedirs(os.path.dirname(args.unmatched) or '.', exist_ok=True)
+        with open(args.unmatched, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['slug', 'title', 'status', 'best_json_id', 'best_json_name', 'score'])
+            unjoined = 0
+            for slug, m in zip(slugs, matches):
+                if m.status != 'matched':
+                    writer.writerow([slug, m.query, m.status, m.key, m.name, m.score])
+                    unjoined += 1
+        print(f"\n📝 {unjoined} unjoined rows written to {args.unmatched}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['slug', 'title', 'json_id', 'json_name', 'score', 'status', 'runner_up_id', 'runner_up_score'])
+            for slug, m in zip(slugs, matches):
+                writer.writerow([slug, m.query, m.key, m.name, m.score, m.status, m.runner_up, m.runner_up_score])
+        print(f"\n📝 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Reconcile daily_logs macro totals with the meal_entries they roll up.
+
+Streams meal_entries ordered by (user_id, log_date, id) with keyset pagination, sums each
+day in vectorized chunks and bulk-upserts only the daily_logs rows whose totals drifted.
+A second pass streams daily_logs and zeroes days that still carry totals but no longer have
+any meal entries. Lookups only cover each user's own date window of the page, so memory stays
+bounded by one page plus the (user, day) group straddling the page boundary.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from app.supabase_client import get_supabase_client
+
+MEAL_COLUMNS = ["id", "user_id", "log_date", "calories", "protein_g", "carbs_g", "fat_g"]
+# meal_entries column -> daily_logs column
+ROLLUP_COLUMNS = {"calories": "calories_consumed", "protein_g": "protein_g", "carbs_g": "carbs_g", "fat_g": "fat_g"}
+KEY = ["user_id", "log_date"]
+TOLERANCE = 0.01
+PAGE_SIZE = 1000  # PostgREST max-rows: larger requests are silently truncated to this
+USERS_PER_LOOKUP = 50  # per-user date windows per request (bounded by URL length)
+
+
+def stream_meal_entries(client, page_size: int, user_id: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Yield pages of meal entries using a (user_id, log_date, id) keyset cursor, until an empty page."""
+    cursor = None
+    while True:
+        query = client.table("meal_entries").select(",".join(MEAL_COLUMNS))
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if cursor:
+            uid, day, last_id = cursor
+            query = query.or_(
+                f"user_id.gt.{uid},"
+                f"and(user_id.eq.{uid},log_date.gt.{day}),"
+                f"and(user_id.eq.{uid},log_date.eq.{day},id.gt.{last_id})"
+            )
+        rows = query.order("user_id").order("log_date").order("id").limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield pd.DataFrame(rows, columns=MEAL_COLUMNS)
+        last = rows[-1]
+        cursor = (last["user_id"], last["log_date"], last["id"])
+
+
+def stream_daily_logs(client, page_size: int, user_id: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Yield pages of daily_logs using a (user_id, log_date) keyset cursor, until an empty page."""
+    columns = KEY + list(ROLLUP_COLUMNS.values())
+    cursor = None
+    while True:
+        query = client.table("daily_logs").select(",".join(columns))
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if cursor:
+            uid, day = cursor
+            query = query.or_(f"user_id.gt.{uid},and(user_id.eq.{uid},log_date.gt.{day})")
+        rows = query.order("user_id").order("log_date").limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield pd.DataFrame(rows, columns=columns)
+        cursor = (rows[-1]["user_id"], rows[-1]["log_date"])
+
+
+def fetch_for_days(client, table: str, columns: List[str], days: pd.DataFrame) -> pd.DataFrame:
+    """Rows of `table` within each user's own [min, max] log_date of `days`, exact keys only.
+
+    Users are looked up USERS_PER_LOOKUP at a time with one `or` filter of per-user windows,
+    each request paged past the row cap.
+    """
+    windows = days.groupby("user_id")["log_date"].agg(["min", "max"])
+    rows: List[Dict[str, Any]] = []
+    for start in range(0, len(windows), USERS_PER_LOOKUP):
+        chunk = windows.iloc[start:start + USERS_PER_LOOKUP]
+        condition = ",".join(
+            f"and(user_id.eq.{uid},log_date.gte.{low},log_date.lte.{high})" for uid, low, high in chunk.itertuples()
+        )
+        fetched = 0
+        while True:
+            page = (
+                client.table(table)
+                .select(",".join(columns))
+                .or_(condition)
+                .order("user_id")
+                .order("log_date")
+                .range(fetched, fetched + PAGE_SIZE - 1)
+                .execute()
+                .data
+                or []
+            )
+            if not page:
+                break
+            rows.extend(page)
+            fetched += len(page)
+    found = pd.DataFrame(rows, columns=columns)
+    if found.empty:
+        return found
+    found["log_date"] = found["log_date"].astype(str).str[:10]
+    return found.merge(days[KEY].drop_duplicates(), on=KEY, how="inner")
+
+
+class Reconciler:
+    def __init__(self, client, dry_run: bool = False):
+        self.client = client
+        self.dry_run = dry_run
+        self.stats: Dict[str, Any] = {
+            "entries": 0,
+            "days": 0,
+            "days_changed": 0,
+            "days_missing": 0,
+            "days_orphaned": 0,
+            "users_affected": 0,
+            "kcal_drift_total": 0.0,
+            "kcal_drift_max": 0.0,
+        }
+        self._users_affected: set = set()
+
+    def run(self, page_size: int, user_id: Optional[str] = None) -> Dict[str, Any]:
+        carry = pd.DataFrame(columns=MEAL_COLUMNS)
+        for page in stream_meal_entries(self.client, page_size, user_id):
+            self.stats["entries"] += len(page)
+            frame = page if carry.empty else pd.concat([carry, page], ignore_index=True)
+            # The last (user, day) group may continue on the next page: hold it back.
+            tail = (frame["user_id"] == frame["user_id"].iat[-1]) & (frame["log_date"] == frame["log_date"].iat[-1])
+            carry = frame[tail]
+            self._flush(frame[~tail])
+        self._flush(carry)
+        for logs in stream_daily_logs(self.client, page_size, user_id):
+            self._zero_orphans(logs)
+        self.stats["users_affected"] = len(self._users_affected)
+        return self.stats
+
+    def _zero_orphans(self, logs: pd.DataFrame) -> None:
+        """Zero days whose totals are non-zero but which have no meal entries left."""
+        numeric = list(ROLLUP_COLUMNS.values())
+        logs = logs.assign(log_date=logs["log_date"].astype(str).str[:10])
+        values = logs[numeric].apply(pd.to_numeric, errors="coerce").fillna(0)
+        candidates = logs[(values.abs() > TOLERANCE).any(axis=1)]
+        if candidates.empty:
+            return
+        present = fetch_for_days(self.client, "meal_entries", KEY, candidates).drop_duplicates()
+        merged = candidates.merge(present, on=KEY, how="left", indicator=True)
+        orphans = merged[merged["_merge"] == "left_only"]
+        if orphans.empty:
+            return
+        self.stats["days_orphaned"] += len(orphans)
+        self.stats["days_changed"] += len(orphans)
+        self._users_affected.update(orphans["user_id"].unique())
+        kcal = pd.to_numeric(orphans["calories_consumed"], errors="coerce").fillna(0).abs()
+        self.stats["kcal_drift_total"] += float(kcal.sum())
+        self.stats["kcal_drift_max"] = max(self.stats["kcal_drift_max"], float(kcal.max()))
+        if self.dry_run:
+            return
+        rows = [{**dict(zip(KEY, key)), **{col: 0 for col in numeric}} for key in orphans[KEY].itertuples(index=False)]
+        self.client.table("daily_logs").upsert(rows, on_conflict="user_id,log_date").execute()
+
+    def _flush(self, entries: pd.DataFrame) -> None:
+        if entries.empty:
+            return
+        values = entries[list(ROLLUP_COLUMNS)].apply(pd.to_numeric, errors="coerce").fillna(0)
+        totals = values.groupby([entries["user_id"], entries["log_date"]]).sum().rename(columns=ROLLUP_COLUMNS)
+        totals["calories_consumed"] = totals["calories_consumed"].round()
+        totals = totals.reset_index()
+
+        current = self._current_logs(totals)
+        merged = totals.merge(current, on=KEY, how="left", suffixes=("", "_db"), indicator=True)
+        missing = (merged["_merge"] == "left_only").to_numpy()
+        drift = pd.DataFrame(
+            {col: merged[col] - merged[f"{col}_db"].fillna(0) for col in ROLLUP_COLUMNS.values()}
+        )
+        changed = missing | (drift.abs() > TOLERANCE).any(axis=1).to_numpy()
+
+        kcal_drift = drift["calories_consumed"].abs()[changed]
+        self.stats["days"] += len(totals)
+        self.stats["days_changed"] += int(changed.sum())
+        self.stats["days_missing"] += int(missing.sum())
+        self._users_affected.update(merged.loc[changed, "user_id"].unique())
+        self.stats["kcal_drift_total"] += float(kcal_drift.sum())
+        self.stats["kcal_drift_max"] = max(self.stats["kcal_drift_max"], float(kcal_drift.max() if len(kcal_drift) else 0))
+
+        if not changed.any() or self.dry_run:
+            return
+        rows = totals.loc[changed, KEY + list(ROLLUP_COLUMNS.values())]
+        rows = rows.astype({"calories_consumed": int})
+        self.client.table("daily_logs").upsert(rows.to_dict("records"), on_conflict="user_id,log_date").execute()
+
+    def _current_logs(self, totals: pd.DataFrame) -> pd.DataFrame:
+        current = fetch_for_days(self.client, "daily_logs", KEY + list(ROLLUP_COLUMNS.values()), totals)
+        numeric = list(ROLLUP_COLUMNS.values())
+        current[numeric] = current[numeric].apply(pd.to_numeric, errors="coerce")
+        return current
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Roll meal_entries up into daily_logs and report drift")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help=f"Meal entries fetched per keyset page (at most {PAGE_SIZE})")
+    parser.add_argument("--user-id", help="Only reconcile this user")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without writing")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    started = time.perf_counter()
+    page_size = min(args.page_size, PAGE_SIZE)
+    stats = Reconciler(get_supabase_client(), dry_run=args.dry_run).run(page_size, args.user_id)
+    elapsed = time.perf_counter() - started
+
+    days = stats["days"] or 1
+    print(f"Scanned {stats['entries']} meal entries over {stats['days']} days in {elapsed:.1f}s")
+    print(f"Days drifted: {stats['days_changed']} ({stats['days_changed'] / days * 100:.1f}%), "
+          f"missing daily_logs rows: {stats['days_missing']}, days without entries zeroed: {stats['days_orphaned']}, "
+          f"users affected: {stats['users_affected']}")
+    print(f"kcal drift: total {stats['kcal_drift_total']:.0f}, max {stats['kcal_drift_max']:.0f}, "
+          f"mean per drifted day {stats['kcal_drift_total'] / max(stats['days_changed'], 1):.1f}")
+    if args.dry_run:
+        print("Dry run: no rows written.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from app.muscle_fatigue import FatigueModel, rebuild_states
+from app.muscle_volume import MuscleVolumeMatrix
+from app.strength_progression import PAGE_SIZE, SessionBuffer, stream_logs
+from app.supabase_client import get_client_manager
+
+# Load env variables
+load_dotenv('web/.env.local')
+
+url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+key = os.getenv('SUPABASE_SERVICE_KEY')
+
+if not url or not key:
+    print("❌ Missing credentials. Please check web/.env.local")
+    exit(1)
+
+manager = get_client_manager(url, key)
+supabase = manager.client()
+
+
+def fetch_exercises():
+    """Activation columns of the whole catalog (workout_logs reference these ids)."""
+    rows = []
+    offset = 0
+    while True:
+        res = (supabase.table('exercises')
+               .select('id, activation_profile, primary_muscles, secondary_muscles')
+               .order('id').range(offset, offset + PAGE_SIZE - 1).execute())
+        if not res.data:
+            break
+        rows.extend(res.data)
+        offset += PAGE_SIZE
+    return rows
+
+
+def write_chunk(rows):
+    manager.client().table('user_muscle_fatigue').upsert(rows, on_conflict='user_id').execute()
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild user_muscle_fatigue from workout_logs")
+    parser.add_argument('--user', default=None, help="Only this user id (default: whole table)")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="workout_logs rows per keyset page")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Rows per bulk upsert")
+    parser.add_argument('--concurrency', type=int, default=4, help="Upserts in flight at once")
+    parser.add_argument('--dry-run', action='store_true', help="Rebuild without writing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    # 1. Exercise -> muscle-group weights for the catalog ids used by workout_logs
+    model = FatigueModel(MuscleVolumeMatrix.from_rows(fetch_exercises()))
+    print(f"💪 {len(model.matrix.exercise_ids)} exercises, {len(model.groups)} muscle groups")
+
+    # 2. Stream logs, keeping one row per session
+    buffer = SessionBuffer()
+    for page in stream_logs(supabase, user_id=args.user, page_size=args.page_size):
+        buffer.add_page(page)
+    streamed = time.perf_counter()
+    print(f"📥 {len(buffer)} sessions, {buffer.sets} sets ({streamed - started:.1f}s)")
+
+    # 3. Closed-form rebuild of every user's state at their latest session
+    states = rebuild_states(model, buffer.columns(), buffer.user_codes)
+    rows = [state.to_row(model.groups) for state in states]
+    print(f"🧮 {len(rows)} users rebuilt ({time.perf_counter() - streamed:.2f}s)")
+
+    # 4. Materialize into user_muscle_fatigue
+    updated = 0
+    errors = 0
+    if args.dry_run:
+        print("🔎 Dry run: no rows written.")
+    else:
+        chunks = [rows[i:i + args.chunk_size] for i in range(0, len(rows), args.chunk_size)]
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as pool:
+            futures = {pool.submit(write_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    updated += future.result()
+                except Exception as e:
+                    print(f"❌ Error upserting chunk for user {chunk[0]['user_id']}: {e}")
+                    errors += len(chunk)
+
+    print(f"\n🎉 Fatigue Rebuild Complete!")
+    print(f"   - Upserted: {updated}")
+    print(f"   - Errors: {errors}")
+    print(f"   - {time.perf_counter() - started:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
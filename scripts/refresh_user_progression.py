@@ -0,0 +1,88 @@
+
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from app.strength_progression import PAGE_SIZE, SessionBuffer, analyze, stream_logs
+from app.supabase_client import get_client_manager
+
+# Load env variables
+load_dotenv('web/.env.local')
+
+url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+key = os.getenv('SUPABASE_SERVICE_KEY')
+
+if not url or not key:
+    print("❌ Missing credentials. Please check web/.env.local")
+    exit(1)
+
+manager = get_client_manager(url, key)
+supabase = manager.client()
+
+
+def write_chunk(rows):
+    """Upsert one chunk into user_progression on the calling thread's client."""
+    manager.client().table('user_progression').upsert(rows, on_conflict='user_id,exercise_id').execute()
+    return len(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute user_progression from workout_logs.sets_data")
+    parser.add_argument('--user', default=None, help="Only this user id (default: whole table)")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="workout_logs rows per keyset page")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Rows per bulk upsert")
+    parser.add_argument('--concurrency', type=int, default=4, help="Upserts in flight at once")
+    parser.add_argument('--dry-run', action='store_true', help="Analyze without writing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    print(f"📈 Streaming workout_logs{' for ' + args.user if args.user else ''}...")
+
+    # 1. Stream pages and reduce them to per-session columns as they arrive
+    buffer = SessionBuffer()
+    pages = 0
+    for page in stream_logs(supabase, user_id=args.user, page_size=args.page_size):
+        buffer.add_page(page)
+        pages += 1
+        if pages % 50 == 0:
+            print(f"   ... {len(buffer)} sessions / {buffer.sets} sets")
+    streamed = time.perf_counter()
+    print(f"📥 {len(buffer)} sessions, {buffer.sets} sets in {pages} pages ({streamed - started:.1f}s)")
+
+    # 2. Vectorized analytics
+    progression = analyze(buffer)
+    rows = progression.to_rows()
+    analyzed = time.perf_counter()
+    print(f"🧮 {len(rows)} user/exercise pairs: {int(progression.pr_count.sum())} PRs, "
+          f"{int(progression.is_plateau.sum())} plateaus ({analyzed - streamed:.2f}s)")
+
+    # 3. Materialize into user_progression
+    updated = 0
+    errors = 0
+    if args.dry_run:
+        print("🔎 Dry run: no rows written.")
+    else:
+        chunks = [rows[i:i + args.chunk_size] for i in range(0, len(rows), args.chunk_size)]
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as pool:
+            futures = {pool.submit(write_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    updated += future.result()
+                except Exception as e:
+                    print(f"❌ Error upserting chunk for user {chunk[0]['user_id']}: {e}")
+                    errors += len(chunk)
+
+    print(f"\n🎉 Progression Refresh Complete!")
+    print(f"   - Upserted: {updated}")
+    print(f"   - Errors: {errors}")
+    print(f"   - {time.perf_counter() - started:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Measure page latency against a local stand-in backend that injects latency and errors.
+
+Each simulated page load issues the same four sequential reads a dashboard rerun does
+(profile, logs, today's meals, day totals). The stand-in answers in a few tens of ms, with a
+configurable share of multi-second stalls and errors, and an optional outage window. Pages
+are timed with raw calls and through `app.resilience.ReadGuard`, and p50/p95/p99 are printed.
+
+Usage:
+    python -m scripts.simulate_degraded_backend --pages 300 --stall-rate 0.05 --outage 100:130
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.resilience import ReadGuard
+
+READS = ("profiles", "daily_logs", "meal_entries", "daily_totals")
+
+
+class DegradedBackend:
+    """Stand-in for Supabase: lognormal base latency, injected stalls, errors and an outage window."""
+
+    def __init__(self, base_ms: float, stall_rate: float, stall_s: float, error_rate: float,
+                 outage: Optional[Tuple[int, int]] = None, seed: int = 7):
+        self.base_ms = base_ms
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+        self.error_rate = error_rate
+        self.outage = outage
+        self.page = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def query(self, table: str) -> Dict[str, str]:
+        with self._lock:
+            self.requests += 1
+            draw, jitter = self._rng.random(), self._rng.lognormvariate(0, 0.35)
+            in_outage = self.outage is not None and self.outage[0] <= self.page < self.outage[1]
+        if in_outage:
+            time.sleep(self.stall_s)
+            raise ConnectionError("backend unavailable")
+        if draw < self.error_rate:
+            raise ConnectionError("injected error")
+        time.sleep(self.stall_s if draw < self.error_rate + self.stall_rate else self.base_ms * jitter / 1000)
+        return {"table": table}
+
+
+def run_pages(backend: DegradedBackend, pages: int, read: Callable[[str, Callable[[], Dict]], Optional[Dict]]) -> List[float]:
+    latencies = []
+    for page in range(pages):
+        backend.page = page
+        started = time.perf_counter()
+        for table in READS:
+            try:
+                read(table, lambda t=table: backend.query(t))
+            except Exception:
+                pass  # the services fall back to defaults here
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare page latency with and without ReadGuard")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--base-ms", type=float, default=25.0, help="Median healthy read latency")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Share of reads that stall")
+    parser.add_argument("--stall-s", type=float, default=3.0, help="Stall duration in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--outage", help="Page range START:END during which every read stalls then fails")
+    parser.add_argument("--deadline", type=float, default=0.5, help="ReadGuard per-call deadline in seconds")
+    parser.add_argument("--reset-timeout", type=float, default=1.0,
+                        help="Breaker half-open delay; pages run back-to-back, so keep it short")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    outage = tuple(int(x) for x in args.outage.split(":")) if args.outage else None
+
+    def backend() -> DegradedBackend:
+        return DegradedBackend(args.base_ms, args.stall_rate, args.stall_s, args.error_rate, outage)
+
+    raw_backend = backend()
+    raw = run_pages(raw_backend, args.pages, lambda table, fn: fn())
+
+    guard = ReadGuard(deadline=args.deadline, workers=32, reset_timeout=args.reset_timeout)
+    guarded_backend = backend()
+    guarded = run_pages(guarded_backend, args.pages, lambda table, fn: guard.read(table, table, fn))
+
+    print(f"{'':10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'requests':>10}  (page ms)")
+    for label, values, b in (("raw", raw, raw_backend), ("guarded", guarded, guarded_backend)):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        print(f"{label:10}{p50:10.0f}{p95:10.0f}{p99:10.0f}{max(values):10.0f}{b.requests:10d}")
+    print(f"guard: {guard.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
 
 import os
 import time
-from supabase import create_client
 from deep_translator import GoogleTranslator
 from dotenv import load_dotenv
 
+from app.supabase_client import get_client_manager
+
 # Load env
 load_dotenv('web/.env.local')
 
@@ -15,7 +16,7 @@ if not url or not key:
     print("❌ Missing credentials. Please check web/.env.local")
     exit(1)
 
-supabase = create_client(url, key)
+supabase = get_client_manager(url, key).client()
 translator = GoogleTranslator(source='en', target='es')
 
 def translate_text(text):
@@ -9,7 +9,7 @@ This script:
 
 Usage:
     pip install deep-translator textblob
-    python scripts/translate_foods.py
+    python -m scripts.translate_foods
 """
 
 import os
@@ -23,7 +23,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 try:
-    from supabase import create_client, Client
+    from supabase import Client
+    from app.supabase_client import get_client_manager
 except ImportError:
     print("❌ supabase-py not installed. Run: pip install supabase")
     exit(1)
@@ -85,7 +86,7 @@ def get_supabase_client() -> Client:
     if not url or not key:
         raise ValueError("Missing credentials in web/.env.local")
         
-    return create_client(url, key)
+    return get_client_manager(url, key).client()
 
 def translate_batch(texts: List[str]) -> List[str]:
     """Translate a batch of texts using Google Translator."""
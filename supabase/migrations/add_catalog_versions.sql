@@ -0,0 +1,42 @@
+/* Migration: Catalog version tokens */
+/* Description: One row per reference catalog, bumped by a statement-level trigger on every
+   write, so app processes can probe "has the catalog changed?" with a single-row read
+   instead of re-reading foods/exercises. */
+
+CREATE TABLE IF NOT EXISTS public.catalog_versions (
+  catalog TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO public.catalog_versions (catalog) VALUES ('foods'), ('exercises')
+ON CONFLICT (catalog) DO NOTHING;
+
+ALTER TABLE public.catalog_versions ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "catalog_versions are readable" ON public.catalog_versions;
+CREATE POLICY "catalog_versions are readable" ON public.catalog_versions FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION public.bump_catalog_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.catalog_versions (catalog, version, updated_at)
+  VALUES (TG_ARGV[0], 1, NOW())
+  ON CONFLICT (catalog) DO UPDATE
+    SET version = public.catalog_versions.version + 1, updated_at = NOW();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_foods_catalog_version ON public.foods;
+CREATE TRIGGER trg_foods_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.foods
+FOR EACH STATEMENT EXECUTE FUNCTION public.bump_catalog_version('foods');
+
+DROP TRIGGER IF EXISTS trg_exercises_catalog_version ON public.exercises;
+CREATE TRIGGER trg_exercises_catalog_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.exercises
+FOR EACH STATEMENT EXECUTE FUNCTION public.bump_catalog_version('exercises');
@@ -0,0 +1,22 @@
+/* Migration: Meal Daily Totals RPC */
+/* Description: Server-side per-day macro aggregation for week/month views (DailyTracker.daily_totals_range) */
+
+CREATE OR REPLACE FUNCTION public.meal_daily_totals(p_user_id UUID, p_start DATE, p_end DATE)
+RETURNS TABLE (log_date DATE, kcal NUMERIC, protein_g NUMERIC, carbs_g NUMERIC, fat_g NUMERIC, entries BIGINT)
+LANGUAGE sql STABLE SECURITY INVOKER
+AS $$
+  SELECT
+    m.log_date,
+    COALESCE(SUM(m.calories), 0)::NUMERIC,
+    COALESCE(SUM(m.protein_g), 0),
+    COALESCE(SUM(m.carbs_g), 0),
+    COALESCE(SUM(m.fat_g), 0),
+    COUNT(*)
+  FROM public.meal_entries m
+  WHERE m.user_id = p_user_id
+    AND m.log_date BETWEEN p_start AND p_end
+  GROUP BY m.log_date
+  ORDER BY m.log_date;
+$$;
+
+COMMENT ON FUNCTION public.meal_daily_totals IS 'Totales diarios de kcal/macros de meal_entries en un rango de fechas';
@@ -0,0 +1,52 @@
+/* Migration: Meal Entries -> Daily Logs Rollup */
+/* Description: Keeps daily_logs.calories_consumed/protein_g/carbs_g/fat_g in sync with meal_entries.
+   Every insert/update/delete applies its delta in the same transaction, so DailyTracker.day_totals
+   is a single-row read and adherence never sees stale totals. */
+
+CREATE OR REPLACE FUNCTION public.bump_daily_log_totals(
+  p_user_id UUID,
+  p_log_date DATE,
+  p_kcal NUMERIC,
+  p_protein_g NUMERIC,
+  p_carbs_g NUMERIC,
+  p_fat_g NUMERIC
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  INSERT INTO public.daily_logs AS d (user_id, log_date, calories_consumed, protein_g, carbs_g, fat_g)
+  VALUES (p_user_id, p_log_date, ROUND(p_kcal), p_protein_g, p_carbs_g, p_fat_g)
+  ON CONFLICT (user_id, log_date) DO UPDATE SET
+    calories_consumed = COALESCE(d.calories_consumed, 0) + EXCLUDED.calories_consumed,
+    protein_g = COALESCE(d.protein_g, 0) + EXCLUDED.protein_g,
+    carbs_g = COALESCE(d.carbs_g, 0) + EXCLUDED.carbs_g,
+    fat_g = COALESCE(d.fat_g, 0) + EXCLUDED.fat_g;
+$$;
+
+CREATE OR REPLACE FUNCTION public.apply_meal_entry_rollup()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.bump_daily_log_totals(
+      OLD.user_id, OLD.log_date,
+      -COALESCE(OLD.calories, 0), -COALESCE(OLD.protein_g, 0), -COALESCE(OLD.carbs_g, 0), -COALESCE(OLD.fat_g, 0)
+    );
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.bump_daily_log_totals(
+      NEW.user_id, NEW.log_date,
+      COALESCE(NEW.calories, 0), COALESCE(NEW.protein_g, 0), COALESCE(NEW.carbs_g, 0), COALESCE(NEW.fat_g, 0)
+    );
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_meal_entries_rollup ON public.meal_entries;
+CREATE TRIGGER trg_meal_entries_rollup
+AFTER INSERT OR UPDATE OF log_date, calories, protein_g, carbs_g, fat_g OR DELETE ON public.meal_entries
+FOR EACH ROW EXECUTE FUNCTION public.apply_meal_entry_rollup();
+
+COMMENT ON FUNCTION public.apply_meal_entry_rollup IS 'Aplica el delta de cada meal_entry a los totales de daily_logs';
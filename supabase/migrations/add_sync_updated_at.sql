@@ -0,0 +1,52 @@
+/* Migration: Sync Change Cursors */
+/* Description: Change cursors + triggers for the offline LocalStore/SyncWorker.
+   updated_at is always stamped by the server (now()) on every write, so it is a reliable pull
+   cursor: an offline edit pushed late still sorts after everything replicas have already
+   pulled. The client's edit time travels separately in client_updated_at and is what
+   last-writer-wins compares; direct writes that don't supply it (the web app) get now(), while
+   writes made from another trigger (the meal rollup) are not edits and keep the previous value
+   (epoch for a row the rollup creates), so they never beat an unpushed client edit.
+   Replicas page on the (updated_at, id) keyset, since one transaction stamps many rows with
+   the same now(). */
+
+ALTER TABLE public.daily_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE public.meal_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS client_updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE public.daily_logs ADD COLUMN IF NOT EXISTS client_updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE public.meal_entries ADD COLUMN IF NOT EXISTS client_updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  IF pg_trigger_depth() > 1 THEN
+    NEW.client_updated_at := CASE WHEN TG_OP = 'INSERT' THEN 'epoch'::TIMESTAMPTZ ELSE OLD.client_updated_at END;
+  ELSIF TG_OP = 'INSERT' THEN
+    NEW.client_updated_at := COALESCE(NEW.client_updated_at, NOW());
+  ELSIF NEW.client_updated_at IS NOT DISTINCT FROM OLD.client_updated_at THEN
+    NEW.client_updated_at := NOW();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_profiles_touch ON public.profiles;
+CREATE TRIGGER trg_profiles_touch BEFORE INSERT OR UPDATE ON public.profiles
+FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_daily_logs_touch ON public.daily_logs;
+CREATE TRIGGER trg_daily_logs_touch BEFORE INSERT OR UPDATE ON public.daily_logs
+FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_meal_entries_touch ON public.meal_entries;
+CREATE TRIGGER trg_meal_entries_touch BEFORE INSERT OR UPDATE ON public.meal_entries
+FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+DROP INDEX IF EXISTS public.idx_daily_logs_user_updated;
+DROP INDEX IF EXISTS public.idx_meal_entries_user_updated;
+CREATE INDEX IF NOT EXISTS idx_profiles_user_updated ON public.profiles(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_daily_logs_user_updated_id ON public.daily_logs(user_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_meal_entries_user_updated_id ON public.meal_entries(user_id, updated_at, id);
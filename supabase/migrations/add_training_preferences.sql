@@ -0,0 +1,14 @@
+/* Migration: Training Preferences */
+/* Description: Per-user training level and injury-risk tolerance read by the personalized
+   exercise ranking (app/exercise_ranking.py), alongside profiles.goal and user_equipment. */
+
+ALTER TABLE public.profiles
+ADD COLUMN IF NOT EXISTS training_level TEXT DEFAULT 'principiante'
+  CHECK (training_level IN ('principiante', 'intermedio', 'avanzado'));
+
+ALTER TABLE public.profiles
+ADD COLUMN IF NOT EXISTS risk_tolerance NUMERIC DEFAULT 0.5
+  CHECK (risk_tolerance >= 0 AND risk_tolerance <= 1);
+
+COMMENT ON COLUMN public.profiles.training_level IS 'Nivel de entrenamiento: limita la dificultad de los ejercicios recomendados';
+COMMENT ON COLUMN public.profiles.risk_tolerance IS 'Tolerancia al riesgo de lesión (0 = evitar, 1 = indiferente) para el ranking personalizado';
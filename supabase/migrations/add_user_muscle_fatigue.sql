@@ -0,0 +1,32 @@
+/* Migration: User Muscle Fatigue */
+/* Description: Per-user residual fatigue per muscle group (app/muscle_fatigue.py). `levels` maps
+   group -> effective sets as of `state_at`; record_session folds each newly logged workout_logs
+   session into the row, and scripts/refresh_muscle_fatigue.py rebuilds it from the whole table.
+   updated_at is stamped by trigger on every write. */
+
+CREATE TABLE IF NOT EXISTS public.user_muscle_fatigue (
+  user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+  levels JSONB NOT NULL DEFAULT '{}'::jsonb,
+  state_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE public.user_muscle_fatigue ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "users read own muscle fatigue" ON public.user_muscle_fatigue;
+CREATE POLICY "users read own muscle fatigue" ON public.user_muscle_fatigue
+  FOR SELECT USING (auth.uid() = user_id);
+
+-- Not public.touch_updated_at(): that one also maintains client_updated_at, which this table lacks.
+CREATE OR REPLACE FUNCTION public.touch_user_muscle_fatigue()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_user_muscle_fatigue_touch ON public.user_muscle_fatigue;
+CREATE TRIGGER trg_user_muscle_fatigue_touch BEFORE INSERT OR UPDATE ON public.user_muscle_fatigue
+FOR EACH ROW EXECUTE FUNCTION public.touch_user_muscle_fatigue();
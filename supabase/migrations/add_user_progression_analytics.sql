@@ -0,0 +1,42 @@
+/* Migration: User Progression Analytics */
+/* Description: Columns written by the strength-progression pipeline (app/strength_progression.py),
+   a unique (user_id, exercise_id) key so it can upsert one row per exercise, and indexes
+   for keyset pagination over workout_logs (by id, optionally per user). */
+
+ALTER TABLE public.user_progression
+ADD COLUMN IF NOT EXISTS best_e1rm NUMERIC;
+
+ALTER TABLE public.user_progression
+ADD COLUMN IF NOT EXISTS session_count INTEGER DEFAULT 0;
+
+ALTER TABLE public.user_progression
+ADD COLUMN IF NOT EXISTS pr_count INTEGER DEFAULT 0;
+
+ALTER TABLE public.user_progression
+ADD COLUMN IF NOT EXISTS is_plateau BOOLEAN DEFAULT FALSE;
+
+ALTER TABLE public.user_progression
+ADD COLUMN IF NOT EXISTS volume_load_28d NUMERIC DEFAULT 0;
+
+-- Keep the most recently updated row per (user, exercise) before adding the key; rows without
+-- last_updated rank last, and id breaks ties, so exactly one row survives per pair.
+DELETE FROM public.user_progression p
+USING (
+  SELECT id,
+         ROW_NUMBER() OVER (
+           PARTITION BY user_id, exercise_id
+           ORDER BY last_updated DESC NULLS LAST, id DESC
+         ) AS row_rank
+  FROM public.user_progression
+) ranked
+WHERE p.id = ranked.id
+  AND ranked.row_rank > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_progression_user_exercise
+  ON public.user_progression (user_id, exercise_id);
+
+CREATE INDEX IF NOT EXISTS idx_user_progression_plateau
+  ON public.user_progression (user_id) WHERE is_plateau;
+
+CREATE INDEX IF NOT EXISTS idx_workout_logs_user_id_id
+  ON public.workout_logs (user_id, id);
@@ -0,0 +1,55 @@
+"""analyze_adherence on small hand-built histories, checked against day-by-day counting."""
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.adherence_analytics import analyze_adherence
+
+TARGETS = {"kcal_target": 2000, "protein_g": 150, "carbs_g": 200, "fat_g": 70}
+START = date(2026, 6, 1)  # a Monday
+
+
+def history(pattern):
+    """daily_logs rows from a string: 'H' on target, 'M' logged but missed, '.' not logged."""
+    logs = []
+    for offset, mark in enumerate(pattern):
+        if mark != ".":
+            kcal = 2000 if mark == "H" else 2600
+            logs.append({"log_date": str(START + timedelta(days=offset)), "calories_consumed": kcal, "protein_g": 75})
+    return logs
+
+
+def test_streaks_follow_runs_of_hit_days():
+    report = analyze_adherence(history("HHH.HHHHM.HH"), TARGETS)
+
+    assert report.longest_streak == 4
+    assert report.current_streak == 2
+    assert report.hits.sum() == 9
+    assert report.logged.sum() == 10
+
+
+def test_unlogged_today_does_not_break_the_streak():
+    logs = history("HHH")
+    assert analyze_adherence(logs, TARGETS, today=START + timedelta(days=3)).current_streak == 3
+    assert analyze_adherence(logs, TARGETS, today=START + timedelta(days=4)).current_streak == 0
+
+
+def test_rolling_adherence_uses_logged_days_as_denominator():
+    pattern = "HMH..HHMMH"
+    report = analyze_adherence(history(pattern), TARGETS, windows=(3, 7))
+
+    for window in (3, 7):
+        for end in range(len(pattern)):
+            recent = pattern[max(end + 1 - window, 0): end + 1].replace(".", "")
+            expected = recent.count("H") / len(recent) * 100 if recent else 0.0
+            assert np.isclose(report.rolling[window][end], expected)
+
+
+def test_weekday_pattern_and_macro_matrix():
+    report = analyze_adherence(history("HM.....HH"), TARGETS)
+
+    assert report.weekday_logged.tolist() == [2, 2, 0, 0, 0, 0, 0]
+    assert report.weekday_pattern()["Lun"] == 100.0
+    assert report.weekday_pattern()["Mar"] == 50.0
+    assert report.macro_matrix[1, 0] == 50.0  # protein 75 of 150
+    assert report.macro_matrix[:, 2].tolist() == [0.0, 0.0, 0.0, 0.0]
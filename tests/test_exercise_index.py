@@ -0,0 +1,63 @@
+"""ExerciseIndex bitset filters and top-k, checked against a scan of the materialized records."""
+import numpy as np
+import pytest
+
+from app.exercise_index import LEVEL_ORDER, get_exercise_index
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_exercise_index()
+
+
+@pytest.fixture(scope="module")
+def records(index):
+    return list(index.snapshot)
+
+
+def scan(records, predicate):
+    return [row for row, record in enumerate(records) if predicate(record)]
+
+
+def test_equipment_within_and_max_level(index, records):
+    available = {"mancuernas", "peso corporal"}
+    bits = index.mask(equipment_within=available, max_level="intermedio")
+
+    expected = scan(records, lambda r: set(r["equipamiento"]) <= available and r["nivel_dificultad"] in LEVEL_ORDER[:2])
+    assert index.rows(bits).tolist() == expected
+    assert index.count(bits) == len(expected)
+
+
+def test_muscles_patterns_and_exclusions_combine(index, records):
+    muscles = {"pectoral mayor", "tríceps braquial"}
+    excluded_ids = set(index.ids[:50].tolist())
+    bits = index.mask(muscles=muscles, equipment="barra", exclude=index.ids_bits(excluded_ids))
+
+    expected = scan(
+        records,
+        lambda r: bool(muscles & set(r["musculos_principales"])) and "barra" in r["equipamiento"] and r["id"] not in excluded_ids,
+    )
+    assert index.rows(bits).tolist() == expected
+
+
+@pytest.mark.parametrize("low, high", [(3, None), (None, 2), (2, 4), (6, None)])
+def test_score_ranges(index, records, low, high):
+    bits = index.score_range("injury_risk", low, high)
+
+    def within(record):
+        value = record["puntuaciones_1a5"].get("injury_risk")
+        if value is None:
+            return low is None  # an upper bound alone only removes rows scored above it
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    assert index.rows(bits).tolist() == scan(records, within)
+
+
+def test_top_k_matches_a_full_sort(index):
+    weights = {"hypertrophy_potential": 1.0, "injury_risk": -0.5}
+    bits = index.mask(equipment_within={"mancuernas", "barra", "peso corporal"})
+
+    rows = index.rows(bits)
+    score = index.weighted(weights)[rows]
+    expected = rows[np.lexsort((rows, -score))][:15]
+    assert index.top_k(bits, weights, k=15).tolist() == expected.tolist()
@@ -0,0 +1,68 @@
+"""ExerciseRanker top-k per body part against a brute-force scan and full sort."""
+import numpy as np
+import pytest
+
+from app.exercise_index import LEVEL_ORDER, get_exercise_index
+from app.exercise_ranking import FEATURES, ExerciseRanker, UserPreferences
+
+
+@pytest.fixture(scope="module")
+def ranker():
+    index = get_exercise_index()
+    features = np.random.default_rng(7).random((index.n, len(FEATURES)), dtype=np.float32)
+    joined = np.arange(index.n) % 3 != 0
+    return ExerciseRanker(index, features, joined)
+
+
+USERS = [
+    UserPreferences("beginner", equipment=["Mancuernas"], level="principiante", goal="Definir", risk_tolerance=0.0),
+    UserPreferences("gym", equipment=["Barra", "Máquina", "Poleas"], level="avanzado", goal="Volumen", risk_tolerance=1.0),
+    UserPreferences("home", equipment=[], level="Intermedio", goal="Mantener"),
+]
+
+
+def brute_force(ranker, user, part, k):
+    """Best k (id, score) of the part by scanning every record's equipment and level."""
+    available = user.available_equipment()
+    levels = LEVEL_ORDER[: LEVEL_ORDER.index(user.normalized_level()) + 1]
+    weights = user.weights()
+    picks = []
+    for row in ranker.body_parts[part]:
+        record = ranker.snapshot[int(row)]
+        if set(record["equipamiento"]) <= available and record["nivel_dificultad"] in levels:
+            picks.append((float(ranker.features[row] @ weights), record["id"]))
+    picks.sort(key=lambda pick: -pick[0])
+    return picks[:k]
+
+
+def test_top_k_matches_brute_force(ranker):
+    ranking = ranker.rank(USERS, k=5)
+
+    for position, user in enumerate(USERS):
+        for part, picks in ranking.for_user(position).items():
+            expected = brute_force(ranker, user, part, 5)
+            assert [exercise_id for exercise_id, _ in picks] == [exercise_id for _, exercise_id in expected]
+            assert np.allclose([score for _, score in picks], [score for score, _ in expected], atol=1e-5)
+
+
+def test_missing_picks_are_padded_and_joined_flags_follow_rows(ranker):
+    part = min((p for p, rows in ranker.body_parts.items() if len(rows)), key=lambda p: len(ranker.body_parts[p]))
+    k = len(ranker.body_parts[part]) + 3
+    ranking = ranker.rank(USERS, k=k, body_parts=[part])
+
+    ids = ranking.ids[part]
+    assert ids.shape == (len(USERS), len(ranker.body_parts[part]))
+    for position in range(len(USERS)):
+        row_ids = ids[position]
+        rows = [ranker.snapshot.index_of(int(i)) for i in row_ids[row_ids >= 0]]
+        assert ranking.joined[part][position][row_ids >= 0].tolist() == [bool(ranker.joined[r]) for r in rows]
+        assert not ranking.joined[part][position][row_ids < 0].any()
+
+
+def test_chunked_scores_match_one_pass(ranker, monkeypatch):
+    whole = ranker.rank(USERS, k=4)
+    monkeypatch.setattr("app.exercise_ranking.USER_CHUNK", 1)
+    chunked = ranker.rank(USERS, k=4)
+
+    for part in whole.ids:
+        assert np.array_equal(whole.ids[part], chunked.ids[part])
@@ -0,0 +1,48 @@
+"""Compiled exercise snapshots read back exactly what the enriched JSON holds."""
+import json
+
+import pytest
+
+from app.exercise_snapshot import DEFAULT_SOURCE, load_exercise_snapshot
+
+
+@pytest.fixture(scope="module")
+def document():
+    with open(DEFAULT_SOURCE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def source(tmp_path, document):
+    """A 200-record slice of the enriched JSON, written where the test can change it."""
+    path = tmp_path / "ejercicios.json"
+    path.write_text(json.dumps({**document, "exercises": document["exercises"][:200]}, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_records_round_trip(source, tmp_path):
+    records = json.loads(source.read_text(encoding="utf-8"))
+    snapshot = load_exercise_snapshot(str(source), cache_dir=str(tmp_path / "cache"))
+
+    assert len(snapshot) == 200
+    assert list(snapshot) == records["exercises"]
+    assert snapshot.meta == records["meta"]
+    assert snapshot.templates == records["templates"]
+    last = records["exercises"][-1]
+    assert snapshot.by_id(last["id"]) == last
+    assert snapshot.by_id(-1) is None
+
+
+def test_snapshot_is_reused_until_the_source_changes(source, tmp_path):
+    cache = str(tmp_path / "cache")
+    first = load_exercise_snapshot(str(source), cache_dir=cache)
+    assert load_exercise_snapshot(str(source), cache_dir=cache) is first
+
+    records = json.loads(source.read_text(encoding="utf-8"))
+    records["exercises"][0]["nombre_en"] = "Renamed press"
+    source.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    second = load_exercise_snapshot(str(source), cache_dir=cache)
+
+    assert second is not first
+    assert second.name_en(0) == "Renamed press"
+    assert second.source_hash != first.source_hash
@@ -0,0 +1,68 @@
+"""validate_file / exit_code on small enriched-JSON documents written to a temp dir."""
+import json
+
+import pytest
+
+from app.exercise_validation import exit_code, validate_file
+
+SCORES = {"technical_difficulty": 2, "injury_risk": 2, "hypertrophy_potential": 4, "strength_potential": 4, "stability_demand": 3}
+
+
+def exercise(exercise_id, name, **fields):
+    return {
+        "id": exercise_id,
+        "nombre_en": name,
+        "patron_movimiento_id": "squat",
+        "nivel_dificultad": "principiante",
+        "musculos_principales": ["cuádriceps"],
+        "musculos_secundarios": ["glúteo mayor"],
+        "puntuaciones_1a5": dict(SCORES),
+        "familia_variantes": {"clave": "squat", "relacionados_ids": []},
+        **fields,
+    }
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(records):
+        path = tmp_path / "ejercicios.json"
+        path.write_text(json.dumps({"meta": {}, "templates": {"patterns": {"squat": {}}}, "exercises": records}, ensure_ascii=False), encoding="utf-8")
+        return str(path)
+    return write
+
+
+def test_clean_file_exits_zero(write):
+    report = validate_file(write([exercise(1, "Goblet squat"), exercise(2, "Front squat")]))
+
+    assert report["summary"]["errors"] == report["summary"]["warnings"] == 0
+    assert exit_code(report) == 0
+    assert exit_code(report, strict=True) == 0
+
+
+def test_warnings_fail_only_in_strict_mode(write):
+    report = validate_file(write([exercise(1, "Goblet squat", musculos_principales=[]), exercise(2, "goblet squat ")]))
+
+    assert report["summary"]["by_rule"] == {"main_muscles_present": 1, "unique_name": 1}
+    assert exit_code(report) == 0
+    assert exit_code(report, strict=True) == 1
+
+
+def test_errors_exit_one(write):
+    bad_score = exercise(1, "Goblet squat", puntuaciones_1a5={**SCORES, "injury_risk": 7})
+    dangling = exercise(2, "Front squat", familia_variantes={"clave": "squat", "relacionados_ids": [99]})
+    no_template = exercise(3, "Box squat", patron_movimiento_id="lunge")
+    report = validate_file(write([bad_score, dangling, no_template]))
+
+    assert report["summary"]["by_rule"] == {"score_range": 1, "related_ids_exist": 1, "pattern_has_template": 1}
+    assert exit_code(report) == 1
+
+
+def test_unchanged_records_are_reused(write):
+    records = [exercise(1, "Goblet squat"), exercise(2, "Front squat", nivel_dificultad="experto")]
+    first = validate_file(write(records))
+    records[0]["nombre_en"] = "Goblet squat (heels raised)"
+    second = validate_file(write(records), previous=first)
+
+    assert (second["summary"]["checked"], second["summary"]["reused"]) == (1, 1)
+    assert second["summary"]["by_rule"] == {"level_known": 1}
+    assert exit_code(second) == 1
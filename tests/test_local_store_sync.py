@@ -0,0 +1,313 @@
+"""SyncWorker against an in-memory stand-in for the Supabase tables and triggers.
+
+FakeSupabase mirrors what the migrations install server-side: `updated_at` stamped with now()
+on every write, `client_updated_at` taken from the writer (now() when omitted, kept when the
+write comes from the meal rollup), and daily_logs totals maintained from meal_entries. Its
+query builder covers the subset of the PostgREST client the worker uses, including the
+1000-row response cap.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.local_store import LocalStore, SyncWorker
+
+USER = "00000000-0000-0000-0000-000000000001"
+DAY = "2026-06-01"
+EPOCH = "1970-01-01T00:00:00.000000+00:00"
+ROLLUP = {"calories": "calories_consumed", "protein_g": "protein_g", "carbs_g": "carbs_g", "fat_g": "fat_g"}
+KEYS = {"profiles": ("user_id",), "daily_logs": ("user_id", "log_date")}
+MAX_ROWS = 1000
+
+
+def stamp(minutes: float) -> str:
+    return (datetime(2026, 6, 1, 12, tzinfo=timezone.utc) + timedelta(minutes=minutes)).isoformat(timespec="microseconds")
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {"profiles": [], "daily_logs": [], "meal_entries": []}
+        self.requests = []
+        self._ids = {"daily_logs": 0, "meal_entries": 0}
+        self._clock = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+    def table(self, name):
+        return Query(self, name)
+
+    def now(self) -> str:
+        self._clock += timedelta(milliseconds=1)
+        return self._clock.isoformat(timespec="microseconds")
+
+    def write(self, table, row, nested=False):
+        """Insert or update `row` (merged by key) and run the touch trigger."""
+        now = self.now()
+        existing = self.find(table, row)
+        if existing is None:
+            existing = {"client_updated_at": EPOCH if nested else now}
+            if table in self._ids:
+                self._ids[table] += 1
+                existing["id"] = self._ids[table]
+            self.tables[table].append(existing)
+        elif not nested and "client_updated_at" not in row:
+            existing["client_updated_at"] = now
+        existing.update({k: v for k, v in row.items() if not (nested and k == "client_updated_at")})
+        existing["updated_at"] = now
+        if table == "meal_entries":
+            self.rollup(existing["user_id"], existing["log_date"])
+        return existing
+
+    def find(self, table, row):
+        if table == "meal_entries":
+            keys = ("id",) if "id" in row else None
+        else:
+            keys = KEYS[table]
+        if keys is None:
+            return None
+        return next((r for r in self.tables[table] if all(r.get(k) == row[k] for k in keys)), None)
+
+    def rollup(self, user_id, log_date):
+        meals = [m for m in self.tables["meal_entries"] if m["user_id"] == user_id and m["log_date"] == log_date]
+        totals = {dst: sum(m.get(src) or 0 for m in meals) for src, dst in ROLLUP.items()}
+        self.write("daily_logs", {"user_id": user_id, "log_date": log_date, **totals}, nested=True)
+
+    def delete(self, table, row):
+        self.tables[table].remove(row)
+        if table == "meal_entries":
+            self.rollup(row["user_id"], row["log_date"])
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    def __init__(self, server, name):
+        self.server, self.name = server, name
+        self.filters, self.orders, self.cap = [], [], MAX_ROWS
+        self.action, self.payload = "select", None
+
+    def select(self, *columns):
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.action, self.payload = "upsert", payload
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r[column]) > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and str(r[column]) >= value)
+        return self
+
+    def or_(self, expression):
+        ops = {"eq": lambda a, b: a == b, "gt": lambda a, b: a > b}
+        clauses = []
+        for part in re.findall(r"and\([^)]*\)|[^,]+", expression):
+            conditions = part[4:-1].split(",") if part.startswith("and(") else [part]
+            clauses.append([c.split(".", 2) for c in conditions])
+
+        def compare(row, column, op, raw):
+            value = raw.strip('"')
+            current = row.get(column)
+            return ops[op](current, type(current)(value)) if isinstance(current, int) else ops[op](str(current), value)
+
+        self.filters.append(lambda r: any(all(compare(r, *c) for c in clause) for clause in clauses))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.cap = min(self.cap, n)
+        return self
+
+    def execute(self):
+        self.server.requests.append((self.name, self.action))
+        rows = [r for r in self.server.tables[self.name] if all(f(r) for f in self.filters)]
+        if self.action == "select":
+            for column, desc in reversed(self.orders):
+                rows.sort(key=lambda r: r[column], reverse=desc)
+            return Result([dict(r) for r in rows[: self.cap]])
+        if self.action == "delete":
+            for row in rows:
+                self.server.delete(self.name, row)
+            return Result([])
+        if self.action == "update":
+            return Result([dict(self.server.write(self.name, {**self.payload, "id": r["id"]})) for r in rows])
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        return Result([dict(self.server.write(self.name, dict(row))) for row in payload])
+
+
+@pytest.fixture
+def server():
+    return FakeSupabase()
+
+
+def device(server):
+    store = LocalStore()
+    return store, SyncWorker(store, server, USER)
+
+
+def meal(calories, protein=0.0, log_date=DAY, food="arroz"):
+    return {
+        "user_id": USER, "log_date": log_date, "meal_type": "almuerzo", "food_name": food, "grams": 100,
+        "calories": calories, "protein_g": protein, "carbs_g": 0.0, "fat_g": 0.0,
+    }
+
+
+def test_offline_edits_are_pushed_once_online(server):
+    store, worker = device(server)
+    store.upsert_profile(USER, {"weight_kg": 80, "goal": "perder"})
+    store.upsert_log(USER, {"log_date": DAY, "weight_kg": 79.5})
+    first = store.add_meal_entry(meal(400, 30))
+    store.add_meal_entry(meal(250, 10))
+    store.update_meal_entry(USER, first, {"calories": 450})
+    assert store.day_totals(USER, DAY)["calories_consumed"] == 700
+    assert server.requests == []
+
+    stats = worker.sync_once()
+
+    assert stats["errors"] == 0
+    assert sorted(m["calories"] for m in server.tables["meal_entries"]) == [250, 450]
+    log = server.tables["daily_logs"][0]
+    assert log["weight_kg"] == 79.5
+    assert log["calories_consumed"] == 700
+    assert server.tables["profiles"][0]["goal"] == "perder"
+    assert store.dirty_rows("meal_entries", USER) == []
+    assert store.dirty_rows("daily_logs", USER) == []
+
+
+def test_log_push_leaves_rollup_to_the_server(server):
+    store, worker = device(server)
+    store.add_meal_entry(meal(300))
+    store.upsert_log(USER, {"log_date": DAY, "weight_kg": 70, "calories_consumed": 9999})
+    worker.sync_once()
+
+    pushed = [r for r in server.tables["daily_logs"] if r["log_date"] == DAY]
+    assert pushed[0]["calories_consumed"] == 300
+    assert pushed[0]["weight_kg"] == 70
+
+
+def test_remote_meals_update_local_totals(server):
+    phone, phone_worker = device(server)
+    laptop, laptop_worker = device(server)
+    phone.add_meal_entry(meal(500, 40))
+    phone_worker.sync_once()
+
+    laptop.add_meal_entry(meal(200, 5, food="manzana"))
+    laptop_worker.sync_once()
+
+    assert laptop.day_totals(USER, DAY)["calories_consumed"] == 700
+    assert laptop.day_totals(USER, DAY)["protein_g"] == 45
+    phone_worker.sync_once()
+    assert phone.day_totals(USER, DAY)["calories_consumed"] == 700
+
+
+def test_late_push_is_pulled_after_cursor_moved_past_its_edit_time(server):
+    phone, phone_worker = device(server)
+    laptop, laptop_worker = device(server)
+    phone.upsert_log(USER, {"log_date": "2026-05-30", "weight_kg": 81}, updated_at=stamp(0))  # edited offline
+    laptop.upsert_log(USER, {"log_date": "2026-05-31", "weight_kg": 80.5}, updated_at=stamp(10))
+    laptop_worker.sync_once()
+    laptop_worker.sync_once()
+    assert laptop.get_cursor(USER, "daily_logs") is not None
+
+    phone_worker.sync_once()  # comes online much later with its older edit
+    laptop_worker.sync_once()
+
+    weights = {row["log_date"]: row["weight_kg"] for row in laptop.list_logs(USER)}
+    assert weights == {"2026-05-30": 81, "2026-05-31": 80.5}
+
+
+def test_conflicting_edits_resolve_to_the_latest_edit(server):
+    phone, phone_worker = device(server)
+    laptop, laptop_worker = device(server)
+    phone.upsert_profile(USER, {"weight_kg": 80, "goal": "mantener"}, updated_at=stamp(5))
+    laptop.upsert_profile(USER, {"weight_kg": 79, "goal": "perder"}, updated_at=stamp(1))
+
+    phone_worker.sync_once()
+    laptop_worker.sync_once()  # laptop's edit is older: pulled remote wins, nothing pushed
+    phone_worker.sync_once()
+
+    assert server.tables["profiles"][0]["goal"] == "mantener"
+    assert laptop.get_profile(USER)["goal"] == "mantener"
+    assert phone.get_profile(USER)["goal"] == "mantener"
+    assert laptop.dirty_rows("profiles", USER) == []
+
+
+def test_newer_local_edit_survives_pull_and_wins(server):
+    phone, phone_worker = device(server)
+    laptop, laptop_worker = device(server)
+    phone.upsert_profile(USER, {"weight_kg": 80, "goal": "mantener"}, updated_at=stamp(1))
+    phone_worker.sync_once()
+    laptop.upsert_profile(USER, {"weight_kg": 78, "goal": "perder"}, updated_at=stamp(5))
+
+    stats = laptop_worker.sync_once()
+    phone_worker.sync_once()
+
+    assert stats["conflicts"] == 1
+    assert server.tables["profiles"][0]["goal"] == "perder"
+    assert phone.get_profile(USER)["goal"] == "perder"
+
+
+def test_rollup_write_does_not_beat_an_unpushed_log_edit(server):
+    phone, phone_worker = device(server)
+    laptop, laptop_worker = device(server)
+    laptop.upsert_log(USER, {"log_date": DAY, "weight_kg": 77})  # offline, not pushed yet
+    phone.add_meal_entry(meal(350))
+    phone_worker.sync_once()  # the server rollup creates the day's row
+
+    laptop_worker.sync_once()
+
+    log = laptop.list_logs(USER)[0]
+    assert log["weight_kg"] == 77
+    assert log["calories_consumed"] == 350
+    assert server.tables["daily_logs"][0]["weight_kg"] == 77
+
+
+def test_pull_pages_rows_sharing_one_timestamp(server):
+    store, worker = device(server)
+    worker.PAGE_SIZE = 3
+    same = server.now()
+    for n in range(8):
+        server.tables["meal_entries"].append(
+            {**meal(100), "id": n + 1, "updated_at": same, "client_updated_at": same, "created_at": same}
+        )
+
+    worker.sync_once()
+
+    assert len(store.list_meal_entries(USER, DAY)) == 8
+    assert store.day_totals(USER, DAY)["calories_consumed"] == 800
+
+
+def test_local_delete_is_pushed(server):
+    store, worker = device(server)
+    entry = store.add_meal_entry(meal(300))
+    worker.sync_once()
+    store.delete_meal_entry(USER, entry)
+    worker.sync_once()
+
+    assert server.tables["meal_entries"] == []
+    assert server.tables["daily_logs"][0]["calories_consumed"] == 0
+    assert store.day_totals(USER, DAY)["calories_consumed"] == 0
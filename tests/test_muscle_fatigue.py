@@ -0,0 +1,120 @@
+"""Closed-form fatigue rebuild against replaying `FatigueModel.update`, and `record_session`."""
+import numpy as np
+import pytest
+
+from app.muscle_fatigue import FatigueModel, FatigueState, rebuild_states, record_session
+from app.muscle_volume import MuscleVolumeMatrix
+from app.strength_progression import SessionBuffer
+
+CATALOG = [
+    {"id": 1, "primary_muscles": ["pectoral mayor"], "secondary_muscles": ["tríceps braquial", "deltoides anterior"]},
+    {"id": 2, "activation_profile": {"alto": ["cuádriceps", "glúteo mayor"], "medio": ["aductores"]}},
+    {"id": 3, "primary_muscles": ["dorsal ancho"], "secondary_muscles": ["bíceps braquial"]},
+    {"id": 4, "primary_muscles": []},
+]
+
+
+@pytest.fixture
+def model():
+    return FatigueModel(MuscleVolumeMatrix.from_rows(CATALOG))
+
+
+def sessions(seed=5, users=4, n=60):
+    """(user, exercise id, hours since epoch, sets) in random order, several entries per session time."""
+    rng = np.random.default_rng(seed)
+    user = rng.integers(0, users, n)
+    exercise = rng.choice([1, 2, 3, 4, 99], n)
+    hours = 490_000 + rng.integers(0, 30, n) * 24.0
+    sets = rng.integers(1, 6, n).astype(float)
+    return user, exercise, hours, sets
+
+
+def replay(model, user, exercise, hours, sets, code):
+    state = model.empty_state(f"user-{code}")
+    for at in np.unique(hours[user == code]):
+        session = (user == code) & (hours == at)
+        model.update(state, exercise[session], sets[session], float(at))
+    return state
+
+
+def test_rebuild_matches_replayed_updates(model):
+    user, exercise, hours, sets = sessions()
+    levels, state_at = model.rebuild(user, exercise, hours, sets, n_users=4)
+
+    for code in range(4):
+        state = replay(model, user, exercise, hours, sets, code)
+        assert state_at[code] == state.at
+        assert np.allclose(levels[code], state.levels)
+
+
+def test_late_log_gives_the_same_state(model):
+    user, exercise, hours, sets = sessions(users=1)
+    in_order = replay(model, user, exercise, hours, sets, 0)
+
+    late = hours == np.unique(hours)[2]
+    state = replay(model, user[~late], exercise[~late], hours[~late], sets[~late], 0)
+    model.update(state, exercise[late], sets[late], float(hours[late][0]))
+    assert state.at == in_order.at
+    assert np.allclose(state.levels, in_order.levels)
+
+
+def test_rebuild_at_a_fixed_time_decays_everyone_to_it(model):
+    user, exercise, hours, sets = sessions()
+    at = hours.max() + 36.0
+    levels, state_at = model.rebuild(user, exercise, hours, sets, n_users=4, at=at)
+
+    for code in range(4):
+        state = replay(model, user, exercise, hours, sets, code)
+        assert np.allclose(levels[code], model.decayed(state, at))
+    assert (state_at == at).all()
+
+
+class FatigueTable:
+    """user_muscle_fatigue as a dict, with the select / upsert calls record_session makes."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        assert name == "user_muscle_fatigue"
+        return self
+
+    def select(self, columns):
+        self.action = "select"
+        return self
+
+    def in_(self, column, values):
+        self.keys = list(values)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        assert on_conflict == "user_id"
+        self.action, self.payload = "upsert", rows
+        return self
+
+    def execute(self):
+        if self.action == "upsert":
+            self.rows.update({row["user_id"]: row for row in self.payload})
+            return type("Result", (), {"data": self.payload})
+        return type("Result", (), {"data": [self.rows[key] for key in self.keys if key in self.rows]})
+
+
+def test_record_session_folds_logs_into_the_stored_row(model):
+    logs = [
+        {"id": 1, "user_id": "a", "exercise_id": 1, "date": "2026-06-01T10:00:00", "sets_data": [{"weight": 60, "reps": 8}] * 4},
+        {"id": 2, "user_id": "a", "exercise_id": 2, "date": "2026-06-01T10:00:00", "sets_data": [{"weight": 90, "reps": 6}] * 3},
+        {"id": 3, "user_id": "b", "exercise_id": 3, "date": "2026-06-02T18:00:00", "sets_data": [{"weight": 50, "reps": 10}] * 2},
+        {"id": 4, "user_id": "a", "exercise_id": 3, "date": "2026-06-03T09:00:00", "sets_data": [{"weight": 50, "reps": 0}, {"weight": 50, "reps": 10}]},
+        {"id": 5, "user_id": "a", "exercise_id": 2, "date": "2026-05-31T08:00:00", "sets_data": [{"weight": 80, "reps": 5}] * 2},
+    ]
+    client = FatigueTable()
+    for log in logs:
+        record_session(client, [log], model)
+
+    buffer = SessionBuffer()
+    buffer.add_page(logs)
+    rebuilt = {state.user_id: state for state in rebuild_states(model, buffer.columns(), buffer.user_codes)}
+    for user_id, row in client.rows.items():
+        stored = FatigueState.from_row(row, model.groups)
+        assert stored.at == rebuilt[user_id].at
+        assert np.allclose(stored.levels, rebuilt[user_id].levels, atol=2e-3)  # rows keep 3 decimals
@@ -0,0 +1,70 @@
+"""Sparse weekly muscle volumes against a dense exercise × group product."""
+import numpy as np
+import pytest
+
+from app.muscle_volume import MUSCLE_GROUPS, MuscleVolumeMatrix, get_volume_matrix, plan_sets
+
+
+def dense(matrix):
+    """The matrix's (exercises, groups) weights rebuilt from its CSR arrays."""
+    weights = np.zeros((len(matrix.exercise_ids), len(matrix.groups)))
+    rows = np.repeat(np.arange(len(matrix.exercise_ids)), np.diff(matrix.indptr))
+    weights[rows, matrix.indices] = matrix.data
+    return weights
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return get_volume_matrix()
+
+
+def test_volumes_match_dense_product(matrix):
+    rng = np.random.default_rng(3)
+    ids = matrix.exercise_ids
+    plans = [
+        {int(i): float(s) for i, s in zip(rng.choice(ids, size=8, replace=False), rng.integers(1, 6, size=8))}
+        for _ in range(25)
+    ]
+    plans.append({})
+
+    position = {int(i): row for row, i in enumerate(ids)}
+    sets = np.zeros((len(plans), len(ids)))
+    for p, plan in enumerate(plans):
+        for exercise_id, n in plan.items():
+            sets[p, position[exercise_id]] += n
+
+    assert np.allclose(matrix.volumes_for(plans), sets @ dense(matrix))
+
+
+def test_emg_weights_win_over_muscle_lists():
+    matrix = MuscleVolumeMatrix.from_rows([
+        {"id": 10, "activation_profile": {"alto": ["glúteo mayor"], "bajo": ["cuádriceps"]}, "primary_muscles": ["cuádriceps"]},
+        {"id": 11, "primary_muscles": ["pectoral mayor"], "secondary_muscles": ["tríceps braquial", "ancóneo"]},
+        {"id": 12, "primary_muscles": ["manguito rotador"]},
+    ])
+
+    volume = matrix.weekly_volume({10: 4, 11: 2, 12: 3})
+    assert volume["glúteos"] == 4.0
+    assert volume["cuádriceps"] == 1.0
+    assert volume["pecho"] == 2.0
+    assert volume["tríceps"] == 1.0  # two triceps muscles count once at the highest weight
+    assert sum(volume.values()) == 8.0
+
+
+def test_unknown_sets_are_reported_next_to_flags():
+    matrix = MuscleVolumeMatrix.from_rows([
+        {"id": 1, "primary_muscles": ["pectoral mayor"]},
+        {"id": 2, "primary_muscles": []},
+    ])
+
+    report = matrix.assess({1: 12, 2: 6, 99: 2})
+    assert report.unknown_sets == 8.0
+    assert report.unknown_exercise_ids == [2, 99]
+    assert report.coverage == pytest.approx(0.6)
+    assert {flag.group for flag in report.flags if flag.status == "below"} == set(MUSCLE_GROUPS) - {"pecho"}
+    assert matrix.unknown_sets(np.array([0, 1, 1]), np.array([1, 2, 99]), np.array([3.0, 4.0, 5.0]), 2).tolist() == [0.0, 9.0]
+
+
+def test_plan_sets_counts_each_weekly_row():
+    rows = [{"exercise_id": 5, "sets": 3}, {"exercise_id": 5, "sets": 4}, {"exercise_id": 6}, {"exercise_id": None, "sets": 9}]
+    assert plan_sets(rows) == {5: 7.0, 6: 3.0}
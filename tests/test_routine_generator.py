@@ -0,0 +1,54 @@
+"""RoutineGenerator plans: deterministic per (seed, user), feasible, and volume-consistent."""
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.exercise_index import get_exercise_index
+from app.exercise_ranking import FEATURES, ExerciseRanker, UserPreferences
+from app.muscle_volume import get_volume_matrix, plan_sets
+from app.routine_generator import RoutineGenerator
+
+
+@pytest.fixture(scope="module")
+def generator():
+    index = get_exercise_index()
+    features = np.random.default_rng(21).random((index.n, len(FEATURES)), dtype=np.float32)
+    return RoutineGenerator(ExerciseRanker(index, features), get_volume_matrix(index.snapshot))
+
+
+USERS = [
+    UserPreferences("u1", equipment=["Mancuernas"], level="principiante", goal="Definir"),
+    UserPreferences("u2", equipment=["Barra", "Máquina", "Poleas", "Mancuernas"], level="avanzado", goal="Volumen"),
+    UserPreferences("u3", equipment=["Bandas", "Kettlebell"], level="intermedio", goal="Mantener"),
+    UserPreferences("u4", equipment=["Barra", "Mancuernas"], level="intermedio", goal="Volumen"),
+]
+
+
+def test_same_seed_gives_the_same_plans(generator):
+    first = [plan.to_dict() for plan in generator.generate_many(USERS, seed=42)]
+    again = [plan.to_dict() for plan in generator.generate_many(USERS, seed=42)]
+    one_by_one = [generator.generate(user, seed=42).to_dict() for user in USERS]
+
+    assert first == again == one_by_one
+
+
+def test_plans_depend_on_the_seed_not_the_batch(generator):
+    plans = {seed: [plan.to_rows() for plan in generator.generate_many(USERS, seed=seed)] for seed in range(5)}
+    assert any(plans[seed] != plans[0] for seed in range(1, 5))
+
+    reordered = generator.generate_many(USERS[::-1], seed=3, chunk_size=1)
+    assert [plan.to_rows() for plan in reordered[::-1]] == plans[3]
+
+
+def test_plans_are_feasible_and_report_their_volume(generator):
+    for user, plan in zip(USERS, generator.generate_many(USERS, seed=7)):
+        allowed = set(generator.index.exercise_ids(generator.index.equipment_within(user.available_equipment())))
+        rows = plan.to_rows()
+        assert rows
+        assert {row["exercise_id"] for row in rows} <= allowed
+        per_day = Counter((row["day_of_week"], row["exercise_id"]) for row in rows)
+        assert max(per_day.values()) == 1
+
+        expected = generator.matrix.weekly_volume(plan_sets(rows))
+        assert plan.weekly_volume == pytest.approx(expected, abs=0.02)
@@ -0,0 +1,103 @@
+"""e1RM, PR and plateau segmentation in `analyze`, checked against a per-exercise replay."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.strength_progression import PLATEAU_WINDOW, PR_TOLERANCE, SessionBuffer, analyze, e1rm
+
+TODAY = date(2026, 6, 30)
+
+
+def test_e1rm_folds_rir_into_reps_and_drops_unusable_sets():
+    weight = np.array([100, 100, 100, 0, 80], dtype=np.float32)
+    reps = np.array([5, 5, 0, 5, 14], dtype=np.float32)
+    rir = np.array([0, 1, 0, 0, 2], dtype=np.float32)
+
+    result = e1rm(weight, reps, rir)
+    assert result[0] == pytest.approx(100 * (1 + 5 / 30))
+    assert result[1] == pytest.approx(100 * (1 + 6 / 30))
+    assert np.isnan(result[2:]).all()  # no reps, no weight, 16 reps to failure
+
+
+def logs(seed=11, users=3, exercises=4, sessions=12):
+    """Random workout_logs rows, shuffled, with some sessions lacking a usable set."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for u in range(users):
+        for e in range(exercises):
+            weight = 60.0
+            for s in range(sessions):
+                weight *= 1.0 + rng.choice([-0.03, 0.0, 0.0, 0.02, 0.05])
+                sets = [{"weight": round(weight, 1), "reps": int(rng.integers(3, 9)), "rir": int(rng.integers(0, 3))} for _ in range(3)]
+                if rng.random() < 0.1:
+                    sets = [{"weight": 0, "reps": 10}]
+                rows.append({
+                    "id": len(rows) + 1,
+                    "user_id": f"user-{u}",
+                    "exercise_id": 100 + e,
+                    "date": str(TODAY - timedelta(days=3 * (sessions - s))),
+                    "sets_data": sets,
+                })
+    rng.shuffle(rows)
+    return rows
+
+
+def replay(rows):
+    """Per (user, exercise): PR count, sessions since the last PR and the plateau flag, one session at a time."""
+    by_group = {}
+    for row in sorted(rows, key=lambda r: r["date"]):
+        sets = row["sets_data"]
+        estimates = e1rm(*(np.array([s.get(k, 0) for s in sets], dtype=np.float32) for k in ("weight", "reps", "rir")))
+        best = float(np.nanmax(estimates)) if np.isfinite(estimates).any() else None
+        by_group.setdefault((row["user_id"], row["exercise_id"]), []).append(best)
+
+    expected = {}
+    for key, estimates in by_group.items():
+        best, prs = None, []
+        for i, estimate in enumerate(estimates):
+            prs.append(i > 0 and estimate is not None and (best is None or estimate > best * (1 + PR_TOLERANCE)))
+            if estimate is not None:
+                best = estimate if best is None else max(best, estimate)
+        last_pr = max([i for i, pr in enumerate(prs) if pr], default=0)
+        plateau = len(prs) > PLATEAU_WINDOW and not any(prs[-PLATEAU_WINDOW:])
+        expected[key] = (sum(prs), len(prs) - 1 - last_pr, plateau, best)
+    return expected
+
+
+def test_prs_and_plateaus_match_replay():
+    rows = logs()
+    buffer = SessionBuffer()
+    for start in range(0, len(rows), 50):
+        buffer.add_page(rows[start:start + 50])
+    progression = analyze(buffer, today=TODAY)
+
+    expected = replay(rows)
+    assert len(progression.exercise_ids) == len(expected)
+    for i, (user_id, exercise_id) in enumerate(zip(progression.user_ids, progression.exercise_ids)):
+        prs, since_pr, plateau, best = expected[(user_id, int(exercise_id))]
+        assert progression.pr_count[i] == prs
+        assert progression.consecutive_failures[i] == since_pr
+        assert progression.is_plateau[i] == plateau
+        assert progression.best_e1rm[i] == pytest.approx(best, rel=1e-6)
+        assert progression.sessions[i] == 12
+
+
+def test_groups_do_not_leak_into_each_other():
+    strong = [{"weight": 200, "reps": 5}]
+    weak = [{"weight": 50, "reps": 5}]
+    rows = [
+        {"id": 1, "user_id": "a", "exercise_id": 1, "date": "2026-06-01", "sets_data": strong},
+        {"id": 2, "user_id": "a", "exercise_id": 2, "date": "2026-06-02", "sets_data": weak},
+        {"id": 3, "user_id": "a", "exercise_id": 2, "date": "2026-06-05", "sets_data": [{"weight": 55, "reps": 5}]},
+        {"id": 4, "user_id": "b", "exercise_id": 1, "date": "2026-06-03", "sets_data": weak},
+    ]
+    buffer = SessionBuffer()
+    buffer.add_page(rows)
+    rows_out = {(r["user_id"], r["exercise_id"]): r for r in analyze(buffer, today=TODAY).to_rows()}
+
+    assert rows_out[("a", 2)]["pr_count"] == 1
+    assert rows_out[("a", 2)]["best_e1rm"] == pytest.approx(55 * (1 + 5 / 30), abs=0.01)
+    assert rows_out[("b", 1)]["best_e1rm"] == pytest.approx(50 * (1 + 5 / 30), abs=0.01)
+    assert rows_out[("b", 1)]["pr_count"] == 0
+    assert rows_out[("a", 2)]["last_updated"] == "2026-06-05"